@@ -0,0 +1,356 @@
+"""
+Benchmarks for the offline stages of the three pipelines
+
+Synthesizes discussions, communities and product catalogs at a multiple of
+the sample data and times each stage that runs after the fetchers, using the
+pipelines' own code:
+
+    discussions   categorize, dedup, score, near_duplicates, sort, save, load,
+                  render
+                  (sample: complete_health_data.json, 2,243 discussions)
+    communities   build, categorize, sort, save, render
+                  (sample: group_dir.json, ~350 entries)
+    products      save, load
+                  (sample: womenhealthproducts.json, 84 products)
+
+Every synthetic item is a sample item with a new id, jittered numbers and a
+share of its words swapped for words from other samples, so text lengths and
+categories stay realistic without every copy being a near-duplicate. About 5%
+of the discussions are exact-id repeats for the dedup stage and 3% are lightly
+edited cross-posts for the near-duplicate stage. The generators are seeded, so
+the same scale yields the same data.
+
+Each run appends one line per suite and scale to benchmark_history.jsonl and
+is compared with the previous run at that scale (stages that got more than
+REGRESSION_RATIO slower) and with the smallest scale of the same run (stages
+whose time per item grew more than SCALING_RATIO, i.e. worse than linear).
+
+USAGE:
+python benchmarks.py                          # 10x and 100x
+python benchmarks.py --scales 10 100 1000     # 1000x needs several GB of RAM
+python benchmarks.py --suites discussions --scales 1
+
+For full-pipeline timings including fetch and parse, record HTTP fixtures once
+and replay them (see http_fixtures.py).
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from communities_directory import CommunityDirectory
+from condition_classifier import get_classifier
+from discussion_store import DiscussionStore
+import engagement_scoring
+from engagement_scoring import rescore
+from wmhealthAggregatorComp import ComprehensiveHealthAggregator
+
+HERE = Path(__file__).resolve().parent
+DISCUSSIONS_SAMPLE = HERE / "complete_health_data.json"
+COMMUNITIES_SAMPLE = HERE / "group_dir.json"
+PRODUCTS_SAMPLE = HERE / "womenhealthproducts.json"
+HISTORY_FILE = HERE / "benchmark_history.jsonl"
+
+DEFAULT_SCALES = [10, 100]
+SUITES = ('discussions', 'communities', 'products')
+SEED = 42
+DUPLICATE_RATE = 0.05  # share of synthetic discussions that repeat an earlier id
+CROSS_POST_RATE = 0.03  # share that are an earlier discussion under a new id
+REWORD_RATE = 0.3  # share of words replaced in every other synthetic discussion
+MAX_AGE_DAYS = 365
+REGRESSION_RATIO = 1.25  # slower than the previous run at the same scale
+SCALING_RATIO = 2.0  # time per item vs the smallest scale in this run
+MIN_SECONDS = 0.05  # ignore differences in stages faster than this
+
+
+# ========== SYNTHETIC DATA ==========
+def _reword(text: str, words: List[str], rng: random.Random) -> str:
+    return ' '.join(rng.choice(words) if rng.random() < REWORD_RATE else word for word in text.split())
+
+
+def synth_discussions(sample: List[Dict[str, Any]], scale: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """len(sample) * scale discussions shaped like the sample"""
+    words = sorted({w for d in sample for w in (d.get('title') or '').split() if len(w) > 3}) or ['health']
+    now = datetime.now()
+    discussions = []
+    for i in range(len(sample) * scale):
+        roll = rng.random()
+        if discussions and roll < DUPLICATE_RATE:
+            discussions.append(dict(rng.choice(discussions)))
+            continue
+        if discussions and roll < DUPLICATE_RATE + CROSS_POST_RATE:
+            original = rng.choice(discussions)
+            discussions.append({**original, 'id': f"{original['id']}_x{i}", 'source': f"crosspost {i}",
+                                'content': f"{original.get('content') or ''} (cross-post)"})
+            continue
+
+        disc = dict(sample[i % len(sample)])
+        created = now - timedelta(days=rng.uniform(0, MAX_AGE_DAYS))
+        disc.update({
+            'id': f"{disc['id']}_{i}",
+            'title': _reword(disc.get('title') or '', words, rng),
+            'content': _reword(disc.get('content') or '', words, rng),
+            'url': f"{disc.get('url', '')}#{i}",
+            'created_utc': created.isoformat(timespec='seconds'),
+            'fetched_date': now.isoformat(),
+        })
+        for metric in ('score', 'num_comments', 'replies_count', 'views', 'likes'):
+            if isinstance(disc.get(metric), (int, float)):
+                disc[metric] = int(disc[metric] * rng.uniform(0.2, 3.0))
+        disc.pop('engagement_score', None)
+        discussions.append(disc)
+    return discussions
+
+
+def synth_community_config(config: Dict[str, Any], scale: int, rng: random.Random) -> Dict[str, Any]:
+    """group_dir.json with every list `scale` times as long"""
+    scaled = {}
+    for key, entries in config.items():
+        scaled[key] = []
+        for copy in range(scale):
+            for entry in entries:
+                if not isinstance(entry, dict):
+                    scaled[key].append(entry)
+                    continue
+                entry = dict(entry)
+                for name_key in ('name', 'tag', 'id'):
+                    if isinstance(entry.get(name_key), str):
+                        entry[name_key] = f"{entry[name_key]} {copy}"
+                for count_key in ('members', 'followers', 'posts', 'tweets'):
+                    if isinstance(entry.get(count_key), int):
+                        entry[count_key] = int(entry[count_key] * rng.uniform(0.2, 3.0))
+                scaled[key].append(entry)
+    return scaled
+
+
+def synth_products(catalog: Dict[str, Any], scale: int, rng: random.Random) -> Dict[str, Any]:
+    """womenhealthproducts.json with `scale` times the products"""
+    sample = catalog.get('products', [])
+    products = []
+    for i in range(len(sample) * scale):
+        product = json.loads(json.dumps(sample[i % len(sample)]))  # sites are nested dicts
+        product['id'] = i + 1
+        product['name'] = f"{product.get('name', '')} #{i // len(sample)}"
+        for site in product.get('sites', []):
+            if isinstance(site.get('rating'), (int, float)):
+                site['rating'] = round(min(max(site['rating'] + rng.uniform(-0.5, 0.5), 1.0), 5.0), 1)
+        products.append(product)
+    return {**catalog, 'products': products}
+
+
+# ========== TIMING ==========
+class StageTimer:
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def run(self, name: str, fn: Callable, *args):
+        # The pipelines print progress; keep it out of the benchmark output
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            result = fn(*args)
+            self.stages[name] = round(time.perf_counter() - start, 4)
+        return result
+
+
+def bench_discussions(scale: int, workdir: Path) -> Dict[str, Any]:
+    with open(DISCUSSIONS_SAMPLE, 'r', encoding='utf-8') as f:
+        sample = json.load(f)['discussions']
+    discussions = synth_discussions(sample, scale, random.Random(SEED))
+
+    timer = StageTimer()
+    aggregator = timer.run('setup', ComprehensiveHealthAggregator)
+
+    def categorize():
+        texts = [f"{disc.get('title', '')} {disc.get('content', '')}" for disc in discussions]
+        for disc, category in zip(discussions, aggregator.classifier.classify_many(texts)):
+            disc['category'] = category
+
+    def dedup():
+        for disc in discussions:
+            aggregator._add_discussion(disc)
+
+    now = datetime.now()
+    timer.run('categorize', categorize)
+    timer.run('dedup', dedup)
+    timer.run('score', rescore, aggregator.discussions, now)
+    timer.run('near_duplicates', aggregator.collapse_near_duplicates)
+    timer.run('sort', aggregator.discussions.sort, lambda x: x.get('engagement_score', 0), True)
+    timer.run('save', aggregator.save_data)
+    timer.run('load', DiscussionStore.load_json, aggregator.filename)
+    timer.run('render', lambda: aggregator.generate_dashboard(open_browser=False))
+    return {'items': len(discussions), 'stored': len(aggregator.discussions), 'stages': timer.stages}
+
+
+def bench_communities(scale: int, workdir: Path) -> Dict[str, Any]:
+    with open(COMMUNITIES_SAMPLE, 'r', encoding='utf-8') as f:
+        config = synth_community_config(json.load(f), scale, random.Random(SEED))
+    with open(workdir / 'group_dir.json', 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False)
+
+    timer = StageTimer()
+    directory = timer.run('setup', CommunityDirectory)
+
+    def build():
+        # The curated lists and hashtags; Reddit and Quora need the network
+        directory.add_facebook_communities()
+        directory.add_discord_communities()
+        directory.add_twitter_communities()
+        directory.add_instagram_communities()
+        directory.fetch_all_hashtags()
+
+    def categorize():
+        texts = [f"{community['title']} {community['content']}" for community in directory.communities]
+        for community, category in zip(directory.communities, get_classifier().classify_many(texts)):
+            community['category'] = category
+
+    timer.run('build', build)
+    timer.run('categorize', categorize)
+    timer.run('sort', directory.clean_all_data)
+    timer.run('save', directory.save_json)
+    timer.run('render', directory.generate_html)
+    return {'items': len(directory.communities) + len(directory.hashtags), 'stages': timer.stages}
+
+
+def bench_products(scale: int, workdir: Path) -> Dict[str, Any]:
+    with open(PRODUCTS_SAMPLE, 'r', encoding='utf-8') as f:
+        catalog = synth_products(json.load(f), scale, random.Random(SEED))
+    path = workdir / 'womenhealthproducts_updated.json'
+
+    def save():
+        with path.open('w', encoding='utf-8') as f:
+            json.dump(catalog, f, ensure_ascii=False, indent=2)
+
+    def load():
+        with path.open('r', encoding='utf-8') as f:
+            return json.load(f)
+
+    timer = StageTimer()
+    timer.run('save', save)
+    timer.run('load', load)
+    return {'items': len(catalog['products']), 'stages': timer.stages}
+
+
+BENCHMARKS = {
+    'discussions': bench_discussions,
+    'communities': bench_communities,
+    'products': bench_products,
+}
+
+
+# ========== HISTORY ==========
+def _commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def load_history(path=HISTORY_FILE) -> List[Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def append_history(entries: List[Dict[str, Any]], path=HISTORY_FILE) -> None:
+    with open(path, 'a', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def compare(entries: List[Dict[str, Any]], history: List[Dict[str, Any]]) -> List[str]:
+    """Warnings for regressions against history and for worse-than-linear scaling"""
+    warnings = []
+    for entry in entries:
+        previous = next((h for h in reversed(history)
+                         if h['suite'] == entry['suite'] and h['scale'] == entry['scale']), None)
+        if previous is None:
+            continue
+        for stage, seconds in entry['stages'].items():
+            before = previous['stages'].get(stage)
+            if before and seconds > MIN_SECONDS and seconds > before * REGRESSION_RATIO:
+                warnings.append(f"{entry['suite']} {entry['scale']}x {stage}: {before:.2f}s -> {seconds:.2f}s "
+                                f"(since {previous.get('commit') or previous['run_at']})")
+
+    for suite in {e['suite'] for e in entries}:
+        runs = sorted((e for e in entries if e['suite'] == suite), key=lambda e: e['scale'])
+        base = runs[0]
+        for entry in runs[1:]:
+            for stage, seconds in entry['stages'].items():
+                small = base['stages'].get(stage)
+                if not small or seconds < MIN_SECONDS:
+                    continue
+                growth = (seconds / entry['items']) / (small / base['items'])
+                if growth > SCALING_RATIO:
+                    warnings.append(f"{suite} {stage}: {growth:.1f}x slower per item at "
+                                    f"{entry['scale']}x than at {base['scale']}x")
+    return warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the offline pipeline stages on synthetic data")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, metavar='N',
+                        help='multiples of the sample data to generate (default: 10 100)')
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--history', default=HISTORY_FILE, metavar='PATH',
+                        help=f'JSON-lines file results are appended to (default {HISTORY_FILE.name})')
+    parser.add_argument('--no-history', action='store_true', help='compare with the history but do not append')
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    run_at = datetime.now().isoformat(timespec='seconds')
+    environment = {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'numpy': engagement_scoring.np is not None,
+    }
+
+    entries = []
+    cwd = os.getcwd()
+    for suite in args.suites:
+        for scale in sorted(args.scales):
+            print(f"\n⏱️  {suite} at {scale}x...")
+            # The pipelines read and write relative to the working directory
+            with tempfile.TemporaryDirectory(prefix='bench_') as workdir:
+                os.chdir(workdir)
+                try:
+                    result = BENCHMARKS[suite](scale, Path(workdir))
+                finally:
+                    os.chdir(cwd)
+
+            entry = {'run_at': run_at, 'suite': suite, 'scale': scale, **environment, **result}
+            entries.append(entry)
+            print(f"   {result['items']:,} items")
+            for stage, seconds in sorted(result['stages'].items(), key=lambda item: -item[1]):
+                print(f"   {stage:<16} {seconds:8.3f}s")
+
+    warnings = compare(entries, history)
+    if warnings:
+        print("\n⚠️  Possible regressions:")
+        for warning in warnings:
+            print(f"   {warning}")
+    else:
+        print("\n✅ No regressions against the last run or between scales")
+
+    if not args.no_history:
+        append_history(entries, args.history)
+        print(f"💾 Results appended to {args.history}")
+    return 1 if warnings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Circuit breakers for the crawl engine
+
+Each platform and each host gets a breaker. After BREAKER_THRESHOLD failures in
+a row (timeouts, connection errors, 403/429/5xx) it opens, and every remaining
+job for that platform or host is skipped without a request. That way a source
+that is down or blocking us costs a few requests instead of one timeout per URL.
+
+Platforms spread over many independent hosts (RSS feeds, Mastodon instances)
+are passed as `per_host`: they only get host breakers, so three dead feeds
+can't take the healthy ones down with them.
+
+Breakers live in the crawl state, so an open breaker also skips the source on
+later runs until its cooldown has passed. The next request after the cooldown
+is a single probe, and every other job for that platform or host is skipped
+until it reports back: if it succeeds the breaker closes, and if it fails the
+breaker opens again for twice as long. Lifetime success and failure counts are
+kept as well, for a per-source health summary.
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import urlsplit
+
+import requests
+
+BREAKER_THRESHOLD = 3  # consecutive failures that open a breaker
+BREAKER_COOLDOWN = 6 * 3600  # seconds before an open breaker lets a probe through
+BREAKER_MAX_COOLDOWN = 7 * 24 * 3600
+FAILURE_STATUSES = {403, 429}  # plus every 5xx
+
+
+def is_failure(response: requests.Response) -> bool:
+    return response.status_code in FAILURE_STATUSES or response.status_code >= 500
+
+
+class CircuitBreakers:
+    """Platform and host breakers backed by a CrawlState section"""
+
+    def __init__(self, state, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN,
+                 per_host: Iterable[str] = ()):
+        self.records: Dict[str, dict] = state.section('breakers')
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.per_host = set(per_host)  # platforms without a platform-wide breaker
+        self._skipped: Dict[str, int] = {}  # key -> jobs skipped this run
+        self._probing: Set[str] = set()  # half-open keys whose probe is in flight
+
+    def _keys(self, platform: str, url: str) -> List[str]:
+        host = f"host:{urlsplit(url).hostname or ''}"
+        return [host] if platform in self.per_host else [f"platform:{platform}", host]
+
+    def _skip(self, key: str, why: str) -> bool:
+        if key not in self._skipped:
+            print(f"  ⛔ {key}: {why}, skipping")
+        self._skipped[key] = self._skipped.get(key, 0) + 1
+        return False
+
+    def _record(self, key: str) -> dict:
+        return self.records.setdefault(key, {
+            'state': 'closed',
+            'consecutive_failures': 0,
+            'successes': 0,
+            'failures': 0,
+            'opened_at': None,
+            'cooldown': self.cooldown,
+            'last_error': None,
+        })
+
+    def allow(self, platform: str, url: str) -> bool:
+        """False if the platform's or the host's breaker is open or already probing"""
+        probes = []
+        for key in self._keys(platform, url):
+            record = self.records.get(key)
+            if not record or record['state'] == 'closed':
+                continue
+            if key in self._probing:
+                return self._skip(key, "waiting for the probe")
+            if record['state'] == 'open' and time.time() - record['opened_at'] < record['cooldown']:
+                return self._skip(key, f"circuit open ({record['last_error']})")
+            probes.append(key)
+
+        # Only claim the probes once every breaker has let the job through
+        for key in probes:
+            self.records[key]['state'] = 'half_open'
+            self._probing.add(key)
+            print(f"  🔌 {key}: cooldown over, probing")
+        return True
+
+    def success(self, platform: str, url: str) -> None:
+        for key in self._keys(platform, url):
+            self._probing.discard(key)
+            record = self._record(key)
+            record['successes'] += 1
+            record['consecutive_failures'] = 0
+            record['state'] = 'closed'
+            record['cooldown'] = self.cooldown
+
+    def failure(self, platform: str, url: str, reason: str) -> None:
+        for key in self._keys(platform, url):
+            self._probing.discard(key)
+            record = self._record(key)
+            record['failures'] += 1
+            record['consecutive_failures'] += 1
+            record['last_error'] = reason
+
+            if record['state'] == 'half_open':
+                # The probe failed: back off for longer this time
+                record['cooldown'] = min(record['cooldown'] * 2, BREAKER_MAX_COOLDOWN)
+            elif record['state'] == 'open' or record['consecutive_failures'] < self.threshold:
+                continue
+
+            record['state'] = 'open'
+            record['opened_at'] = time.time()
+            print(f"  ⛔ {key}: {record['consecutive_failures']} failures in a row ({reason}), "
+                  f"circuit open for {record['cooldown'] / 3600:g}h")
+
+    def success_rate(self, key: str) -> Optional[float]:
+        record = self.records.get(key)
+        if not record or not (record['successes'] + record['failures']):
+            return None
+        return record['successes'] / (record['successes'] + record['failures'])
+
+    def report(self) -> None:
+        """Print platforms and hosts that are open or have been failing"""
+        for key in sorted(self.records):
+            record = self.records[key]
+            rate = self.success_rate(key)
+            if record['state'] == 'closed' and (rate is None or rate >= 0.9):
+                continue
+            skipped = self._skipped.get(key, 0)
+            print(f"  🩺 {key}: {record['state']}, {rate:.0%} of requests succeed"
+                  + (f", {skipped} skipped this run" if skipped else ""))
@@ -4,16 +4,18 @@ Generates a comprehensive JSON + HTML directory of women's health communities
 
 INSTALLATION:
 pip install requests beautifulsoup4
+pip install selectolax   # optional, faster HTML parsing
 
 OUTPUT:
 - communities_directory.json (complete community data)
 - communities_directory.html (browsable directory)
+- communities_run_report.json (request counts, latencies and stage timings;
+  --prometheus PATH also writes them as a Prometheus textfile)
 """
 
+import argparse
 import json
-import requests
 import random
-from bs4 import BeautifulSoup
 from datetime import datetime
 import time
 import re
@@ -21,7 +23,20 @@ import webbrowser
 from pathlib import Path  # optional but handy
 from fake_useragent import UserAgent as ua
 
+from condition_classifier import get_classifier
+from crawl_engine import FetchJob, PlatformCrawl, run_concurrent
+import http_client
+from run_metrics import metrics
+from html_parsing import parse_html
+from static_shards import LAZY_SHARD_CSS, LAZY_SHARD_SCRIPT, ShardWriter
+
 CONFIG_PATH = Path("group_dir.json")
+QUORA_FOLLOWERS = re.compile(r'[\d,]+\s+follower', re.I)
+# Subreddit metadata comes from /api/info.json, up to 100 names per request;
+# names it does not return are retried one by one through about.json
+REDDIT_INFO_BATCH = 100
+REDDIT_CONCURRENCY = 4
+RUN_REPORT = "communities_run_report.json"
 #QUORA_JSON_PATH = Path("quora-topics.json")
 
 class CommunityDirectory:
@@ -86,34 +101,7 @@ class CommunityDirectory:
 
     def categorize_content(self, text):
         """Categorize based on health condition"""
-        text_lower = text.lower()
-
-        if any(word in text_lower for word in ['pcos', 'polycystic']):
-            return 'PCOS'
-        elif any(word in text_lower for word in ['endometriosis', 'endo ']):
-            return 'Endometriosis'
-        elif any(word in text_lower for word in ['pregnancy', 'pregnant']):
-            return 'Pregnancy'
-        elif any(word in text_lower for word in ['infertility', 'fertility', 'ttc', 'ivf']):
-            return 'Infertility & Fertility'
-        elif any(word in text_lower for word in ['menopause', 'perimenopause']):
-            return 'Menopause'
-        elif any(word in text_lower for word in ['breast cancer']):
-            return 'Breast Cancer'
-        elif any(word in text_lower for word in ['ovarian cancer']):
-            return 'Ovarian Cancer'
-        elif any(word in text_lower for word in ['cervical cancer']):
-            return 'Cervical Cancer'
-        elif any(word in text_lower for word in ['thyroid', 'hypothyroid']):
-            return 'Thyroid Disorders'
-        elif any(word in text_lower for word in ['mental health', 'anxiety', 'depression', 'postpartum']):
-            return 'Mental Health'
-        elif any(word in text_lower for word in ['fibromyalgia', 'chronic pain']):
-            return 'Chronic Pain'
-        elif any(word in text_lower for word in ['pmdd', 'pms']):
-            return 'PMS & PMDD'
-        else:
-            return 'General Women\'s Health'
+        return get_classifier().classify(text)
 
 # ========== # ========== # ========== # ========== # ========== # ==========
 
@@ -129,6 +117,7 @@ class CommunityDirectory:
             w_quality: float = 0.2,
     ) -> float:
 
+        started = time.perf_counter()
         # Convert subscribers to float, handling K/M suffixes and commas
         def parse_subscribers(subs: int | str) -> float:
             if isinstance(subs, int):
@@ -188,6 +177,7 @@ class CommunityDirectory:
                 w_quality * quality_score
         )
 
+        metrics.add_time('score', time.perf_counter() - started)
         return round(final_score, 2)
 
     # ========== FETCH ALL HASHTAGS FROM PLATFORMS ==========
@@ -417,71 +407,116 @@ class CommunityDirectory:
         """Fetch Reddit communities"""
         print("\n🔴 Fetching Reddit communities...")
 
-
         headers = {'User-Agent': 'CommunityDirectory/1.0'}
-        new_count = 0
         subreddits = self.config.get("reddit_subreddits_fetch", [])
+        found = {}  # lowercased name -> subreddit data
+
+        jobs = [
+            FetchJob(
+                label=f"{len(chunk)} subreddits",
+                url="https://www.reddit.com/api/info.json",
+                params={'sr_name': ','.join(chunk)},
+                headers=headers,
+                context={'names': chunk, 'batch': True},
+            )
+            for chunk in (subreddits[i:i + REDDIT_INFO_BATCH]
+                          for i in range(0, len(subreddits), REDDIT_INFO_BATCH))
+        ]
 
-        for sub in subreddits:
-            try:
-                url = f"https://www.reddit.com/r/{sub}/about.json"
-                response = requests.get(url, headers=headers, timeout=10)
-
-                if response.status_code != 200:
-                    print(f"  ✗ r/{sub}: HTTP {response.status_code}")
-                    continue
-
-                data = response.json().get('data', {})
-
-                # Created date as datetime (for engagement) and ISO string (for storage)
-                created_ts = data.get('created_utc', 0)  # unix seconds [web:44][web:52]
-                created_dt = datetime.utcfromtimestamp(created_ts) if created_ts else None
-
-                subscribers = data.get('subscribers', 0)
-                active_users = data.get('active_user_count', 0) or 0  # often null now [web:48][web:47]
+        def handle(job, response):
+            names = job.context['names']
+            if response.status_code != 200:
+                print(f"  ✗ {job.label}: HTTP {response.status_code}")
+                items = []
+            elif job.context.get('batch'):
+                items = [child.get('data', {}) for child in response.json().get('data', {}).get('children', [])]
+            else:
+                items = [response.json().get('data', {})]
+
+            for data in items:
+                if data.get('display_name'):
+                    found[data['display_name'].lower()] = data
+
+            # Private, quarantined or renamed subreddits can be missing from the
+            # batch answer; ask for those individually
+            if job.context.get('batch'):
+                return [
+                    FetchJob(
+                        label=f"r/{sub}",
+                        url=f"https://www.reddit.com/r/{sub}/about.json",
+                        headers=headers,
+                        context={'names': [sub]},
+                    )
+                    for sub in names if sub.lower() not in found
+                ]
 
-                # For now, Reddit about.json does not give comments/views/likes at subreddit level,
-                # so we pass 0 and let activity be driven mostly by active_members + age.
-                engagement_score = self.compute_engagement_score(
-                    group_created_at=created_dt,
-                    base_score=1.0,          # or tweak per subreddit
-                    subscribers=subscribers,
-                )
-                community = {
-                    'id': f"reddit_{sub.lower()}",
-                    'platform': 'Reddit',
-                    'community_name': f"r/{sub}",
-                    'source': f"r/{sub}",
-                    'category': self.categorize_content(
-                        data.get('title', '') + ' ' + data.get('public_description', '')
-                    ),
-                    'title': data.get('title', f"r/{sub}"),
-                    'content': data.get('public_description', '')[:500]
-                               or 'Community focused on support and discussion',
-                    'url': f"https://reddit.com/r/{sub}",
-                    'number_members': subscribers,
-                    'author': 'Reddit Community',
-                    'score': active_users,
-                    'num_comments': 0,
-                    # store both raw datetime (if your model supports it) and ISO for JSON
-                    'created_at': created_dt.isoformat() if created_dt else None,
-                    'created_utc': created_dt.isoformat() if created_dt else None,
-                    'fetched_date': datetime.utcnow().isoformat(),
-                    'engagement_score': engagement_score,
-                }
+        run_concurrent([PlatformCrawl('Reddit', jobs, handle, concurrency=REDDIT_CONCURRENCY)])
 
-                self.communities.append(community)
-                new_count += 1
-                print(f"  ✓ r/{sub}: {subscribers:,} members | engagement {engagement_score}")
+        # Every subreddit found, categorized in one batch
+        names = list(found)
+        with metrics.stage('categorize'):
+            categories = dict(zip(names, get_classifier().classify_many(
+                f"{found[name].get('title') or ''} {found[name].get('public_description') or ''}" for name in names
+            )))
 
-                time.sleep(1)
+        new_count = 0
+        for sub in subreddits:
+            data = found.get(sub.lower())
+            if data is None:
+                print(f"  ✗ r/{sub}: not found")
+                continue
 
+            try:
+                community = self._reddit_community(sub, data, categories[sub.lower()])
             except Exception as e:
                 print(f"  ✗ r/{sub}: {str(e)}")
+                continue
+
+            self.communities.append(community)
+            new_count += 1
+            print(f"  ✓ r/{sub}: {community['number_members']:,} members | "
+                  f"engagement {community['engagement_score']}")
 
         print(f"✅ Reddit: {new_count} communities")
         return new_count
 
+    def _reddit_community(self, sub, data, category):
+        """Directory entry for a subreddit from its about/info data"""
+        # Created date as datetime (for engagement) and ISO string (for storage)
+        created_ts = data.get('created_utc', 0)  # unix seconds [web:44][web:52]
+        created_dt = datetime.utcfromtimestamp(created_ts) if created_ts else None
+
+        subscribers = data.get('subscribers', 0) or 0
+        active_users = data.get('active_user_count', 0) or 0  # often null now [web:48][web:47]
+
+        # For now, Reddit about.json does not give comments/views/likes at subreddit level,
+        # so we pass 0 and let activity be driven mostly by active_members + age.
+        engagement_score = self.compute_engagement_score(
+            group_created_at=created_dt,
+            base_score=1.0,          # or tweak per subreddit
+            subscribers=subscribers,
+        )
+        return {
+            'id': f"reddit_{sub.lower()}",
+            'platform': 'Reddit',
+            'community_name': f"r/{sub}",
+            'source': f"r/{sub}",
+            'category': category,
+            'title': data.get('title') or f"r/{sub}",
+            'content': (data.get('public_description') or '')[:500]
+                       or 'Community focused on support and discussion',
+            'url': f"https://reddit.com/r/{sub}",
+            'number_members': subscribers,
+            'author': 'Reddit Community',
+            'score': active_users,
+            'num_comments': 0,
+            # store both raw datetime (if your model supports it) and ISO for JSON
+            'created_at': created_dt.isoformat() if created_dt else None,
+            'created_utc': created_dt.isoformat() if created_dt else None,
+            'fetched_date': datetime.utcnow().isoformat(),
+            'engagement_score': engagement_score,
+        }
+
     # ========== FACEBOOK GROUPS (Manual List) ==========
     def add_facebook_communities(self):
         """Add known Facebook groups (manual list)"""
@@ -755,19 +790,19 @@ class CommunityDirectory:
             try:
                 url = f"https://www.quora.com/topic/{topic_slug}"
 
-                response = requests.get(url, headers=headers, timeout=15)
+                response = http_client.get(url, source='Quora', headers=headers, timeout=15)
 
                 if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
+                    doc = parse_html(response.content)
 
                     # Try to extract topic name and follower count
                     title = topic_slug.replace('-', ' ')
                     followers = 10000  # Default estimate
 
                     # Look for follower count in page
-                    followers_text = soup.find(text=re.compile(r'[\d,]+\s+follower', re.I))
+                    followers_text = next((t for t in doc.strings() if QUORA_FOLLOWERS.search(t)), None)
                     if followers_text:
-                        match = re.search(r'([\d,]+)', str(followers_text))
+                        match = re.search(r'([\d,]+)', followers_text)
                         if match:
                             followers = int(match.group(1).replace(',', ''))
 
@@ -801,7 +836,6 @@ class CommunityDirectory:
                     self.communities.append(community)
                     new_count += 1
                     print(f"✓ {title}: {followers:,} followers")
-                    time.sleep(2)
 
             except Exception as e:
                 print(f"  ✗ {topic_slug}: {str(e)}")
@@ -851,7 +885,6 @@ class CommunityDirectory:
             self.communities.append(community)
             new_count += 1
             print(f"  ✓ {title}: {followers}: followers")
-            time.sleep(2)
 
         print(f"✅ Quora: {new_count} topics")
         return new_count
@@ -873,12 +906,13 @@ class CommunityDirectory:
         start_time = time.time()
 
         total = 0
-        total += self.fetch_reddit()
-        total += self.add_facebook_communities()
-        total += self.add_discord_communities()
-        total += self.add_twitter_communities()
-        total += self.add_instagram_communities()
-        total += self.fetch_quora()
+        with metrics.stage('fetch'):
+            total += self.fetch_reddit()
+            total += self.add_facebook_communities()
+            total += self.add_discord_communities()
+            total += self.add_twitter_communities()
+            total += self.add_instagram_communities()
+            total += self.fetch_quora()
 
         # Before sorting: # Clean data after fetching
         for comm in self.communities:
@@ -935,14 +969,16 @@ class CommunityDirectory:
             'hashtags': self.hashtags
         }
 
-        with open(self.json_file, 'w', encoding='utf-8') as f:
+        with metrics.stage('write'), open(self.json_file, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
 
         print(f"\n💾 JSON saved: {self.json_file}")
 
-    def generate_html(self):
-        """Generate HTML directory"""
+    def generate_html(self, sharded=False):
+        """Generate HTML directory (sharded: one lazily loaded fragment per category)"""
         print("\n📄 Generating HTML directory...")
+        started = time.perf_counter()
+        shards = ShardWriter(self.html_file) if sharded else None
 
         # Group by category
         by_category = {}
@@ -1256,6 +1292,7 @@ class CommunityDirectory:
                         grid-template-columns: 1fr 1fr;
                     }}
                 }}
+{LAZY_SHARD_CSS if sharded else ''}
             </style>
         </head>
         <body>
@@ -1349,26 +1386,30 @@ class CommunityDirectory:
                 <div id="communitiesContainer">"""
 
         # Generate communities by category
-        for category, comms in sorted(by_category.items(),
+        for position, (category, comms) in enumerate(sorted(by_category.items(),
                                       key=lambda x: sum(self.parse_members(c.get('number_members', 0)) for c in x[1]),
-                                      reverse=True):
+                                      reverse=True)):
             #total_cat_members = sum(c['number_members'] for c in comms)
             total_cat_members = sum(self.parse_members(c.get('number_members', 0)) for c in comms)
 
+            # In sharded mode only the biggest category is inlined
+            shard_attr = f' data-shard="{shards.url(category)}"' if shards and position > 0 else ''
+            cards = []
+
             html += f"""
                         <div class="category-section" data-category="{category}">
                             <div class="category-header">
                                 <div class="category-title">{category}</div>
                                 <div class="category-count">{len(comms)} communities • {total_cat_members:,} members</div>
                             </div>
-                            <div class="communities-grid">"""
+                            <div class="communities-grid"{shard_attr}>"""
 
             for comm in comms:
                 platform_class = comm['platform'].lower().replace('/', '-').replace(' ', '-')
                 # hashtags: list like ['pcos', 'fertility']; source: e.g. 'reddit', 'instagram'
                 hashtags_attr = ",".join((comm.get('hashtags') or []))
                 source_attr = (comm.get('source') or comm['platform']).lower()
-                html += f"""
+                cards.append(f"""
                                 <div class="community-card" 
                                      data-platform="{comm['platform']}" 
                                      data-category="{category}"
@@ -1384,7 +1425,13 @@ class CommunityDirectory:
                                         <span class="members"> {comm['numeric_members']} members</span>
                                         <a href="{comm['url']}" target="_blank" class="join-btn">View Community →</a>
                                     </div>
-                                </div>"""
+                                </div>""")
+
+            if shard_attr:
+                with shards.open(category) as f:
+                    f.write(''.join(cards))
+            else:
+                html += ''.join(cards)
 
             html += """
             
@@ -1423,6 +1470,15 @@ class CommunityDirectory:
                     const cards = document.querySelectorAll('.community-card');
                     const sections = document.querySelectorAll('.category-section');
 
+                    // Sharded output: fetch the categories this filter can show (each load re-runs applyFilters)
+                    const cardFilterActive = platform !== 'all' || search !== '' || selectedTags.length > 0;
+                    const pending = Array.from(document.querySelectorAll('.communities-grid[data-shard]'))
+                        .filter(grid => category === 'all' ? cardFilterActive
+                                                           : grid.closest('.category-section').dataset.category === category);
+                    if (pending.length && typeof loadShards === 'function') {
+                        loadShards(pending);
+                    }
+
                     cards.forEach(card => {
                         const cardPlatform = (card.dataset.platform || '').toLowerCase();
                         const cardCategory = card.dataset.category;
@@ -1456,7 +1512,9 @@ class CommunityDirectory:
                         const visibleCards = Array.from(
                             section.querySelectorAll('.community-card')
                         ).filter(c => c.style.display !== 'none');
-                        section.style.display = visibleCards.length > 0 ? 'block' : 'none';
+                        const unloaded = section.querySelector('.communities-grid[data-shard]') !== null;
+                        const keep = unloaded && (category === 'all' || section.dataset.category === category);
+                        section.style.display = (visibleCards.length > 0 || keep) ? 'block' : 'none';
                     });
 
                     sortCommunities();
@@ -1516,16 +1574,35 @@ class CommunityDirectory:
                         sortCommunities();
                     });
                 });
+                document.addEventListener('shardloaded', applyFilters);
+"""
+
+        if shards is not None:
+            html += LAZY_SHARD_SCRIPT
+
+        html += """
             </script>
         </body>
         </html>"""
 
         with open(self.html_file, 'w', encoding='utf-8') as f:
             f.write(html)
+        metrics.add_time('render', time.perf_counter() - started)
 
         print(f"✅ HTML saved: {self.html_file}")
+        if shards is not None:
+            print(f"🗂️ Category shards in {shards.directory}/ (view with: python -m http.server)")
 
 def main():
+    parser = argparse.ArgumentParser(description="Women's Health Communities Directory Generator")
+    parser.add_argument('--sharded', action='store_true',
+                        help='write one lazily loaded fragment per category next to the HTML directory')
+    parser.add_argument('--metrics-report', default=RUN_REPORT, metavar='PATH',
+                        help=f'where to write the JSON run report (default {RUN_REPORT})')
+    parser.add_argument('--prometheus', metavar='PATH',
+                        help='also write run metrics as a Prometheus textfile for node_exporter')
+    args = parser.parse_args()
+
     print("""
 ╔══════════════════════════════════════════════════════════════╗
 ║                                                              ║
@@ -1563,11 +1640,20 @@ def main():
     input("\nPress Enter to generate directory...")
 
     try:
+        metrics.reset('communities')
         directory = CommunityDirectory()
         directory.fetch_all_communities()
         directory.fetch_all_hashtags()
         directory.save_json()
-        directory.generate_html()
+        directory.generate_html(sharded=args.sharded)
+
+        metrics.set_count('communities', len(directory.communities))
+        metrics.set_count('hashtags', len(directory.hashtags))
+        report = metrics.write_report(args.metrics_report)
+        if args.prometheus:
+            metrics.write_prometheus(args.prometheus, report)
+        print(f"\n⏱️  Stage timings (details in {args.metrics_report}):")
+        print(metrics.summary())
 
         print("\n" + "="*70)
         print("✅ DIRECTORY GENERATED SUCCESSFULLY!")
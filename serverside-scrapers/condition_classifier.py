@@ -0,0 +1,124 @@
+"""
+Condition classifier shared by the aggregator and the communities directory
+
+One keyword table, compiled into a single automaton so a text is scanned once
+instead of once per keyword. Matching keeps the original substring semantics
+and first-match priority: a text gets the category of the highest table row
+with any keyword anywhere in it, whatever order the keywords appear in.
+
+Uses an Aho-Corasick automaton when pyahocorasick is installed
+(pip install pyahocorasick). Without it we fall back to a flat, priority-ordered
+substring scan that stops at the first hit: on CPython that beats a single
+alternation regex, which has to try every keyword at every position.
+"""
+
+from typing import Iterable, List
+
+try:
+    import ahocorasick
+except ImportError:  # optional, plain scan fallback below
+    ahocorasick = None
+
+DEFAULT_CATEGORY = "General Women's Health"
+
+# Priority order: most specific first
+CONDITION_KEYWORDS = [
+    ('PCOS', ['pcos', 'polycystic']),
+    ('Endometriosis', ['endometriosis', 'endo ']),
+    ('Uterine Fibroids', ['fibroid', 'leiomyoma']),
+    ('Breast Cancer', ['breast cancer']),
+    ('Cervical Cancer', ['cervical cancer', 'hpv vaccine']),
+    ('Ovarian Cancer', ['ovarian cancer']),
+    ('Menopause', ['menopause', 'perimenopause', 'hot flash']),
+    ('Yeast Infection', ['yeast infection', 'candida', 'thrush']),
+    ('UTI', ['uti', 'urinary tract', 'bladder infection']),
+    ('Ovarian Cysts', ['ovarian cyst']),
+    ('Pelvic Inflammatory Disease', ['pid', 'pelvic inflammatory']),
+    ('Infertility & Fertility', ['infertility', 'infertile', 'ttc', 'trying to conceive', 'ivf', 'fertility']),
+    ('PMS & PMDD', ['pms', 'pmdd', 'premenstrual']),
+    ('Gestational Diabetes', ['gestational diabetes']),
+    ('Postpartum Depression', ['postpartum depression', 'ppd', 'postnatal depression']),
+    ('Thyroid Disorders', ['thyroid', 'hypothyroid', 'hyperthyroid', 'hashimoto']),
+    ('Osteoporosis', ['osteoporosis', 'bone density']),
+    ('Preeclampsia', ['preeclampsia', 'pre-eclampsia']),
+    ('Vaginismus', ['vaginismus']),
+    ('Bacterial Vaginosis', ['bacterial vaginosis', 'bv ']),
+    ('Autoimmune Diseases', ['lupus', 'autoimmune', 'rheumatoid']),
+    ('Pregnancy', ['pregnancy', 'pregnant', 'expecting', 'prenatal']),
+    ('Mental Health', ['anxiety', 'depression', 'mental health', 'therapy']),
+    ('Fibromyalgia', ['fibromyalgia']),
+    ('Chronic Pain', ['chronic pain']),
+]
+
+
+class ConditionClassifier:
+    def __init__(self, table=CONDITION_KEYWORDS, default=DEFAULT_CATEGORY):
+        self.default = default
+        self.categories = [category for category, _ in table]
+
+        # keyword -> priority (row index); a keyword listed twice keeps its first row
+        self._priority = {}
+        for priority, (_, keywords) in enumerate(table):
+            for keyword in keywords:
+                self._priority.setdefault(keyword.lower(), priority)
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword, priority in self._priority.items():
+                self._automaton.add_word(keyword, priority)
+            self._automaton.make_automaton()
+            self._best_priority = self._best_priority_automaton
+        else:
+            self._ordered = sorted(self._priority.items(), key=lambda item: item[1])
+            self._best_priority = self._best_priority_scan
+
+    def _best_priority_automaton(self, text_lower):
+        best = None
+        for _, priority in self._automaton.iter(text_lower):
+            if best is None or priority < best:
+                if priority == 0:
+                    return 0
+                best = priority
+        return best
+
+    def _best_priority_scan(self, text_lower):
+        for keyword, priority in self._ordered:
+            if keyword in text_lower:
+                return priority
+        return None
+
+    def classify(self, text):
+        """Category for a single text"""
+        best = self._best_priority(text.lower()) if text else None
+        return self.default if best is None else self.categories[best]
+
+    def classify_many(self, texts: Iterable[str]) -> List[str]:
+        """Categories for a batch of texts, in order"""
+        best_priority = self._best_priority
+        categories = self.categories
+        default = self.default
+
+        results = []
+        for text in texts:
+            best = best_priority(text.lower()) if text else None
+            results.append(default if best is None else categories[best])
+        return results
+
+
+_default_classifier = None
+
+
+def get_classifier():
+    """Process-wide classifier built from CONDITION_KEYWORDS"""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = ConditionClassifier()
+    return _default_classifier
+
+
+def categorize(text):
+    return get_classifier().classify(text)
+
+
+def categorize_many(texts):
+    return get_classifier().classify_many(texts)
@@ -0,0 +1,250 @@
+"""
+Crawl engine shared by the scrapers
+
+A platform crawl is described once as a list of FetchJobs plus a handler that
+turns each response into discussions (and, optionally, follow-up jobs such as
+the next page of a listing). The same description can then be run:
+
+- sequentially: one request at a time (original behaviour)
+- concurrently: every platform at the same time on an asyncio loop, each one
+  bounded by its own concurrency limit, so a full run takes roughly as long as
+  the slowest platform instead of the sum of all of them
+
+Either way every request goes through http_client, whose per-host rate
+limiter paces each site at the rate it allows, and is recorded in run_metrics
+under the crawl's name along with its parse time. Pass CircuitBreakers to skip
+the rest of a platform or host once it keeps failing.
+
+Handlers always run on the calling thread (the event loop in concurrent mode),
+so they can update shared state such as the discussion list without locks.
+
+A crawl can also name a `parse` function. Its responses are then parsed in a
+process pool: the fetcher hands over the raw bytes and goes straight back to
+the network, and the handler later receives the parser's plain-dict result as
+a third argument (None for non-200 responses). Parse functions must be
+importable module-level functions that only use their arguments, since they
+run in another interpreter.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+
+import http_client
+from circuit_breaker import CircuitBreakers, is_failure
+from run_metrics import metrics, timed
+
+
+@dataclass
+class FetchJob:
+    """A single GET request plus whatever context its handler needs"""
+    label: str
+    url: str
+    params: Optional[Dict[str, Any]] = None
+    headers: Optional[Dict[str, str]] = None
+    timeout: float = 10
+    context: Dict[str, Any] = field(default_factory=dict)
+    not_before: float = 0.0  # time.monotonic() before which not to send it, e.g. an API backoff
+
+
+def _wait_time(job: FetchJob) -> float:
+    return max(job.not_before - time.monotonic(), 0.0)
+
+
+Handler = Callable[..., Optional[Iterable[FetchJob]]]  # (job, response[, parsed])
+Parser = Callable[[bytes, str, Dict[str, Any]], Any]  # (content, url, context)
+
+# Parsing is CPU-bound, so one worker per core is all that helps
+PARSE_WORKERS = os.cpu_count() or 1
+
+
+@dataclass
+class PlatformCrawl:
+    """All the jobs for one platform and how to handle their responses"""
+    name: str
+    jobs: List[FetchJob]
+    handler: Handler
+    concurrency: int = 4
+    parse: Optional[Parser] = None  # runs in the parse pool, see module docstring
+
+
+def fetch(job: FetchJob, source: Optional[str] = None) -> requests.Response:
+    """Blocking, rate-limited GET for a job; `source` labels it in the run metrics"""
+    return http_client.get(job.url, source=source, params=job.params, headers=job.headers, timeout=job.timeout)
+
+
+def parse_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Process pool for parse functions"""
+    # spawn, not fork: the fetch threads may hold locks at fork time
+    return ProcessPoolExecutor(max_workers=workers or PARSE_WORKERS,
+                               mp_context=multiprocessing.get_context('spawn'))
+
+
+def _allowed(crawl: PlatformCrawl, job: FetchJob, breakers: Optional[CircuitBreakers]) -> bool:
+    return breakers is None or breakers.allow(crawl.name, job.url)
+
+
+def _fetched(crawl: PlatformCrawl, job: FetchJob, breakers: Optional[CircuitBreakers],
+             response: Optional[requests.Response], error: Optional[Exception] = None):
+    """Report a fetch's outcome to the breakers; returns the response if there is one"""
+    if error is not None:
+        print(f"  ✗ {job.label}: {str(error)}")
+        if breakers is not None:
+            breakers.failure(crawl.name, job.url, type(error).__name__)
+        return None
+
+    if breakers is not None:
+        if is_failure(response):
+            breakers.failure(crawl.name, job.url, f"HTTP {response.status_code}")
+        else:
+            breakers.success(crawl.name, job.url)
+    return response
+
+
+def _wants_parse(crawl: PlatformCrawl, response: requests.Response) -> bool:
+    return crawl.parse is not None and response.status_code == 200
+
+
+def _handle(crawl: PlatformCrawl, job: FetchJob, response: requests.Response, parsed: Any = None) -> List[FetchJob]:
+    try:
+        if crawl.parse is not None:
+            return list(crawl.handler(job, response, parsed) or [])
+        return list(crawl.handler(job, response) or [])
+    except Exception as e:
+        print(f"  ✗ {job.label}: {str(e)}")
+        return []
+
+
+def _finish(crawl: PlatformCrawl, job: FetchJob, response: requests.Response,
+            parsing: Optional[Future]) -> List[FetchJob]:
+    """Wait for a page's parse (if any) and hand the result to the handler"""
+    parsed = None
+    if parsing is not None:
+        try:
+            seconds, parsed = parsing.result()
+        except Exception as e:
+            print(f"  ✗ {job.label}: parse failed: {str(e)}")
+            return []
+        metrics.record_parse(crawl.name, seconds)
+    return _handle(crawl, job, response, parsed)
+
+
+# ========== SEQUENTIAL ==========
+def run_sequential(crawl: PlatformCrawl, pool: Optional[ProcessPoolExecutor] = None,
+                   breakers: Optional[CircuitBreakers] = None) -> None:
+    """
+    Run one platform's jobs one after another. With a parse function, pages
+    are parsed in `pool` (a private one if not given) while the next page is
+    fetched, and handled in fetch order.
+    """
+    queue = deque(crawl.jobs)
+    parsing = deque()  # (job, response, parse future or None), in fetch order
+    own_pool = crawl.parse is not None and pool is None
+    if own_pool:
+        pool = parse_pool()
+
+    try:
+        while queue or parsing:
+            if queue:
+                job = queue.popleft()
+                if _wait_time(job):
+                    time.sleep(_wait_time(job))
+                response = None
+                if _allowed(crawl, job, breakers):
+                    try:
+                        response = _fetched(crawl, job, breakers, fetch(job, crawl.name))
+                    except Exception as e:
+                        _fetched(crawl, job, breakers, None, e)
+
+                if response is not None:
+                    future = None
+                    if _wants_parse(crawl, response):
+                        future = pool.submit(timed, crawl.parse, response.content, job.url, job.context)
+                    parsing.append((job, response, future))
+
+            # Handle parsed pages in order; only block once there is nothing left to fetch
+            while parsing and (not queue or parsing[0][2] is None or parsing[0][2].done()):
+                queue.extend(_finish(crawl, *parsing.popleft()))
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+
+# ========== CONCURRENT ==========
+async def _run_platform(crawl: PlatformCrawl, pool: Optional[ProcessPoolExecutor] = None,
+                        breakers: Optional[CircuitBreakers] = None) -> None:
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(crawl.concurrency, 1))
+    pending = set()
+
+    async def run_job(job: FetchJob) -> None:
+        if _wait_time(job):
+            await asyncio.sleep(_wait_time(job))
+
+        async with semaphore:
+            # Checked once we hold a slot, so jobs queued behind a failing batch see the breaker
+            if not _allowed(crawl, job, breakers):
+                return
+            try:
+                response = _fetched(crawl, job, breakers, await asyncio.to_thread(fetch, job, crawl.name))
+            except Exception as e:
+                _fetched(crawl, job, breakers, None, e)
+                return
+
+        # Parse outside the semaphore so the slot goes back to the fetchers
+        parsed = None
+        if _wants_parse(crawl, response):
+            try:
+                seconds, parsed = await loop.run_in_executor(pool, timed, crawl.parse, response.content,
+                                                             job.url, job.context)
+            except Exception as e:
+                print(f"  ✗ {job.label}: parse failed: {str(e)}")
+                return
+            metrics.record_parse(crawl.name, seconds)
+
+        for follow_up in _handle(crawl, job, response, parsed):
+            schedule(follow_up)
+
+    def schedule(job: FetchJob) -> None:
+        pending.add(asyncio.ensure_future(run_job(job)))
+
+    for job in crawl.jobs:
+        schedule(job)
+
+    # Follow-up jobs are added to `pending` while we wait, so keep draining
+    while pending:
+        done, _ = await asyncio.wait(pending)
+        pending.difference_update(done)
+
+
+async def run_concurrent_async(crawls: List[PlatformCrawl], breakers: Optional[CircuitBreakers] = None,
+                               pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """
+    Run every platform at once, each limited to its own concurrency. Parse
+    functions run in `pool` (a private one if not given).
+    """
+    loop = asyncio.get_running_loop()
+    workers = sum(max(c.concurrency, 1) for c in crawls) or 1
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=workers))
+
+    own_pool = pool is None and any(c.parse is not None for c in crawls)
+    if own_pool:
+        pool = parse_pool()
+    try:
+        await asyncio.gather(*(_run_platform(c, pool, breakers) for c in crawls))
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+
+def run_concurrent(crawls: List[PlatformCrawl], breakers: Optional[CircuitBreakers] = None,
+                   pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """Blocking entry point for run_concurrent_async"""
+    asyncio.run(run_concurrent_async(crawls, breakers, pool))
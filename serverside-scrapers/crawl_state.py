@@ -0,0 +1,72 @@
+"""
+Crawl state persisted between runs
+
+Holds per-source watermarks (the newest item seen for each subreddit, hashtag,
+tag or feed) so an incremental run only asks each source for what is new, plus
+API bookkeeping that must survive between runs: the daily request quota an API
+reported last, server-side objects we only want to create once (such as a
+Stack Exchange filter), the circuit breakers' records and each RSS feed's
+ETag / Last-Modified validators.
+"""
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict
+
+STATE_PATH = Path("crawl_state.json")
+
+
+class CrawlState:
+    def __init__(self, path=STATE_PATH):
+        self.path = Path(path)
+        self.data: Dict[str, Any] = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except FileNotFoundError:
+            self.data = {}
+        except json.JSONDecodeError as e:
+            print(f"⚠️ Failed to parse {self.path}: {e}. Starting with empty state.")
+            self.data = {}
+
+    def value(self, section, source, key, default=None):
+        return self.data.get(section, {}).get(source, {}).get(key, default)
+
+    def set_value(self, section, source, key, value):
+        self.data.setdefault(section, {}).setdefault(source, {})[key] = value
+
+    def section(self, name):
+        """Mutable dict saved with the state, for components that keep their own records"""
+        return self.data.setdefault(name, {})
+
+    def watermark(self, source, key, default=None):
+        return self.value('watermarks', source, key, default)
+
+    def set_watermark(self, source, key, value):
+        self.set_value('watermarks', source, key, value)
+
+    # ========== API QUOTAS ==========
+    # Daily quotas reset at midnight UTC, so a stored figure only counts on the day it was seen
+    @staticmethod
+    def _quota_day():
+        return datetime.now(timezone.utc).date().isoformat()
+
+    def set_quota(self, source, remaining, maximum=None):
+        self.data.setdefault('quotas', {})[source] = {
+            'remaining': remaining,
+            'max': maximum,
+            'day': self._quota_day(),
+        }
+
+    def quota_remaining(self, source):
+        """Requests left today as last reported by the API, or None if unknown"""
+        quota = self.data.get('quotas', {}).get(source)
+        if not quota or quota.get('day') != self._quota_day():
+            return None
+        return quota['remaining']
+
+    def save(self, path=None):
+        """Write to self.path, or a copy to `path`"""
+        with open(path or self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
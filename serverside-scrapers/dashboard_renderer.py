@@ -0,0 +1,1026 @@
+"""
+Streaming HTML renderer for the discussion dashboard
+
+Every fragment of the page is a string.Template compiled once at import time.
+Cards, options and bars are substituted one item at a time and written
+straight to the output file, so rendering stays linear in the number of cards
+and the finished page is never held in memory.
+
+The "All Discussions" filter runs off a prebuilt inverted index embedded as a
+JSON data island (see search_index.py) rather than scanning card text.
+
+With virtual=True that tab carries its discussions as compact JSON instead of
+card markup, and a windowed grid builds only the rows near the viewport, so
+the DOM stays the same size however many discussions the page carries. Given
+a ShardWriter for sidecars, the card data goes to JSON chunks of
+VIRTUAL_CHUNK_ROWS cards, fetched as the window reaches them, and the search
+index to a file fetched the first time a filter is used; the page itself
+only inlines the lookup tables.
+
+With a ShardWriter (see static_shards.py) every condition section after the
+first is written to its own fragment and fetched when it scrolls into view.
+"""
+
+import json
+from html import escape
+from string import Template
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+from search_index import build_search_index, to_data_island
+from static_shards import LAZY_SHARD_CSS, LAZY_SHARD_SCRIPT, ShardWriter
+
+# Cards per JSON chunk of the virtual grid's card data
+VIRTUAL_CHUNK_ROWS = 500
+
+# Platform name -> badge CSS class suffix
+BADGE_CLASSES = {
+    'Reddit': 'reddit',
+    'Mastodon': 'mastodon',
+    'Patient.info': 'patient',
+    'Inspire.com': 'inspire',
+    'Stack Exchange': 'stack-exchange',
+    'RSS Feed': 'rss',
+}
+
+# (label, platform) for the filter buttons on the "All Discussions" tab
+PLATFORM_FILTERS = [
+    ('Reddit', 'Reddit'),
+    ('Mastodon', 'Mastodon'),
+    ('Patient.info', 'Patient.info'),
+    ('Inspire', 'Inspire.com'),
+    ('Stack Exchange', 'Stack Exchange'),
+    ('RSS', 'RSS Feed'),
+]
+
+# ========== TEMPLATES ==========
+PAGE_HEAD = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Women's Health Discussion Hub</title>
+    <style>
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            padding: 20px;
+            min-height: 100vh;
+        }
+
+        .container {
+            max-width: 1600px;
+            margin: 0 auto;
+            background: white;
+            border-radius: 20px;
+            overflow: hidden;
+            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
+        }
+
+        .header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 50px 40px;
+            text-align: center;
+        }
+
+        .header h1 {
+            font-size: 42px;
+            margin-bottom: 15px;
+            font-weight: 700;
+        }
+
+        .header p {
+            font-size: 18px;
+            opacity: 0.95;
+        }
+
+        .header .sub {
+            font-size: 14px;
+            opacity: 0.8;
+            margin-top: 8px;
+        }
+
+        .stats-bar {
+            background: #f8f9fa;
+            padding: 30px 40px;
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+            gap: 20px;
+            border-bottom: 2px solid #e0e0e0;
+        }
+
+        .stat-item {
+            text-align: center;
+        }
+
+        .stat-number {
+            font-size: 36px;
+            font-weight: bold;
+            color: #667eea;
+            margin-bottom: 5px;
+        }
+
+        .stat-label {
+            font-size: 14px;
+            color: #666;
+            text-transform: uppercase;
+            letter-spacing: 1px;
+        }
+
+        .tabs {
+            display: flex;
+            background: #f8f9fa;
+            border-bottom: 2px solid #e0e0e0;
+            overflow-x: auto;
+        }
+
+        .tab {
+            flex: 1;
+            padding: 20px;
+            text-align: center;
+            cursor: pointer;
+            border: none;
+            background: transparent;
+            font-size: 16px;
+            font-weight: 600;
+            color: #666;
+            transition: all 0.3s;
+            border-bottom: 3px solid transparent;
+            min-width: 150px;
+        }
+
+        .tab:hover {
+            background: white;
+            color: #667eea;
+        }
+
+        .tab.active {
+            background: white;
+            color: #667eea;
+            border-bottom-color: #667eea;
+        }
+
+        .content {
+            padding: 40px;
+        }
+
+        .tab-pane {
+            display: none;
+        }
+
+        .tab-pane.active {
+            display: block;
+        }
+
+        .category-section {
+            margin-bottom: 50px;
+        }
+
+        .category-header {
+            display: flex;
+            align-items: center;
+            justify-content: space-between;
+            margin-bottom: 25px;
+            padding-bottom: 15px;
+            border-bottom: 3px solid #667eea;
+        }
+
+        .category-title {
+            font-size: 28px;
+            font-weight: bold;
+            color: #667eea;
+            display: flex;
+            align-items: center;
+            gap: 10px;
+        }
+
+        .category-count {
+            font-size: 18px;
+            color: #999;
+            background: #f0f0f0;
+            padding: 5px 15px;
+            border-radius: 20px;
+        }
+
+        .discussions-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(400px, 1fr));
+            gap: 20px;
+        }
+
+        .discussion-card {
+            background: #f8f9fa;
+            border-radius: 12px;
+            padding: 25px;
+            border-left: 5px solid #667eea;
+            transition: all 0.3s;
+            cursor: pointer;
+            position: relative;
+        }
+
+        .virtual-list {
+            position: relative;
+        }
+
+        .virtual-window {
+            position: absolute;
+            top: 0;
+            left: 0;
+            right: 0;
+            grid-auto-rows: 280px;  /* grown by the script to fit the tallest card */
+        }
+
+        /* Fixed-height rows: bound every card's text so the script's row height holds */
+        .virtual-window .discussion-card {
+            overflow: hidden;
+        }
+
+        .virtual-window .discussion-title {
+            display: -webkit-box;
+            -webkit-line-clamp: 2;
+            -webkit-box-orient: vertical;
+            overflow: hidden;
+        }
+
+        .virtual-window .discussion-meta {
+            flex-wrap: nowrap;
+            overflow: hidden;
+        }
+
+        .virtual-window .badge {
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+            min-width: 0;
+        }
+
+        .virtual-window .card-loading {
+            background: linear-gradient(90deg, #f8f9fa, #eef0f3, #f8f9fa);
+        }
+
+        .discussion-card:hover {
+            transform: translateY(-5px);
+            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
+        }
+
+        .discussion-header {
+            margin-bottom: 15px;
+        }
+
+        .discussion-title {
+            font-size: 18px;
+            font-weight: 600;
+            color: #333;
+            margin-bottom: 10px;
+            line-height: 1.4;
+            padding-right: 90px;
+        }
+
+        .discussion-meta {
+            display: flex;
+            gap: 10px;
+            flex-wrap: wrap;
+            margin-bottom: 15px;
+        }
+
+        .badge {
+            padding: 5px 12px;
+            border-radius: 15px;
+            font-size: 12px;
+            font-weight: 600;
+        }
+
+        .badge-reddit { background: #ff4500; color: white; }
+        .badge-mastodon { background: #6364ff; color: white; }
+        .badge-patient { background: #0066cc; color: white; }
+        .badge-inspire { background: #00aaff; color: white; }
+        .badge-stack-exchange { background: #f48024; color: white; }
+        .badge-rss { background: #ff6600; color: white; }
+
+        .badge-source {
+            background: #e0e0e0;
+            color: #666;
+        }
+
+        .engagement-badge {
+            position: absolute;
+            top: 15px;
+            right: 15px;
+            background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
+            color: white;
+            padding: 5px 12px;
+            border-radius: 20px;
+            font-size: 12px;
+            font-weight: 700;
+        }
+
+        .engagement-medium {
+            background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
+        }
+
+        .engagement-low {
+            background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%);
+        }
+
+        .discussion-content {
+            color: #666;
+            line-height: 1.6;
+            margin-bottom: 15px;
+            display: -webkit-box;
+            -webkit-line-clamp: 4;
+            -webkit-box-orient: vertical;
+            overflow: hidden;
+        }
+
+        .discussion-stats {
+            display: flex;
+            gap: 15px;
+            color: #999;
+            font-size: 13px;
+        }
+
+        .discussion-link {
+            display: inline-block;
+            margin-top: 10px;
+            color: #667eea;
+            text-decoration: none;
+            font-weight: 600;
+            transition: color 0.3s;
+        }
+
+        .discussion-link:hover {
+            color: #764ba2;
+        }
+
+        .filter-bar {
+            background: #f8f9fa;
+            padding: 20px;
+            border-radius: 10px;
+            margin-bottom: 30px;
+            display: flex;
+            gap: 10px;
+            flex-wrap: wrap;
+            align-items: center;
+        }
+
+        .filter-label {
+            font-weight: 600;
+            color: #666;
+        }
+
+        .filter-btn {
+            padding: 8px 16px;
+            border: 2px solid #667eea;
+            background: white;
+            color: #667eea;
+            border-radius: 20px;
+            cursor: pointer;
+            font-size: 14px;
+            transition: all 0.3s;
+        }
+
+        .filter-btn:hover, .filter-btn.active {
+            background: #667eea;
+            color: white;
+        }
+
+        .platform-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
+            gap: 20px;
+        }
+
+        .platform-card {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 30px;
+            border-radius: 12px;
+            text-align: center;
+        }
+
+        .platform-name {
+            font-size: 24px;
+            font-weight: bold;
+            margin-bottom: 10px;
+        }
+
+        .platform-count {
+            font-size: 42px;
+            font-weight: bold;
+            margin-bottom: 10px;
+        }
+
+        .platform-label {
+            font-size: 14px;
+            opacity: 0.9;
+        }
+
+        @media (max-width: 768px) {
+            .discussions-grid {
+                grid-template-columns: 1fr;
+            }
+
+            .stats-bar {
+                grid-template-columns: 1fr 1fr;
+            }
+        }
+$extra_css    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>💬 Women's Health Discussion Hub</h1>
+            <p>Aggregated from Reddit, Mastodon, Patient.info, Inspire, Stack Exchange &amp; RSS</p>
+            <p class="sub">Last Updated $last_updated</p>
+        </div>
+
+        <div class="stats-bar">
+            <div class="stat-item">
+                <div class="stat-number">$total</div>
+                <div class="stat-label">Total Discussions</div>
+            </div>
+            <div class="stat-item">
+                <div class="stat-number">$platforms</div>
+                <div class="stat-label">Platforms</div>
+            </div>
+            <div class="stat-item">
+                <div class="stat-number">$categories</div>
+                <div class="stat-label">Categories</div>
+            </div>
+            <div class="stat-item">
+                <div class="stat-number">$recent_24h</div>
+                <div class="stat-label">Last 24 Hours</div>
+            </div>
+            <div class="stat-item">
+                <div class="stat-number">$recent_7d</div>
+                <div class="stat-label">Last 7 Days</div>
+            </div>
+        </div>
+
+        <div class="tabs">
+            <button class="tab active" onclick="showTab(0)">📋 All Discussions</button>
+            <button class="tab" onclick="showTab(1)">🏥 By Condition</button>
+            <button class="tab" onclick="showTab(2)">📱 By Platform</button>
+            <button class="tab" onclick="showTab(3)">📊 Analytics</button>
+        </div>
+
+        <div class="content">
+            <!-- Tab 0: All Discussions -->
+            <div class="tab-pane active" id="tab-0">
+                <div class="filter-bar">
+                    <span class="filter-label">Filter by platform:</span>
+                    <button class="filter-btn active" data-platform="all" onclick="filterPlatform(this)">All</button>
+""")
+
+PLATFORM_BUTTON = Template("""\
+                    <button class="filter-btn" data-platform="$platform" onclick="filterPlatform(this)">$label</button>
+""")
+
+CONDITION_SELECT_OPEN = """
+                    <span class="filter-label" style="margin-left:20px;">By condition:</span>
+                    <select id="condition-filter">
+                        <option value="all">All</option>
+"""
+
+CONDITION_OPTION = Template("""\
+                        <option value="$value">$value</option>
+""")
+
+ALL_DISCUSSIONS_OPEN = """\
+                    </select>
+
+                    <input id="search-input" type="text"
+                           placeholder="Search groups (2–3 keywords)..."
+                           style="flex:1; min-width:220px; padding:8px 12px; border-radius:20px; border:1px solid #ccc;">
+                </div>
+"""
+
+STATIC_GRID_OPEN = """\
+
+                <div class="discussions-grid" id="all-discussions">
+"""
+
+STATIC_GRID_CLOSE = """\
+                </div>
+"""
+
+VIRTUAL_GRID = Template("""\
+
+                <div class="virtual-list" id="all-discussions">
+                    <div class="discussions-grid virtual-window"></div>
+                </div>
+                <script type="application/json" id="discussion-data">$data</script>
+""")
+
+CARD = Template("""\
+                    <div class="discussion-card" data-platform="$platform" data-condition="$category">
+                        <span class="engagement-badge engagement-$band">$engagement_score</span>
+                        <div class="discussion-header">
+                            <div class="discussion-title">$title</div>
+                            <div class="discussion-meta">
+                                <span class="badge badge-$badge">$platform</span>
+                                <span class="badge badge-source">$source</span>
+                            </div>
+                        </div>
+                        <div class="discussion-content">$content</div>
+                        <div class="discussion-stats">$metrics</div>
+                        <a href="$url" target="_blank" class="discussion-link">Read More →</a>
+                    </div>
+""")
+
+SEARCH_INDEX = Template("""\
+                <script type="application/json" id="search-index">$index</script>
+""")
+
+ALL_DISCUSSIONS_CLOSE = """\
+            </div>
+
+            <!-- Tab 1: By Condition -->
+            <div class="tab-pane" id="tab-1">
+"""
+
+CATEGORY_OPEN = Template("""\
+                <div class="category-section">
+                    <div class="category-header">
+                        <div class="category-title">
+                            <span>🏥</span>
+                            <span>$category</span>
+                        </div>
+                        <div class="category-count">$count discussions</div>
+                    </div>
+                    <div class="discussions-grid"$grid_attrs>
+""")
+
+CATEGORY_CLOSE = """\
+                    </div>
+                </div>
+"""
+
+PLATFORMS_OPEN = """\
+            </div>
+
+            <!-- Tab 2: By Platform -->
+            <div class="tab-pane" id="tab-2">
+                <div class="platform-grid">
+"""
+
+PLATFORM_CARD = Template("""\
+                    <div class="platform-card">
+                        <div class="platform-name">$platform</div>
+                        <div class="platform-count">$count</div>
+                        <div class="platform-label">Discussions</div>
+                    </div>
+""")
+
+ANALYTICS_OPEN = """\
+                </div>
+            </div>
+
+            <!-- Tab 3: Analytics -->
+            <div class="tab-pane" id="tab-3">
+                <div class="category-section">
+                    <h2 class="category-title">📊 Condition Distribution</h2>
+                    <div style="margin-top: 20px;">
+"""
+
+ANALYTICS_BAR = Template("""\
+                        <div style="margin-bottom: 25px;">
+                            <div style="display: flex; justify-content: space-between; margin-bottom: 8px;">
+                                <span style="font-weight: 600; color: #333;">$category</span>
+                                <span style="color: #666;">$count discussions ($percentage%)</span>
+                            </div>
+                            <div style="background: #e0e0e0; height: 35px; border-radius: 20px; overflow: hidden;">
+                                <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                                            width: $bar_width%; height: 100%; transition: width 0.5s;
+                                            display: flex; align-items: center; padding-left: 15px;
+                                            color: white; font-weight: 600;"></div>
+                            </div>
+                        </div>
+""")
+
+SCRIPT_OPEN = """\
+                    </div>
+                </div>
+            </div>
+        </div>
+    </div>
+
+    <script>
+        function showTab(index) {
+            document.querySelectorAll('.tab-pane').forEach(pane => {
+                pane.classList.remove('active');
+            });
+            document.querySelectorAll('.tab').forEach(tab => {
+                tab.classList.remove('active');
+            });
+
+            document.getElementById('tab-' + index).classList.add('active');
+            document.querySelectorAll('.tab')[index].classList.add('active');
+            document.dispatchEvent(new CustomEvent('tabshown', {detail: index}));
+        }
+
+        // Inverted index built by search_index.py: card id = position in #all-discussions.
+        // Virtual pages keep it in a sidecar file ({"src": ...}), fetched on first use.
+        let INDEX = JSON.parse(document.getElementById('search-index').textContent);
+        let BYTES = 0;
+        let indexReady = null;
+        const bitsetCache = new Map();
+
+        function fetchJson(url) {
+            return fetch(url).then(response => {
+                if (!response.ok) throw new Error('HTTP ' + response.status);
+                return response.json();
+            });
+        }
+
+        function loadIndex() {
+            if (!indexReady) {
+                indexReady = (INDEX.src ? fetchJson(INDEX.src) : Promise.resolve(INDEX))
+                    .then(index => {
+                        INDEX = index;
+                        BYTES = (INDEX.size + 7) >> 3;
+                    })
+                    .catch(err => {
+                        indexReady = null;
+                        throw err;
+                    });
+            }
+            return indexReady;
+        }
+
+        function decodeBitset(b64) {
+            const bin = atob(b64);
+            const bits = new Uint8Array(BYTES);
+            for (let i = 0; i < bin.length; i++) bits[i] = bin.charCodeAt(i);
+            return bits;
+        }
+
+        function namedBitset(kind, name) {
+            const key = kind + ':' + name;
+            if (!bitsetCache.has(key)) {
+                const b64 = INDEX[kind][name];
+                bitsetCache.set(key, b64 === undefined ? new Uint8Array(BYTES) : decodeBitset(b64));
+            }
+            return bitsetCache.get(key);
+        }
+
+        // First token >= prefix in the sorted token list
+        function lowerBound(prefix) {
+            let lo = 0, hi = INDEX.tokens.length;
+            while (lo < hi) {
+                const mid = (lo + hi) >> 1;
+                if (INDEX.tokens[mid] < prefix) lo = mid + 1; else hi = mid;
+            }
+            return lo;
+        }
+
+        // Union of the postings of every token starting with `term`
+        function termBitset(term) {
+            const key = 'term:' + term;
+            if (bitsetCache.has(key)) return bitsetCache.get(key);
+
+            const bits = new Uint8Array(BYTES);
+            for (let t = lowerBound(term); t < INDEX.tokens.length && INDEX.tokens[t].startsWith(term); t++) {
+                let id = 0;
+                for (const delta of INDEX.postings[t]) {
+                    id += delta;
+                    bits[id >> 3] |= 1 << (id & 7);
+                }
+            }
+            bitsetCache.set(key, bits);
+            return bits;
+        }
+
+        function applyFilters() {
+            loadIndex().then(filterWithIndex).catch(err => console.error('Search index unavailable:', err));
+        }
+
+        function filterWithIndex() {
+            const activeBtn = document.querySelector('.filter-btn.active');
+            const platform = activeBtn ? activeBtn.dataset.platform : 'all';
+            const condition = document.getElementById('condition-filter').value || 'all';
+            const q = (document.getElementById('search-input').value || '').toLowerCase().trim();
+
+            const sets = [];
+            if (platform !== 'all') sets.push(namedBitset('platforms', platform));
+            if (condition !== 'all') sets.push(namedBitset('conditions', condition));
+            if (q.length >= 2) {
+                const terms = q.match(/[\\p{L}\\p{N}]+/gu) || [];
+                terms.filter(x => x.length > 1).forEach(term => sets.push(termBitset(term)));
+            }
+
+            const result = new Uint8Array(BYTES).fill(0xff);
+            sets.forEach(bits => {
+                for (let i = 0; i < BYTES; i++) result[i] &= bits[i];
+            });
+
+            showMatches(result);
+        }
+"""
+
+SHOW_STATIC = """
+        const CARDS = document.querySelectorAll('#all-discussions .discussion-card');
+        const shown = new Uint8Array(CARDS.length).fill(1);
+
+        // Only touch the cards whose visibility changes
+        function showMatches(result) {
+            for (let id = 0; id < CARDS.length; id++) {
+                const visible = (result[id >> 3] >> (id & 7)) & 1;
+                if (shown[id] !== visible) {
+                    CARDS[id].style.display = visible ? 'block' : 'none';
+                    shown[id] = visible;
+                }
+            }
+        }
+"""
+
+SHOW_VIRTUAL = """
+        // Windowed grid: only rows in or near the viewport exist in the DOM. The card
+        // data is inline (DATA.rows) or split into sidecar chunks fetched on demand.
+        const DATA = JSON.parse(document.getElementById('discussion-data').textContent);
+        const LIST = document.getElementById('all-discussions');
+        const WINDOW = LIST.querySelector('.virtual-window');
+        const CARD_WIDTH = 400, GAP = 20, OVERSCAN = 3;
+        let rowHeight = 300;  // card + gap, grown to fit the tallest card rendered so far
+        let matches = Array.from({length: DATA.size}, (_, id) => id);
+        let columns = 1;
+        let renderedRange = '';
+
+        const chunks = new Map();  // chunk number -> its rows, or null while fetching
+        if (DATA.rows) chunks.set(0, DATA.rows);
+
+        function cardRow(id) {
+            const n = Math.floor(id / DATA.chunk_rows);
+            if (!chunks.has(n)) {
+                chunks.set(n, null);
+                fetchJson(DATA.chunks[n])
+                    .then(rows => chunks.set(n, rows))
+                    .catch(err => {
+                        chunks.delete(n);  // try again on the next scroll
+                        console.error('Could not load cards:', err);
+                    })
+                    .then(() => {
+                        renderedRange = '';
+                        renderWindow();
+                    });
+            }
+            const rows = chunks.get(n);
+            return rows ? rows[id % DATA.chunk_rows] : null;
+        }
+
+        function esc(value) {
+            return String(value == null ? '' : value).replace(/[&<>"']/g,
+                c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'})[c]);
+        }
+
+        function cardHtml(row) {
+            const [platform, category, score, band, title, source, content, url, metrics] = row;
+            const icons = ['⬆️', '💬', '💬'];
+            const stats = metrics.map((n, i) => n == null ? '' : '<span>' + icons[i] + ' ' + esc(n) + '</span>').join('');
+            return '<div class="discussion-card" data-platform="' + esc(DATA.platforms[platform]) +
+                '" data-condition="' + esc(DATA.categories[category]) + '">' +
+                '<span class="engagement-badge engagement-' + esc(band) + '">' + score + '</span>' +
+                '<div class="discussion-header"><div class="discussion-title">' + esc(title) + '</div>' +
+                '<div class="discussion-meta"><span class="badge badge-' + DATA.badges[platform] + '">' +
+                esc(DATA.platforms[platform]) + '</span><span class="badge badge-source">' + esc(source) +
+                '</span></div></div>' +
+                '<div class="discussion-content">' + esc(content || 'No content available') + '</div>' +
+                '<div class="discussion-stats">' + stats + '</div>' +
+                '<a href="' + esc(url) + '" target="_blank" class="discussion-link">Read More →</a></div>';
+        }
+
+        function renderWindow() {
+            if (!LIST.offsetParent) return;  // tab hidden
+            const rows = Math.ceil(matches.length / columns);
+            const top = -LIST.getBoundingClientRect().top;
+            const first = Math.max(0, Math.min(rows - 1, Math.floor(top / rowHeight)) - OVERSCAN);
+            const last = Math.min(rows, Math.ceil((top + window.innerHeight) / rowHeight) + OVERSCAN);
+            const range = first + ':' + last;
+            if (range === renderedRange) return;
+
+            renderedRange = range;
+            WINDOW.style.transform = 'translateY(' + first * rowHeight + 'px)';
+            WINDOW.innerHTML = matches.slice(first * columns, Math.max(first, last) * columns)
+                .map(id => {
+                    const row = cardRow(id);
+                    return row ? cardHtml(row) : '<div class="discussion-card card-loading"></div>';
+                }).join('');
+            fitRows();
+        }
+
+        // Rows are as tall as the tallest card seen, so no card is cut short
+        function fitRows() {
+            let tallest = 0;
+            for (const card of WINDOW.children) tallest = Math.max(tallest, card.scrollHeight);
+            if (tallest + GAP > rowHeight) {
+                rowHeight = tallest + GAP;
+                WINDOW.style.gridAutoRows = tallest + 'px';
+                layout();
+            }
+        }
+
+        // Same column count as the grid's repeat(auto-fill, minmax(400px, 1fr))
+        function layout() {
+            columns = Math.max(1, Math.floor((LIST.clientWidth + GAP) / (CARD_WIDTH + GAP)));
+            LIST.style.height = Math.ceil(matches.length / columns) * rowHeight + 'px';
+            renderedRange = '';
+            renderWindow();
+        }
+
+        function showMatches(result) {
+            matches = [];
+            for (let id = 0; id < DATA.size; id++) {
+                if ((result[id >> 3] >> (id & 7)) & 1) matches.push(id);
+            }
+            layout();
+        }
+
+        window.addEventListener('scroll', renderWindow, {passive: true});
+        window.addEventListener('resize', layout);
+        document.addEventListener('tabshown', layout);
+        layout();
+"""
+
+SCRIPT_CLOSE = """
+        function filterPlatform(button) {
+            document.querySelectorAll('.filter-btn').forEach(btn => btn.classList.remove('active'));
+            button.classList.add('active');
+            applyFilters();
+        }
+
+        document.getElementById('condition-filter').addEventListener('change', applyFilters);
+        document.getElementById('search-input').addEventListener('input', function () {
+            const v = this.value;
+            if (v.length >= 2 || v.length === 0) {
+                applyFilters();
+            }
+        });
+    </script>
+</body>
+</html>
+"""
+
+
+# ========== FRAGMENTS ==========
+def badge_class(platform: str) -> str:
+    return BADGE_CLASSES.get(platform) or platform.lower().replace(' ', '-').replace('.', '-')
+
+
+def render_metrics(disc: Dict[str, Any]) -> str:
+    spans = []
+    if 'score' in disc:
+        spans.append(f"<span>⬆️ {escape(str(disc['score']))}</span>")
+    if 'num_comments' in disc:
+        spans.append(f"<span>💬 {escape(str(disc['num_comments']))}</span>")
+    if 'replies' in disc:
+        spans.append(f"<span>💬 {escape(str(disc['replies']))}</span>")
+    if disc.get('duplicates'):
+        also = ', '.join(sorted({d.get('source') or d.get('platform') or '' for d in disc['duplicates']}))
+        spans.append(f"<span title=\"Also posted in {escape(also)}\">🔁 {len(disc['duplicates'])}</span>")
+    return ''.join(spans)
+
+
+def card_rows(discussions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compact JSON payload for the virtual grid: lookup tables plus one array per card"""
+    platforms: Dict[str, int] = {}
+    categories: Dict[str, int] = {}
+    rows = []
+    for disc in discussions:
+        platform = platforms.setdefault(disc.get('platform', ''), len(platforms))
+        category = categories.setdefault(disc.get('category', ''), len(categories))
+        rows.append([
+            platform,
+            category,
+            disc.get('engagement_score', 0),
+            disc.get('engagement_band', 'low'),
+            disc.get('title', ''),
+            disc.get('source', ''),
+            disc.get('content', ''),
+            disc.get('url', ''),
+            [disc.get('score'), disc.get('num_comments'), disc.get('replies')],
+        ])
+    return {
+        'platforms': list(platforms),
+        'badges': [badge_class(platform) for platform in platforms],
+        'categories': list(categories),
+        'rows': rows,
+    }
+
+
+def write_card_chunks(payload: Dict[str, Any], sidecars: ShardWriter,
+                      chunk_rows: int = VIRTUAL_CHUNK_ROWS) -> Dict[str, Any]:
+    """Move card_rows()' rows into JSON sidecar chunks, leaving their URLs in the payload"""
+    rows = payload.pop('rows')
+    payload['chunks'] = []
+    for n, start in enumerate(range(0, len(rows), chunk_rows)):
+        with sidecars.open(f"cards-{n}", '.json') as f:
+            json.dump(rows[start:start + chunk_rows], f, ensure_ascii=False, separators=(',', ':'))
+        payload['chunks'].append(sidecars.url(f"cards-{n}", '.json'))
+    payload['chunk_rows'] = chunk_rows
+    return payload
+
+
+def render_card(disc: Dict[str, Any]) -> str:
+    """One discussion card, every scraped field HTML-escaped"""
+    platform = disc.get('platform', '')
+    return CARD.substitute(
+        platform=escape(platform),
+        category=escape(disc.get('category', '')),
+        band=escape(disc.get('engagement_band', 'low')),
+        engagement_score=disc.get('engagement_score', 0),
+        title=escape(disc.get('title', '')),
+        badge=badge_class(platform),
+        source=escape(disc.get('source', '')),
+        content=escape(disc.get('content') or 'No content available'),
+        metrics=render_metrics(disc),
+        url=escape(disc.get('url', '')),
+    )
+
+
+# ========== PAGE ==========
+def render_dashboard(out: TextIO, stats: Dict[str, Any], recent: Iterable[Dict[str, Any]],
+                     by_category: Dict[str, List[Dict[str, Any]]], last_updated: str,
+                     cards_per_category: int = 30, virtual: bool = False,
+                     shards: Optional[ShardWriter] = None, sidecars: Optional[ShardWriter] = None) -> None:
+    """
+    Stream the whole dashboard to `out`, one fragment at a time. `shards`
+    lazy-loads the condition sections, `sidecars` the virtual grid's data.
+    """
+    write = out.write
+
+    write(PAGE_HEAD.substitute(
+        extra_css=LAZY_SHARD_CSS if shards is not None else '',
+        last_updated=escape(last_updated),
+        total=stats['total'],
+        platforms=len(stats['by_platform']),
+        categories=len(stats['by_category']),
+        recent_24h=stats['recent_24h'],
+        recent_7d=stats['recent_7d'],
+    ))
+    for label, platform in PLATFORM_FILTERS:
+        write(PLATFORM_BUTTON.substitute(platform=escape(platform), label=escape(label)))
+
+    write(CONDITION_SELECT_OPEN)
+    for category in sorted(stats['by_category']):
+        write(CONDITION_OPTION.substitute(value=escape(category)))
+
+    # Tab 0: most recently fetched, all platforms, plus the index its filter searches
+    recent = list(recent)
+    write(ALL_DISCUSSIONS_OPEN)
+    index = build_search_index(recent)
+    if virtual:
+        payload = card_rows(recent)
+        payload['size'] = len(recent)
+        if sidecars is not None:
+            payload = write_card_chunks(payload, sidecars)
+            with sidecars.open('search-index', '.json') as f:
+                f.write(to_data_island(index))
+            index = {'src': sidecars.url('search-index', '.json')}
+        else:
+            payload['chunk_rows'] = max(len(recent), 1)
+        write(VIRTUAL_GRID.substitute(data=to_data_island(payload)))
+    else:
+        write(STATIC_GRID_OPEN)
+        for disc in recent:
+            write(render_card(disc))
+        write(STATIC_GRID_CLOSE)
+    write(SEARCH_INDEX.substitute(index=to_data_island(index)))
+    write(ALL_DISCUSSIONS_CLOSE)
+
+    # Tab 1: top cards of each condition, biggest conditions first
+    ordered = sorted(by_category.items(), key=lambda x: stats['by_category'][x[0]], reverse=True)
+    for position, (category, discs) in enumerate(ordered):
+        sharded = shards is not None and position > 0
+        grid_attrs = f' data-shard="{escape(shards.url(category))}"' if sharded else ''
+        write(CATEGORY_OPEN.substitute(category=escape(category), count=stats['by_category'][category],
+                                       grid_attrs=grid_attrs))
+        if sharded:
+            with shards.open(category) as shard:
+                for disc in discs[:cards_per_category]:
+                    shard.write(render_card(disc))
+        else:
+            for disc in discs[:cards_per_category]:
+                write(render_card(disc))
+        write(CATEGORY_CLOSE)
+
+    # Tab 2: per-platform totals
+    write(PLATFORMS_OPEN)
+    for platform, count in sorted(stats['by_platform'].items(), key=lambda x: x[1], reverse=True):
+        write(PLATFORM_CARD.substitute(platform=escape(platform), count=count))
+
+    # Tab 3: condition distribution
+    write(ANALYTICS_OPEN)
+    max_count = max(stats['by_category'].values()) if stats['by_category'] else 1
+    for category, count in sorted(stats['by_category'].items(), key=lambda x: x[1], reverse=True):
+        percentage = (count / stats['total'] * 100) if stats['total'] > 0 else 0
+        bar_width = (count / max_count * 100) if max_count > 0 else 0
+        write(ANALYTICS_BAR.substitute(category=escape(category), count=count,
+                                       percentage=f"{percentage:.1f}", bar_width=bar_width))
+
+    write(SCRIPT_OPEN)
+    write(SHOW_VIRTUAL if virtual else SHOW_STATIC)
+    if shards is not None:
+        write(LAZY_SHARD_SCRIPT)
+    write(SCRIPT_CLOSE)
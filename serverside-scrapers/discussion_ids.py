@@ -0,0 +1,102 @@
+"""
+Stable discussion IDs
+
+Scraped sources without a native post id (HealthUnlocked, Patient.info,
+Inspire, RSS) are keyed by a digest of their canonical URL, and Mastodon toots
+by a digest of their ActivityPub uri, which is the same on every instance. Unlike the built-in
+hash(), which is salted per process, the same thread gets the same id on every
+run, so complete_health_data.json files from different runs can be merged and
+diffed by key.
+"""
+
+import hashlib
+import re
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+ID_DIGEST_LENGTH = 16  # hex chars of sha1, 64 bits
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid',
+    'ref', 'ref_src', 'cmpid', 'src', 'share', 'igshid', 'si',
+}
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+# Ids produced by the old hash(link) scheme, e.g. "patient_-4312098123"
+LEGACY_HASH_ID = re.compile(r'^(healthunlocked|patient|inspire|rss)_-?\d+$')
+# Toots used to be keyed by their instance-local id, e.g. "mastodon_1122334455"
+LEGACY_MASTODON_ID = re.compile(r'^mastodon_\d+$')
+MASTODON_WEB_URL = re.compile(r'^https://([^/]+)/@([^/@]+)/(\d+)/?$')
+
+
+def _is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url):
+    """
+    Normalize a URL so trivially different links to the same page compare equal:
+    lowercase scheme/host, no 'www.', no default port, no fragment, no tracking
+    params, sorted query, consistent percent-encoding and no trailing slash.
+    """
+    url = (url or '').strip()
+    if not url:
+        return ''
+
+    parts = urlsplit(url)
+    scheme = (parts.scheme or 'https').lower()
+    if scheme == 'http':
+        scheme = 'https'
+
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and str(parts.port) not in DEFAULT_PORTS.values():
+        host = f"{host}:{parts.port}"
+
+    path = quote(unquote(parts.path), safe="/:@!$&'()*+,;=-._~")
+    path = re.sub(r'/{2,}', '/', path)
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(k)
+    )
+
+    return urlunsplit((scheme, host, path or '/', urlencode(query), ''))
+
+
+def url_digest(url, length=ID_DIGEST_LENGTH):
+    """Truncated sha1 of the canonical URL"""
+    return hashlib.sha1(canonical_url(url).encode('utf-8')).hexdigest()[:length]
+
+
+def stable_id(prefix, url):
+    """Process-independent discussion id, e.g. 'patient_3f2a9c...'"""
+    return f"{prefix}_{url_digest(url)}"
+
+
+def mastodon_uri(url):
+    """ActivityPub uri of a toot from its Mastodon web URL, or None for other servers"""
+    match = MASTODON_WEB_URL.match(url or '')
+    if not match:
+        return None
+    host, user, status_id = match.groups()
+    return f"https://{host}/users/{user}/statuses/{status_id}"
+
+
+def migrate_legacy_id(disc):
+    """Re-key a discussion stored with an old hash(link) or local toot id. Returns the new id."""
+    disc_id = disc.get('id', '')
+    match = LEGACY_HASH_ID.match(disc_id)
+    if match and disc.get('url'):
+        disc['id'] = stable_id(match.group(1), disc['url'])
+    elif LEGACY_MASTODON_ID.match(disc_id):
+        uri = mastodon_uri(disc.get('url'))
+        if uri:
+            disc['id'] = stable_id('mastodon', uri)
+    return disc['id']
@@ -0,0 +1,125 @@
+"""
+Discussion store for the aggregator
+
+Discussions keyed by id with O(1) membership checks, so deduplicating a post
+costs the same whether we hold 2,000 discussions or 500,000. Iteration keeps
+insertion order (or the order of the last sort()), so the store can be used
+anywhere a list of discussion dicts was used before.
+
+The store also remembers which ids were inserted, replaced or removed since the
+last pop_dirty()/pop_removed(), and how much it grew since pop_growth(), so
+append-only backends only write what changed.
+"""
+
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from discussion_ids import migrate_legacy_id
+
+
+class DiscussionStore:
+    def __init__(self, discussions: Optional[Iterable[Dict[str, Any]]] = None):
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Dict[str, None] = {}  # ordered set of changed ids
+        self._removed: Dict[str, None] = {}
+        self._clean_size = 0  # len() at the last mark_clean() / pop_growth()
+        for disc in discussions or []:
+            self.upsert(disc)
+
+    @classmethod
+    def load_json(cls, path) -> 'DiscussionStore':
+        """Load a complete_health_data.json snapshot, re-keying legacy hash() ids"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        discussions = data.get('discussions', []) if isinstance(data, dict) else data
+        for disc in discussions:
+            migrate_legacy_id(disc)
+
+        store = cls(discussions)
+        store.mark_clean()
+        return store
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._by_id.values())
+
+    def __contains__(self, disc_id: str) -> bool:
+        return disc_id in self._by_id
+
+    def get(self, disc_id: str, default=None) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(disc_id, default)
+
+    def add(self, disc: Dict[str, Any]) -> bool:
+        """Insert a discussion unless its id is already stored. True if inserted."""
+        if disc['id'] in self._by_id:
+            return False
+        self._by_id[disc['id']] = disc
+        self._mark_dirty(disc['id'])
+        return True
+
+    def upsert(self, disc: Dict[str, Any]) -> bool:
+        """Insert or replace by id, keeping the original position. True if new."""
+        is_new = disc['id'] not in self._by_id
+        self._by_id[disc['id']] = disc
+        self._mark_dirty(disc['id'])
+        return is_new
+
+    def upsert_many(self, discussions: Iterable[Dict[str, Any]]) -> int:
+        """Upsert a batch, returns how many were new"""
+        return sum(self.upsert(disc) for disc in discussions)
+
+    def remove(self, disc_id: str) -> Optional[Dict[str, Any]]:
+        disc = self._by_id.pop(disc_id, None)
+        if disc is not None:
+            self._dirty.pop(disc_id, None)
+            self._removed[disc_id] = None
+        return disc
+
+    def sort(self, key: Callable[[Dict[str, Any]], Any], reverse: bool = False) -> None:
+        """Reorder iteration, same signature as list.sort"""
+        ordered = sorted(self._by_id.values(), key=key, reverse=reverse)
+        self._by_id = {disc['id']: disc for disc in ordered}
+
+    def diff(self, newer: 'DiscussionStore') -> Dict[str, List[str]]:
+        """Ids added, removed and changed going from this store to a newer one"""
+        added = [disc_id for disc_id in newer._by_id if disc_id not in self._by_id]
+        removed = [disc_id for disc_id in self._by_id if disc_id not in newer._by_id]
+        changed = [
+            disc_id for disc_id, disc in newer._by_id.items()
+            if disc_id in self._by_id and self._by_id[disc_id] != disc
+        ]
+        return {'added': added, 'removed': removed, 'changed': changed}
+
+    # ========== CHANGE TRACKING ==========
+    def _mark_dirty(self, disc_id: str) -> None:
+        self._dirty[disc_id] = None
+        self._removed.pop(disc_id, None)
+
+    def pop_dirty(self) -> List[Dict[str, Any]]:
+        """Discussions inserted or replaced since the last call"""
+        changed = [self._by_id[disc_id] for disc_id in self._dirty if disc_id in self._by_id]
+        self._dirty = {}
+        return changed
+
+    def pop_removed(self) -> List[str]:
+        """Ids removed since the last call"""
+        removed = list(self._removed)
+        self._removed = {}
+        return removed
+
+    def pop_growth(self) -> int:
+        """Discussions gained (or, if negative, lost) since the last call"""
+        growth = len(self._by_id) - self._clean_size
+        self._clean_size = len(self._by_id)
+        return growth
+
+    def mark_clean(self) -> None:
+        self._dirty = {}
+        self._removed = {}
+        self._clean_size = len(self._by_id)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return list(self._by_id.values())
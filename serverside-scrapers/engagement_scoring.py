@@ -0,0 +1,147 @@
+"""
+Engagement scoring for the aggregator
+
+The engagement score includes a recency bonus, so a score stored at fetch time
+goes stale as the discussion ages. Instead, scores are recomputed against
+"now" whenever we rank or render. EngagementColumns pulls the metrics of the
+whole store into NumPy arrays once; each rescore after that is a single
+vectorized pass.
+
+INSTALLATION:
+pip install numpy   # optional, falls back to a plain Python loop
+"""
+
+import re
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # optional, see engagement_score() below
+    np = None
+
+# metric -> weight
+METRIC_WEIGHTS = {
+    'score': 2,
+    'num_comments': 5,
+    'replies_count': 5,
+    'views': 0.1,
+    'likes': 2,
+}
+
+# (age in days below which, multiplier), youngest first; older discussions get 1
+RECENCY_TIERS = ((7, 2), (30, 1.5))
+
+EPOCH = datetime(1970, 1, 1)
+DAY_SECONDS = 86400
+
+# 'YYYY-MM-DDTHH:MM:SS...' - the shape of nearly every stored date. The first 19
+# chars are the naive wall time, exactly what fromisoformat().replace(tzinfo=None)
+# gives, and NumPy can parse a whole column of them at once.
+ISO_SECONDS = re.compile(r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d')
+
+
+def _date_string(disc):
+    return disc.get('created_utc', disc.get('published_at', disc.get('fetched_date', '')))
+
+
+def created_epoch(disc):
+    """Seconds since epoch of the discussion's date (naive, like datetime.now()), or None"""
+    date_str = _date_string(disc)
+    if not date_str:
+        return None
+    try:
+        post_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    return (post_date.replace(tzinfo=None) - EPOCH).total_seconds()
+
+
+def recency_multiplier(days_old):
+    for days, multiplier in RECENCY_TIERS:
+        if days_old < days:
+            return multiplier
+    return 1
+
+
+def base_score(disc):
+    """The weighted metrics, before the recency bonus"""
+    return sum((disc.get(metric) or 0) * weight for metric, weight in METRIC_WEIGHTS.items())
+
+
+def engagement_score(disc, now=None):
+    """Score a single discussion for ranking"""
+    now = now or datetime.now()
+    score = base_score(disc)
+
+    epoch = created_epoch(disc)
+    if epoch is not None:
+        days_old = (now - EPOCH).total_seconds() - epoch
+        score *= recency_multiplier(days_old // DAY_SECONDS)
+
+    return int(score)
+
+
+class EngagementColumns:
+    """Columnar view of the metrics needed for scoring, built once per store"""
+
+    def __init__(self, discussions):
+        if np is None:
+            raise ImportError("EngagementColumns needs numpy (pip install numpy)")
+
+        self.discussions = list(discussions)
+        count = len(self.discussions)
+
+        self.metrics = {
+            metric: np.fromiter((d.get(metric) or 0 for d in self.discussions), dtype=np.float64, count=count)
+            for metric in METRIC_WEIGHTS
+        }
+        self.created = self._created_epochs()
+
+        # The weighted sum does not depend on "now", so only do it once
+        self.base = np.zeros(count, dtype=np.float64)
+        for metric, weight in METRIC_WEIGHTS.items():
+            self.base += self.metrics[metric] * weight
+
+    def _created_epochs(self):
+        date_strings = [_date_string(d) for d in self.discussions]
+        is_iso = [bool(s) and ISO_SECONDS.match(s) is not None for s in date_strings]
+
+        parsed = np.array([s[:19] if iso else 'NaT' for s, iso in zip(date_strings, is_iso)],
+                          dtype='datetime64[s]')
+        created = parsed.astype(np.int64).astype(np.float64)
+        created[np.isnat(parsed)] = np.nan
+
+        # Anything else ('2025-12-22', offsets without seconds...) goes through fromisoformat
+        for i, (disc, iso) in enumerate(zip(self.discussions, is_iso)):
+            if not iso and date_strings[i]:
+                epoch = created_epoch(disc)
+                if epoch is not None:
+                    created[i] = epoch
+
+        return created
+
+    def scores(self, now=None):
+        """All engagement scores as of `now` (int64 array, same order as the discussions)"""
+        now_epoch = ((now or datetime.now()) - EPOCH).total_seconds()
+        days_old = np.floor((now_epoch - self.created) / DAY_SECONDS)
+
+        # NaN dates compare False everywhere and keep a multiplier of 1
+        with np.errstate(invalid='ignore'):
+            multiplier = np.where(days_old < 7, 2.0, np.where(days_old < 30, 1.5, 1.0))
+
+        return np.trunc(self.base * multiplier).astype(np.int64)
+
+    def apply(self, now=None):
+        """Write fresh scores back onto the discussion dicts"""
+        for disc, score in zip(self.discussions, self.scores(now).tolist()):
+            disc['engagement_score'] = score
+
+
+def rescore(discussions, now=None):
+    """Recompute engagement_score for every discussion against `now`"""
+    now = now or datetime.now()
+    if np is None:
+        for disc in discussions:
+            disc['engagement_score'] = engagement_score(disc, now)
+        return
+    EngagementColumns(discussions).apply(now)
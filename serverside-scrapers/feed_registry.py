@@ -0,0 +1,77 @@
+"""
+RSS feed registry
+
+rss_feeds.json lists the feeds the aggregator reads. It is hand-edited config
+and never written by a run:
+
+    {
+      "feeds": [
+        {"url": "https://example.org/rss", "category": "Menopause"}
+      ]
+    }
+
+"category" is used for entries the condition classifier can't place. Add a
+feed by appending {"url": ..., "category": ...}; set "enabled": false to skip
+one without losing its history.
+
+The ETag and Last-Modified validators from each feed's last 200 response are
+runtime state, kept in the crawl state's "feeds" section by URL. On
+incremental runs they are sent back as If-None-Match / If-Modified-Since, so a
+feed that has not changed answers 304 with an empty body and is neither
+downloaded nor parsed again; its entries are already in the loaded store. Full
+runs start from an empty store, so they always fetch the whole feed.
+
+    "feeds": {
+      "https://example.org/rss": {"etag": "\"5f3c\"", "last_modified": "Mon, 22 Dec 2025 15:24:00 GMT",
+                                  "last_status": 304, "last_checked": "2025-12-23T08:00:00"}
+    }
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+REGISTRY_PATH = Path("rss_feeds.json")
+
+DEFAULT_FEEDS = [
+    {'url': 'https://www.womenshealthmag.com/rss/all.xml/', 'category': "General Women's Health"},
+    {'url': 'https://www.verywellhealth.com/rss', 'category': "General Women's Health"},
+]
+
+
+class FeedRegistry:
+    def __init__(self, state, path=REGISTRY_PATH):
+        self.path = Path(path)
+        self.validators: Dict[str, Dict[str, Any]] = state.section('feeds')  # url -> validators, status
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.feeds: List[Dict[str, Any]] = json.load(f).get('feeds', [])
+        except FileNotFoundError:
+            self.feeds = [dict(feed) for feed in DEFAULT_FEEDS]
+        except json.JSONDecodeError as e:
+            print(f"⚠️ Failed to parse {self.path}: {e}. Using the default feeds.")
+            self.feeds = [dict(feed) for feed in DEFAULT_FEEDS]
+
+    def enabled(self) -> List[Dict[str, Any]]:
+        return [feed for feed in self.feeds if feed.get('enabled', True)]
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for the last copy we fetched"""
+        feed = self.validators.get(url, {})
+        headers = {}
+        if feed.get('etag'):
+            headers['If-None-Match'] = feed['etag']
+        if feed.get('last_modified'):
+            headers['If-Modified-Since'] = feed['last_modified']
+        return headers
+
+    def record(self, url: str, status: int, headers=None) -> None:
+        """Remember the outcome of a fetch and, for a 200, its new validators"""
+        feed = self.validators.setdefault(url, {})
+        feed['last_status'] = status
+        feed['last_checked'] = datetime.now().isoformat()
+        if status == 200:
+            headers = headers or {}
+            feed['etag'] = headers.get('ETag')
+            feed['last_modified'] = headers.get('Last-Modified')
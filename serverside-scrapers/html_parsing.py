@@ -0,0 +1,237 @@
+"""
+Pluggable HTML parsing for the scrapers
+
+parse_html() wraps the fastest installed backend behind one small Node API
+(select / select_one / text / attr / strings / ancestor):
+
+    selectolax   Lexbor, a C parser with its own CSS engine (fastest)
+    lxml         libxml2 with selectors precompiled to XPath by cssselect
+    bs4          BeautifulSoup on the lxml parser if present, else html.parser,
+                 with selectors precompiled by soupsieve
+
+Handlers describe what they want with Selector objects built once at import
+time instead of regex-class find_all() calls, so the same extraction code runs
+on every backend. Keep selectors to what all three support: no ":is()" and no
+case-insensitive " i" attribute flag. any_class() / any_attr() stand in for
+re.I by listing the lower, Capitalized and UPPER spelling of each fragment.
+
+only= names the tags a handler actually needs. The BeautifulSoup backend turns
+it into a SoupStrainer so only those subtrees are built. The C backends parse
+the whole page, which is still cheaper than straining in Python.
+
+INSTALLATION:
+pip install selectolax   # or: pip install lxml cssselect
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # optional, see BACKEND below
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError:  # lxml or cssselect missing
+    CSSSelector = None
+
+try:
+    import lxml  # noqa: F401  (BeautifulSoup can still use it as a parser)
+    SOUP_PARSER = 'lxml'
+except ImportError:
+    SOUP_PARSER = 'html.parser'
+
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.dammit import UnicodeDammit
+import soupsieve
+
+if LexborHTMLParser is not None:
+    BACKEND = 'selectolax'
+elif CSSSelector is not None:
+    BACKEND = 'lxml'
+else:
+    BACKEND = 'bs4'
+
+Markup = Union[str, bytes]
+
+
+def case_variants(fragment: str) -> List[str]:
+    """The spellings of `fragment` class names and ids actually use: lower, Capitalized, UPPER"""
+    return list(dict.fromkeys([fragment.lower(), fragment[:1].upper() + fragment[1:].lower(), fragment.upper()]))
+
+
+def any_attr(attr: str, tags: Sequence[str], fragments: Sequence[str]) -> str:
+    """CSS for "one of these tags whose `attr` contains one of these fragments", in any of case_variants()"""
+    return ', '.join(f'{tag}[{attr}*="{variant}"]'
+                     for tag in tags for fragment in fragments for variant in case_variants(fragment))
+
+
+def any_class(tags: Sequence[str], fragments: Sequence[str]) -> str:
+    """CSS for "one of these tags whose class contains one of these fragments"
+
+    The selector equivalent of find_all(tags, class_=re.compile('a|b|c', re.I)),
+    as far as case_variants() goes: "postContent" and "POST-BODY" match, "cOnTeNt" does not.
+    """
+    return any_attr('class', tags, fragments)
+
+
+class Selector:
+    """A CSS selector compiled once per backend and reused for every page"""
+
+    def __init__(self, css: str):
+        self.css = css
+        self._compiled: Dict[str, object] = {}
+
+    def compiled(self, backend: str):
+        if backend not in self._compiled:
+            if backend == 'lxml':
+                self._compiled[backend] = CSSSelector(self.css)
+            elif backend == 'bs4':
+                self._compiled[backend] = soupsieve.compile(self.css)
+            else:
+                self._compiled[backend] = self.css  # Lexbor caches parsed selectors itself
+        return self._compiled[backend]
+
+    def __repr__(self):
+        return f"Selector({self.css!r})"
+
+
+def _as_selector(selector) -> Selector:
+    return selector if isinstance(selector, Selector) else Selector(selector)
+
+
+# ========== NODES ==========
+class Node:
+    """Backend-neutral element handle"""
+
+    backend = ''
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def select(self, selector, limit: Optional[int] = None) -> List['Node']:
+        raise NotImplementedError
+
+    def select_one(self, selector) -> Optional['Node']:
+        found = self.select(selector, limit=1)
+        return found[0] if found else None
+
+    @property
+    def tag(self) -> str:
+        raise NotImplementedError
+
+    def text(self) -> str:
+        """All descendant text, each piece stripped (like get_text(strip=True))"""
+        return ''.join(s.strip() for s in self.strings())
+
+    def strings(self) -> Iterator[str]:
+        """Every text node under this element, in document order"""
+        raise NotImplementedError
+
+    def attr(self, name: str, default=None):
+        raise NotImplementedError
+
+    def ancestor(self, tag: str) -> Optional['Node']:
+        raise NotImplementedError
+
+
+class LexborNode(Node):
+    backend = 'selectolax'
+
+    def select(self, selector, limit=None):
+        # Lexbor reports an element once per selector in a list that it matches
+        found, seen = [], set()
+        for node in self.raw.css(_as_selector(selector).compiled(self.backend)):
+            if node.mem_id not in seen:
+                seen.add(node.mem_id)
+                found.append(LexborNode(node))
+                if limit and len(found) == limit:
+                    break
+        return found
+
+    @property
+    def tag(self):
+        return self.raw.tag
+
+    def strings(self):
+        for node in self.raw.traverse(include_text=True):
+            if node.tag == '-text':
+                yield node.text_content or ''
+
+    def attr(self, name, default=None):
+        value = self.raw.attributes.get(name)
+        return default if value is None else value
+
+    def ancestor(self, tag):
+        node = self.raw.parent
+        while node is not None:
+            if node.tag == tag:
+                return LexborNode(node)
+            node = node.parent
+        return None
+
+
+class LxmlNode(Node):
+    backend = 'lxml'
+
+    def select(self, selector, limit=None):
+        found = _as_selector(selector).compiled(self.backend)(self.raw)
+        return [LxmlNode(n) for n in (found[:limit] if limit else found)]
+
+    @property
+    def tag(self):
+        return self.raw.tag if isinstance(self.raw.tag, str) else ''
+
+    def strings(self):
+        return self.raw.itertext()
+
+    def attr(self, name, default=None):
+        return self.raw.get(name, default)
+
+    def ancestor(self, tag):
+        for node in self.raw.iterancestors(tag):
+            return LxmlNode(node)
+        return None
+
+
+class SoupNode(Node):
+    backend = 'bs4'
+
+    def select(self, selector, limit=None):
+        found = _as_selector(selector).compiled(self.backend).select(self.raw, limit=limit or 0)
+        return [SoupNode(n) for n in found]
+
+    @property
+    def tag(self):
+        return self.raw.name or ''
+
+    def strings(self):
+        return (str(s) for s in self.raw.strings)
+
+    def attr(self, name, default=None):
+        value = self.raw.get(name, default)
+        return ' '.join(value) if isinstance(value, list) else value
+
+    def ancestor(self, tag):
+        parent = self.raw.find_parent(tag)
+        return SoupNode(parent) if parent is not None else None
+
+
+# ========== ENTRY POINT ==========
+def parse_html(markup: Markup, only: Optional[Iterable[str]] = None, backend: Optional[str] = None) -> Node:
+    """Parse a page (bytes or text) with `backend` (default: fastest installed)"""
+    backend = backend or BACKEND
+    if not markup:
+        markup = '<html></html>'
+
+    if backend == 'selectolax':
+        return LexborNode(LexborHTMLParser(markup).root)
+    if backend == 'lxml':
+        # libxml2 falls back to latin-1 for bytes without a <meta charset>
+        if isinstance(markup, bytes):
+            markup = UnicodeDammit(markup, is_html=True).unicode_markup
+        return LxmlNode(lxml.html.document_fromstring(markup))
+
+    strainer = SoupStrainer(list(only)) if only else None
+    return SoupNode(BeautifulSoup(markup, SOUP_PARSER, parse_only=strainer))
@@ -0,0 +1,211 @@
+"""
+Shared HTTP client with an adaptive per-host rate limiter
+
+Every scraper request goes through get(), which waits for a token from its
+host's bucket before sending and then tunes the bucket from the response:
+
+- X-Ratelimit-Remaining / -Reset (Reddit, Mastodon, GitHub style): spread the
+  requests that are left evenly over the time until the window resets
+- 429 / 503 with Retry-After: stop sending to that host until then, halve its
+  rate and retry the request
+- any other success on a host without such headers: raise the rate a little,
+  up to that host's ceiling (additive increase, multiplicative decrease)
+
+so each host runs at what it actually allows instead of a fixed sleep. The
+buckets are shared by every thread, so concurrent crawls of one host share one
+allowance.
+
+HTTP_FIXTURES=record / replay (see http_fixtures.py) saves every response to
+disk or answers from those files instead of the network. Replayed requests
+skip the rate limiter, since no real host is being asked.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+import http_fixtures
+from run_metrics import metrics
+
+# host -> (starting requests/second, ceiling). Scraped HTML sites send no rate
+# headers, so their ceilings are what we consider polite.
+HOST_RATES: Dict[str, Tuple[float, float]] = {
+    'www.reddit.com': (0.7, 2.0),
+    'healthunlocked.com': (0.5, 2.0),
+    'community.patient.info': (0.5, 2.0),
+    'www.inspire.com': (0.35, 1.0),
+    'www.quora.com': (0.5, 1.0),
+    # Retail sites checked by updateProductInfo
+    'www.amazon.in': (0.5, 1.0),
+    'www.1mg.com': (0.5, 1.0),
+    'www.flipkart.com': (0.5, 1.0),
+    'pharmeasy.in': (0.5, 1.0),
+    'www.nykaa.com': (0.5, 1.0),
+}
+DEFAULT_RATE = (1.0, 5.0)
+MIN_RATE = 0.05  # never slower than one request per 20 s
+BURST = 2  # requests a host may get back to back after being idle
+RATE_INCREASE = 0.25  # requests/second added per plain success
+MAX_RETRIES = 2  # retries after a 429 / 503
+THROTTLED = {429, 503}
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _seconds_until(value: Optional[str]) -> Optional[float]:
+    """Retry-After / X-Ratelimit-Reset as seconds from now: delta seconds, epoch seconds or a date"""
+    value = (value or '').strip()
+    if not value:
+        return None
+    number = _number(value)
+    if number is not None:
+        # Some APIs send the reset as a Unix timestamp rather than a delay
+        return max(number - time.time(), 0.0) if number > 1e9 else max(number, 0.0)
+
+    try:
+        when = parsedate_to_datetime(value)  # HTTP date
+    except (TypeError, ValueError):
+        try:
+            when = datetime.fromisoformat(value.replace('Z', '+00:00'))  # Mastodon
+        except ValueError:
+            return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+class HostLimiter:
+    """Token bucket for one host whose rate follows the host's feedback"""
+
+    def __init__(self, rate: float, max_rate: float, burst: int = BURST):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1  # may go negative: later callers queue behind us
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def observe(self, response: requests.Response) -> Optional[float]:
+        """Adapt to a response. Returns the back-off in seconds if the host throttled us."""
+        headers = response.headers or {}
+        with self._lock:
+            now = time.monotonic()
+
+            if response.status_code in THROTTLED:
+                retry_after = _seconds_until(headers.get('Retry-After'))
+                if retry_after is None:
+                    retry_after = 1 / self.rate
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                self.rate = max(self.rate / 2, MIN_RATE)
+                return retry_after
+
+            remaining = _number(headers.get('X-Ratelimit-Remaining'))
+            reset = _seconds_until(headers.get('X-Ratelimit-Reset'))
+            if remaining is not None and reset is not None:
+                if remaining < 1:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+                else:
+                    allowance = remaining / max(reset, 1.0)
+                    self.rate = min(max(allowance, MIN_RATE), self.max_rate)
+            elif response.status_code < 400:
+                self.rate = min(self.rate + RATE_INCREASE, self.max_rate)
+            return None
+
+
+class RateLimiter:
+    """One HostLimiter per host, created on first use"""
+
+    def __init__(self, rates: Dict[str, Tuple[float, float]] = HOST_RATES):
+        self.rates = rates
+        self._hosts: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_host(self, host: str) -> HostLimiter:
+        with self._lock:
+            if host not in self._hosts:
+                rate, max_rate = self.rates.get(host, DEFAULT_RATE)
+                self._hosts[host] = HostLimiter(rate, max_rate)
+            return self._hosts[host]
+
+    def rates_now(self) -> Dict[str, float]:
+        """Current requests/second per host"""
+        with self._lock:
+            return {host: round(limiter.rate, 3) for host, limiter in self._hosts.items()}
+
+
+limiter = RateLimiter()
+fixtures: Optional[http_fixtures.FixtureStore] = http_fixtures.from_environment()
+
+
+def use_fixtures(store: Optional[http_fixtures.FixtureStore]) -> None:
+    """Record to / replay from `store` from now on; None goes back to the live network"""
+    global fixtures
+    fixtures = store
+
+
+def _replay(url: str, source: str, params) -> requests.Response:
+    try:
+        response, delay = fixtures.load(url, params)
+    except http_fixtures.FixtureMissing:
+        metrics.record_request(source, None)
+        raise
+    time.sleep(delay)
+    metrics.record_request(source, response.status_code, len(response.content), delay)
+    return response
+
+
+def get(url: str, source: Optional[str] = None, **kwargs) -> requests.Response:
+    """
+    requests.get() behind the shared per-host rate limiter, retrying when
+    throttled. Each attempt is recorded in run_metrics under `source` (the
+    platform name; defaults to the host).
+    """
+    hostname = urlsplit(url).hostname or ''
+    source = source or hostname
+    if fixtures is not None and fixtures.mode == 'replay':
+        return _replay(url, source, kwargs.get('params'))
+
+    host = limiter.for_host(hostname)
+
+    for attempt in range(MAX_RETRIES + 1):
+        wait = host.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+        start = time.perf_counter()
+        try:
+            response = requests.get(url, **kwargs)
+        except Exception:
+            metrics.record_request(source, None, latency=time.perf_counter() - start, waited=max(wait, 0.0))
+            raise
+        metrics.record_request(source, response.status_code, len(response.content or b''),
+                               time.perf_counter() - start, max(wait, 0.0))
+        if fixtures is not None:
+            fixtures.save(url, kwargs.get('params'), response)
+        backoff = host.observe(response)
+        if backoff is None or attempt == MAX_RETRIES:
+            return response
+        print(f"  ⏳ {urlsplit(url).hostname}: HTTP {response.status_code}, retrying in {backoff:.0f}s")
+
+    return response
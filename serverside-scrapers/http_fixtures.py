@@ -0,0 +1,140 @@
+"""
+Record/replay fixtures for http_client
+
+With HTTP_FIXTURES=record every response the scrapers receive is also saved
+under HTTP_FIXTURE_DIR (default http_fixtures/). With HTTP_FIXTURES=replay
+nothing goes to the network: each request is answered from those files after
+a synthetic delay, so the whole fetch-parse-score-render pipeline can be run
+and timed repeatably on a machine with no network.
+
+    HTTP_FIXTURES=record python wmhealthAggregatorComp.py
+    HTTP_FIXTURES=replay HTTP_FIXTURE_LATENCY=0.05-0.3 python wmhealthAggregatorComp.py
+
+HTTP_FIXTURE_LATENCY is "recorded" (default: the response time seen while
+recording), a fixed number of seconds such as "0.2", or a range such as
+"0.05-0.3" drawn from a seeded generator, so two replays wait the same.
+
+A request is identified by its URL and query parameters; headers are ignored,
+so conditional GETs replay the recorded 200. API keys are left out of both the
+identity and the saved files. A request with no fixture fails like a refused
+connection.
+
+    http_fixtures/
+      crawl_state.json           # the aggregator's crawl state when recording began
+      replay_output/             # data, dashboard and run report written by replays
+      www.reddit.com/
+        3f2a9c1d0b7e4a55.json    # url, params, status, headers, elapsed
+        3f2a9c1d0b7e4a55.body    # response body, byte for byte
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+FIXTURE_DIR = Path("http_fixtures")
+MODES = ('record', 'replay')
+SECRET_PARAMS = {'key', 'api_key', 'access_token', 'client_secret'}  # never saved
+DROPPED_HEADERS = {'set-cookie', 'content-encoding', 'transfer-encoding', 'content-length'}
+LATENCY_SEED = 0
+
+Latency = Union[None, float, Tuple[float, float]]  # recorded, fixed, or uniform range
+
+
+class FixtureMissing(requests.ConnectionError):
+    """Replay found no recording for a request"""
+
+
+def parse_latency(value: Optional[str]) -> Latency:
+    """HTTP_FIXTURE_LATENCY: "recorded", "0.2" or "0.05-0.3" """
+    value = (value or '').strip()
+    if not value or value == 'recorded':
+        return None
+    low, _, high = value.partition('-')
+    return (float(low), float(high)) if high else float(low)
+
+
+def request_key(url: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+    """(host, key) for a request; the query string and `params` are merged and sorted"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query += [(k, str(v)) for k, v in (params or {}).items() if v is not None]
+    query = sorted((k, v) for k, v in query if k not in SECRET_PARAMS)
+    canonical = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+    return parts.hostname or 'unknown', hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+class FixtureStore:
+    def __init__(self, mode: str, directory=FIXTURE_DIR, latency: Latency = None, seed: int = LATENCY_SEED):
+        if mode not in MODES:
+            raise ValueError(f"fixture mode must be one of {MODES}, not {mode!r}")
+        self.mode = mode
+        self.directory = Path(directory)
+        self.latency = latency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str, params) -> Tuple[Path, Path]:
+        host, key = request_key(url, params)
+        folder = self.directory / host
+        return folder / f"{key}.json", folder / f"{key}.body"
+
+    def save(self, url: str, params, response: requests.Response) -> None:
+        meta_path, body_path = self._paths(url, params)
+        meta = {
+            'url': url.split('?')[0],
+            'params': {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS},
+            'status': response.status_code,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS},
+            'encoding': response.encoding,
+            'elapsed': response.elapsed.total_seconds(),
+            'recorded_at': datetime.now().isoformat(),
+        }
+        with self._lock:
+            meta_path.parent.mkdir(parents=True, exist_ok=True)
+            body_path.write_bytes(response.content or b'')
+            meta_path.write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    def load(self, url: str, params) -> Tuple[requests.Response, float]:
+        """The recorded response and how long to wait before returning it"""
+        meta_path, body_path = self._paths(url, params)
+        try:
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+            body = body_path.read_bytes()
+        except FileNotFoundError:
+            raise FixtureMissing(f"no fixture for {url} {params or ''} in {self.directory}") from None
+
+        response = requests.Response()
+        response.status_code = meta['status']
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response._content = body
+        response.encoding = meta['encoding']
+        response.url = url
+        response.reason = 'Replayed'
+        response.elapsed = timedelta(seconds=meta['elapsed'])
+        return response, self._delay(meta['elapsed'])
+
+    def _delay(self, recorded: float) -> float:
+        if self.latency is None:
+            return recorded
+        if isinstance(self.latency, tuple):
+            with self._lock:
+                return self._random.uniform(*self.latency)
+        return float(self.latency)
+
+
+def from_environment() -> Optional[FixtureStore]:
+    """The store described by HTTP_FIXTURES / HTTP_FIXTURE_DIR / HTTP_FIXTURE_LATENCY, if any"""
+    mode = os.environ.get('HTTP_FIXTURES', '').strip().lower()
+    if not mode or mode == 'live':
+        return None
+    return FixtureStore(mode, os.environ.get('HTTP_FIXTURE_DIR') or FIXTURE_DIR,
+                        parse_latency(os.environ.get('HTTP_FIXTURE_LATENCY')))
@@ -0,0 +1,155 @@
+"""
+Append-only NDJSON storage for the aggregator
+
+Instead of rewriting one big indented JSON document every run, new and updated
+discussions are appended to complete_health_data.ndjson, one JSON object per
+line. A later line for the same id supersedes earlier ones, and a line of the
+form {"id": ..., "deleted": true} removes it. A small manifest next to the log
+holds the counts and last_updated, so nothing has to open the log just to
+show stats.
+
+Writes cost O(changed items) and never read the log: the caller says how many
+live discussions were gained or lost (DiscussionStore.pop_growth(), exact when
+the store was loaded from this log), and the manifest keeps the running total.
+Readers can stream records with iter_latest() without holding the whole corpus
+in memory. Once superseded lines make up too much of the log, compact()
+rewrites it with one line per live discussion and recounts the total.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator
+
+from discussion_store import DiscussionStore
+
+NDJSON_PATH = Path("complete_health_data.ndjson")
+
+# Compact when the log holds this many lines per live discussion...
+COMPACT_RATIO = 2.0
+# ...but don't bother for tiny logs
+COMPACT_MIN_RECORDS = 5000
+
+
+class NdjsonStorage:
+    def __init__(self, path=NDJSON_PATH, compact_ratio=COMPACT_RATIO,
+                 compact_min_records=COMPACT_MIN_RECORDS):
+        self.path = Path(path)
+        self.manifest_path = self.path.with_suffix('.manifest.json')
+        self.compact_ratio = compact_ratio
+        self.compact_min_records = compact_min_records
+        self.manifest = self._load_manifest()
+
+    # ========== MANIFEST ==========
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'last_updated': None, 'total': 0, 'records': 0, 'compacted_at': None}
+
+    def _save_manifest(self) -> None:
+        self.manifest['bytes'] = self.path.stat().st_size if self.path.exists() else 0
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    # ========== READING ==========
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Every line in the log, superseded versions and tombstones included"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _latest_lines(self) -> Dict[str, int]:
+        """id -> line number of its newest record (only ids are kept in memory)"""
+        latest = {}
+        for line_no, record in enumerate(self.iter_records()):
+            if record.get('deleted'):
+                latest.pop(record['id'], None)
+            else:
+                latest[record['id']] = line_no
+        return latest
+
+    def iter_latest(self) -> Iterator[Dict[str, Any]]:
+        """Current version of every live discussion, streamed in log order"""
+        latest = self._latest_lines()
+        keep = set(latest.values())
+        for line_no, record in enumerate(self.iter_records()):
+            if line_no in keep:
+                yield record
+
+    def load(self) -> DiscussionStore:
+        """Materialize the log as a DiscussionStore (clean, nothing to append)"""
+        store = DiscussionStore(self.iter_latest())
+        store.mark_clean()
+        return store
+
+    # ========== WRITING ==========
+    def append(self, discussions: Iterable[Dict[str, Any]], removed_ids: Iterable[str] = (),
+               growth: int = 0) -> int:
+        """
+        Append new/updated discussions and tombstones, `growth` being how many
+        live discussions that adds up to. Returns lines written.
+        """
+        lines = [json.dumps(disc, ensure_ascii=False) for disc in discussions]
+        lines += [json.dumps({'id': disc_id, 'deleted': True}) for disc_id in removed_ids]
+
+        if lines:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+
+        self.manifest['records'] = self.manifest.get('records', 0) + len(lines)
+        self.manifest['total'] = max(self.manifest.get('total', 0) + growth, 0)
+        self.manifest['last_updated'] = datetime.now().isoformat()
+        self._save_manifest()
+        return len(lines)
+
+    def needs_compaction(self) -> bool:
+        records = self.manifest.get('records', 0)
+        total = max(self.manifest.get('total', 0), 1)
+        return records >= self.compact_min_records and records / total >= self.compact_ratio
+
+    def compact(self) -> int:
+        """Rewrite the log with only the latest version of each live discussion"""
+        tmp_path = self.path.with_suffix('.ndjson.tmp')
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in self.iter_latest():
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                count += 1
+        os.replace(tmp_path, self.path)
+
+        self.manifest.update({
+            'total': count,
+            'records': count,
+            'compacted_at': datetime.now().isoformat(),
+        })
+        self._save_manifest()
+        return count
+
+    def save(self, changed: Iterable[Dict[str, Any]], removed_ids: Iterable[str] = (), growth: int = 0) -> int:
+        """Append what changed (see DiscussionStore.pop_dirty), compacting if the log has bloated"""
+        written = self.append(changed, removed_ids, growth)
+        if self.needs_compaction():
+            print(f"🧹 Compacting {self.path} ({self.manifest['records']} records)...")
+            self.compact()
+        return written
+
+    def export_json(self, path) -> int:
+        """Write a complete_health_data.json-style snapshot, streaming from the log"""
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{\n  "last_updated": %s,\n  "discussions": [\n' % json.dumps(datetime.now().isoformat()))
+            for record in self.iter_latest():
+                if count:
+                    f.write(',\n')
+                f.write('    ' + json.dumps(record, ensure_ascii=False))
+                count += 1
+            f.write('\n  ],\n  "total": %d\n}\n' % count)
+        return count
@@ -0,0 +1,285 @@
+"""
+Near-duplicate detection across platforms
+
+The same story is often cross-posted to several subreddits, reposted on
+Mastodon and syndicated through RSS, each copy with its own id. This finds
+those copies by text rather than by id:
+
+1. title + content is lowercased, stripped of HTML and URLs, and cut into
+   overlapping SHINGLE_SIZE-word shingles
+2. a NUM_PERM-value MinHash signature estimates the Jaccard similarity of any
+   two shingle sets
+3. LSH banding: the signature is split into BANDS bands of ROWS values, and
+   only discussions that agree on a whole band become candidates, so the
+   corpus is clustered in roughly linear time instead of comparing every pair
+4. candidates whose signatures agree on at least SIMILARITY_THRESHOLD of the
+   values are merged into one cluster, provided collapse() accepts the pair:
+   a different source (a subreddit, instance or feed), created within
+   CROSS_POST_WINDOW of each other, and the same numbers in their titles.
+   Recurring threads ("Self Care Saturday", "Daily Chat December 17") share a
+   templated body but are separate discussions, posted to one source days apart.
+
+collapse() then keeps the highest-engagement discussion of each cluster and
+lists the others under its 'duplicates'. Callers should skip those ids when
+they are fetched again (see duplicate_ids()).
+
+Signatures are kept between runs in a SignatureCache, keyed by id and a
+checksum of the text. On incremental runs the discussions already in the
+cache were clustered last time, so only the new or edited ones go through the
+LSH buckets, along with the few cached ones that share a band with them.
+
+INSTALLATION:
+pip install numpy   # optional, vectorized signatures (same results without it)
+"""
+
+import json
+import os
+import random
+import re
+import struct
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from engagement_scoring import created_epoch
+
+try:
+    import numpy as np
+except ImportError:  # optional, see minhash() below
+    np = None
+
+SHINGLE_SIZE = 3  # words per shingle
+MIN_WORDS = 8  # shorter texts are too generic to call duplicates
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS  # 4 rows: pairs above ~0.5 similarity usually share a band
+SIMILARITY_THRESHOLD = 0.7
+MINHASH_SEED = 1
+CROSS_POST_WINDOW = 3 * 86400  # seconds between the creation of two copies of a story
+
+SIGNATURES_PATH = Path("near_duplicate_signatures.json")
+
+TAG = re.compile(r'<[^>]+>')
+URL = re.compile(r'https?://\S+')
+WORD = re.compile(r"[a-z0-9']+")
+NUMBER = re.compile(r'\d+')
+
+# Multiply-add-shift hashing of 32-bit shingles: ((a*x + b) mod 2**64) >> 32 with
+# odd a. NumPy's uint64 arithmetic wraps at 2**64 by itself, so no modulo is needed.
+MASK64 = (1 << 64) - 1
+_rng = random.Random(MINHASH_SEED)
+PERMUTATIONS = [(_rng.getrandbits(64) | 1, _rng.getrandbits(64)) for _ in range(NUM_PERM)]
+if np is not None:
+    _A = np.array([a for a, _ in PERMUTATIONS], dtype=np.uint64)
+    _B = np.array([b for _, b in PERMUTATIONS], dtype=np.uint64)
+
+Signature = Tuple[int, ...]
+
+
+def shingles(text: str) -> List[int]:
+    """32-bit hashes of the text's word shingles; empty for texts under MIN_WORDS words"""
+    words = WORD.findall(URL.sub(' ', TAG.sub(' ', text or '')).lower())
+    if len(words) < MIN_WORDS:
+        return []
+    runs = zip(*(words[i:] for i in range(SHINGLE_SIZE)))
+    return list({zlib.crc32(' '.join(run).encode('utf-8')) for run in runs})
+
+
+def minhash(hashes: List[int]) -> Optional[Signature]:
+    if not hashes:
+        return None
+    if np is not None:
+        x = np.array(hashes, dtype=np.uint64)
+        return tuple(((x[:, None] * _A + _B) >> np.uint64(32)).min(axis=0).tolist())
+    return tuple(min(((a * x + b) & MASK64) >> 32 for x in hashes) for a, b in PERMUTATIONS)
+
+
+def signature(text: str) -> Optional[Signature]:
+    return minhash(shingles(text))
+
+
+def similarity(left: Signature, right: Signature) -> float:
+    """Estimated Jaccard similarity of the two shingle sets"""
+    return sum(x == y for x, y in zip(left, right)) / NUM_PERM
+
+
+def title_numbers(title: str) -> frozenset:
+    return frozenset(NUMBER.findall(title or ''))
+
+
+def _band_neighbours(sigs: Sequence[Optional[Signature]], fresh: Set[int]) -> List[int]:
+    """Indices outside `fresh` that agree with some fresh signature on a whole band"""
+    others = [i for i, sig in enumerate(sigs) if sig is not None and i not in fresh]
+    new = [i for i in fresh if sigs[i] is not None]
+    if not others or not new:
+        return []
+
+    if np is not None:
+        # One 64-bit key per band; a collision only adds a candidate, never hides one
+        def band_keys(indices):
+            rows = np.array([sigs[i] for i in indices], dtype=np.uint64).reshape(len(indices), BANDS, ROWS)
+            keys = np.zeros((len(indices), BANDS), dtype=np.uint64)
+            for row in range(ROWS):
+                keys = keys * np.uint64(0x9E3779B97F4A7C15) + rows[:, :, row]
+            return keys
+
+        other_keys, new_keys = band_keys(others), band_keys(new)
+        hit = np.zeros(len(others), dtype=bool)
+        for band in range(BANDS):
+            hit |= np.isin(other_keys[:, band], new_keys[:, band])
+        return [others[k] for k in np.flatnonzero(hit).tolist()]
+
+    new_bands = [{sigs[i][band * ROWS:(band + 1) * ROWS] for i in new} for band in range(BANDS)]
+    return [i for i in others
+            if any(sigs[i][band * ROWS:(band + 1) * ROWS] in new_bands[band] for band in range(BANDS))]
+
+
+def clusters(texts: Sequence[str], compatible: Optional[Callable[[int, int], bool]] = None,
+             threshold: float = SIMILARITY_THRESHOLD, sigs: Optional[Sequence[Optional[Signature]]] = None,
+             fresh: Optional[Set[int]] = None) -> List[List[int]]:
+    """
+    Indices of texts that are near-duplicates of each other, in groups of two
+    or more. `compatible(i, j)` can veto a pair; two groups are only merged if
+    every pair across them is compatible.
+
+    `sigs` are precomputed signatures of the texts. With `fresh`, only pairs
+    with at least one of those indices are compared: the others are taken to
+    have been clustered already.
+    """
+    if sigs is None:
+        sigs = [signature(text) for text in texts]
+    parent = list(range(len(texts)))
+    members = [[i] for i in range(len(texts))]  # root -> its group
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets: Dict[Tuple[int, Signature], List[int]] = {}  # band -> indices seen with it
+    order = range(len(texts))
+    if fresh is not None:
+        # Clustered texts that could pair with a fresh one go in first, without comparisons
+        for i in _band_neighbours(sigs, fresh):
+            for band in range(BANDS):
+                buckets.setdefault((band, sigs[i][band * ROWS:(band + 1) * ROWS]), []).append(i)
+        order = sorted(fresh)
+
+    for i in order:
+        sig = sigs[i]
+        if sig is None:
+            continue
+        for band in range(BANDS):
+            bucket = buckets.setdefault((band, sig[band * ROWS:(band + 1) * ROWS]), [])
+            for j in bucket:
+                root_i, root_j = find(i), find(j)
+                if root_i == root_j or similarity(sigs[j], sig) < threshold:
+                    continue
+                if compatible is not None and not all(compatible(a, b) for a in members[root_i]
+                                                      for b in members[root_j]):
+                    continue
+                parent[root_i] = root_j
+                members[root_j] += members[root_i]
+            bucket.append(i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(texts)):
+        groups.setdefault(find(i), []).append(i)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+class SignatureCache:
+    """MinHash signatures by discussion id, saved between runs"""
+
+    def __init__(self, path=SIGNATURES_PATH):
+        self.path = Path(path)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._by_id = json.load(f)  # id -> [crc32 of the text, signature as hex]
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._by_id = {}
+
+    def signatures(self, ids: Sequence[str], texts: Sequence[str]) -> Tuple[List[Optional[Signature]], Set[int]]:
+        """
+        Signatures of the texts, and the indices that were not cached (new or
+        edited since). Only these ids are kept for the next save().
+        """
+        sigs, fresh, by_id = [], set(), {}
+        for i, (disc_id, text) in enumerate(zip(ids, texts)):
+            checksum = zlib.crc32(text.encode('utf-8'))
+            cached = self._by_id.get(disc_id)
+            if cached is not None and cached[0] == checksum:
+                sig = struct.unpack(f'>{NUM_PERM}I', bytes.fromhex(cached[1])) if cached[1] else None
+            else:
+                sig = signature(text)
+                fresh.add(i)
+            sigs.append(sig)
+            by_id[disc_id] = [checksum, struct.pack(f'>{NUM_PERM}I', *sig).hex() if sig else '']
+        self._by_id = by_id
+        return sigs, fresh
+
+    def save(self) -> None:
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._by_id, f)
+        os.replace(tmp_path, self.path)
+
+
+def _link(disc: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: disc.get(key) for key in ('id', 'platform', 'source', 'url', 'title')}
+
+
+def duplicate_ids(discussions: Iterable[Dict[str, Any]]) -> Set[str]:
+    """Ids of every copy collapse() has folded into one of `discussions`"""
+    return {link['id'] for disc in discussions for link in disc.get('duplicates', [])}
+
+
+def collapse(store, cache: Optional[SignatureCache] = None, incremental: bool = False) -> Tuple[int, int]:
+    """
+    Keep the highest-engagement discussion of each near-duplicate cluster in
+    `store` (a DiscussionStore) and remove the rest, recording them under the
+    kept one's 'duplicates'. Links from earlier runs are carried over.
+    Signatures come from `cache` when given; `incremental` then only compares
+    the discussions it did not have. Returns (clusters, discussions removed).
+    """
+    discussions = list(store)
+
+    @lru_cache(maxsize=None)  # only candidate pairs ever get here
+    def traits(i: int) -> Tuple[Set[Any], Optional[float], frozenset]:
+        d = discussions[i]
+        # A discussion speaks for its own source and those of the copies it already links
+        sources = {d.get('source')} | {link.get('source') for link in d.get('duplicates', [])}
+        return sources, created_epoch(d), title_numbers(d.get('title', ''))
+
+    def compatible(i: int, j: int) -> bool:
+        (sources_i, created_i, numbers_i), (sources_j, created_j, numbers_j) = traits(i), traits(j)
+        if sources_i & sources_j or numbers_i != numbers_j:
+            return False
+        return created_i is None or created_j is None or abs(created_i - created_j) <= CROSS_POST_WINDOW
+
+    texts = [f"{d.get('title', '')} {d.get('content', '')}" for d in discussions]
+    sigs, fresh = None, None
+    if cache is not None:
+        sigs, fresh = cache.signatures([d['id'] for d in discussions], texts)
+    groups = clusters(texts, compatible, sigs=sigs, fresh=fresh if incremental else None)
+
+    removed = 0
+    for group in groups:
+        members = sorted((discussions[i] for i in group),
+                         key=lambda d: d.get('engagement_score', 0), reverse=True)
+        keep = members[0]
+
+        links = {link['id']: link for link in keep.get('duplicates', [])}
+        for disc in members[1:]:
+            for link in disc.get('duplicates', []):
+                links.setdefault(link['id'], link)
+            links[disc['id']] = _link(disc)
+            store.remove(disc['id'])
+            removed += 1
+        links.pop(keep['id'], None)
+
+        if list(links.values()) != keep.get('duplicates'):
+            store.upsert({**keep, 'duplicates': list(links.values())})
+    return len(groups), removed
@@ -0,0 +1,263 @@
+"""
+Page and feed parsers for the aggregator's scraped sources
+
+Each parser is a plain module-level function taking the raw response bytes,
+the page URL and the job context, and returning plain discussion dicts. They
+hold no aggregator state, so crawl_engine can run them in a process pool while
+the fetchers keep downloading. The aggregator's handlers only merge the
+results.
+
+Categories are filled in once per page with a single classifier batch.
+"""
+
+import calendar
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import feedparser
+
+from condition_classifier import DEFAULT_CATEGORY, categorize_many
+from discussion_ids import stable_id
+from html_parsing import Selector, any_attr, any_class, parse_html
+
+Discussion = Dict[str, Any]
+
+# ========== SELECTORS ==========
+# Compiled once per process, used for every page (see html_parsing.py)
+DIGITS = re.compile(r'\d+')
+
+HU_POST = Selector('article')
+HU_TITLE = Selector('h2, h3, a')
+HU_CONTENT = Selector(any_class(['p', 'div'], ['content', 'text', 'body']))
+
+PATIENT_ROW = Selector(any_class(['tr'], ['topic-list-item']))
+PATIENT_TITLE = Selector(any_class(['a'], ['title']))
+PATIENT_EXCERPT = Selector(any_class(['span'], ['excerpt']))
+PATIENT_REPLIES = Selector(any_class(['td'], ['posts', 'replies']))
+PATIENT_CELLS = Selector('td')
+
+INSPIRE_PAGE_TITLE = Selector('title')
+INSPIRE_POST = Selector(any_class(['div', 'article', 'section'],
+                                  ['post', 'discussion', 'topic', 'story', 'update', 'activity', 'card']))
+INSPIRE_POST_FALLBACK = Selector(any_attr('data-testid', ['div'], ['post', 'discussion']) + ', '
+                                 '[role="article"], [role="listitem"], '
+                                 '[class*="stream"], [class*="feed"], [class*="discussion-list"]')
+INSPIRE_HEADING = Selector('h1, h2, h3, h4')
+INSPIRE_LINK = Selector('a')
+INSPIRE_HREF = Selector('a[href]')
+INSPIRE_TITLE_CLASS = Selector('[class*="title"], [class*="headline"], [class*="name"]')
+INSPIRE_CONTENT = Selector(any_class(['p', 'div', 'span'], ['content', 'body', 'text', 'excerpt', 'description']))
+INSPIRE_DIV = Selector('div')
+INSPIRE_MAIN = Selector('[data-role="main"], .post-body')
+INSPIRE_DATE = Selector(any_class(['time', 'span'], ['date', 'time', 'posted', 'activity']))
+INSPIRE_TIME = Selector('time')
+
+
+def _categorized(discussions: List[Discussion]) -> List[Discussion]:
+    """Categorize a page's discussions by title and content in one batch"""
+    categories = categorize_many(f"{disc['title']} {disc['content']}" for disc in discussions)
+    for disc, category in zip(discussions, categories):
+        disc['category'] = category
+    return discussions
+
+
+# ========== HEALTHUNLOCKED ==========
+def parse_healthunlocked(content: bytes, url: str, context: Dict[str, Any]) -> List[Discussion]:
+    community = context['community']
+    doc = parse_html(content, only=['article'])
+
+    # Find post elements (structure may vary)
+    discussions = []
+    for post in doc.select(HU_POST, limit=20):
+        try:
+            title_elem = post.select_one(HU_TITLE)
+            if not title_elem:
+                continue
+
+            title = title_elem.text()
+            link = title_elem.attr('href', '')
+            if link and not link.startswith('http'):
+                link = urljoin(url, link)
+
+            content_elem = post.select_one(HU_CONTENT)
+            text = content_elem.text()[:800] if content_elem else ""
+
+            # Extract engagement metrics
+            likes = replies = 0
+            stats = [DIGITS.search(s) for s in post.strings()]
+            stats = [int(m.group()) for m in stats if m]
+            if stats:
+                likes = stats[0]
+                if len(stats) > 1:
+                    replies = stats[1]
+
+            discussions.append({
+                'id': stable_id('healthunlocked', link or url),
+                'platform': 'HealthUnlocked',
+                'source': community,
+                'category': DEFAULT_CATEGORY,
+                'title': title,
+                'content': text,
+                'url': link or url,
+                'author': 'Community Member',
+                'likes': likes,
+                'num_comments': replies,
+                'fetched_date': datetime.now().isoformat()
+            })
+
+        except Exception:
+            continue
+
+    return _categorized(discussions)
+
+
+# ========== PATIENT.INFO ==========
+def parse_patient_info(content: bytes, url: str, context: Dict[str, Any]) -> List[Discussion]:
+    forum = context['forum']
+    base_url = context['base_url']
+    doc = parse_html(content, only=["tr"])
+
+    # Discourse topic list rows
+    discussions = []
+    for row in doc.select(PATIENT_ROW, limit=15):
+        try:
+            title_link = row.select_one(PATIENT_TITLE)
+            if not title_link:
+                continue
+
+            title = title_link.text()
+            link = title_link.attr("href", "")
+            if link and not link.startswith("http"):
+                link = urljoin(base_url, link)
+
+            # Small excerpt if available
+            excerpt = row.select_one(PATIENT_EXCERPT)
+            text = excerpt.text()[:800] if excerpt else ""
+
+            # Replies / posts
+            replies = 0
+            replies_td = row.select_one(PATIENT_REPLIES)
+            if replies_td:
+                m = DIGITS.search(replies_td.text())
+                if m:
+                    replies = int(m.group())
+
+            cells = row.select(PATIENT_CELLS)
+            post_date = cells[-1].text() if len(cells) > 3 else ""  # Last cell contains Activity date [web:1]
+
+            discussions.append({
+                "id": stable_id("patient", link or url),
+                "platform": "Patient.info",
+                "source": forum.replace("-", " ").replace("tag/", "").title(),
+                "category": DEFAULT_CATEGORY,
+                "title": title,
+                "content": text,
+                "url": link or url,
+                "author": "Forum Member",
+                "num_comments": replies,
+                "created_utc": post_date,
+                "fetched_date": datetime.now().isoformat(),
+            })
+
+        except Exception:
+            continue
+
+    return _categorized(discussions)
+
+
+# ========== INSPIRE.COM ==========
+def parse_inspire(content: bytes, url: str, context: Dict[str, Any]) -> Tuple[Optional[str], List[Discussion]]:
+    """(page title, discussions) - the title helps spot block pages"""
+    community = context['community']
+    doc = parse_html(content)
+
+    page_title = doc.select_one(INSPIRE_PAGE_TITLE)
+    page_title = page_title.text() if page_title else None
+
+    # Broader selectors for Inspire's current JS-heavy structure
+    posts = doc.select(INSPIRE_POST, limit=20)
+
+    # Also try common Inspire patterns
+    if not posts:
+        posts = doc.select(INSPIRE_POST_FALLBACK)
+
+    discussions = []
+    for post in posts[:15]:  # Limit processing
+        try:
+            # Multiple title strategies
+            title_elem = (post.select_one(INSPIRE_HEADING) or
+                          next((a for a in post.select(INSPIRE_LINK) if len(a.text()) >= 10), None) or  # Long link text
+                          post.select_one(INSPIRE_TITLE_CLASS))
+
+            if not title_elem or len(title_elem.text()) < 10:
+                continue
+
+            title = title_elem.text()[:200]
+
+            # Get link - multiple fallback strategies
+            link_elem = title_elem.ancestor('a') if title_elem.tag != 'a' else title_elem
+            if not link_elem:
+                link_elem = post.select_one(INSPIRE_HREF)
+
+            link = link_elem.attr('href', '') if link_elem else ''
+            if link and not link.startswith('http'):
+                link = urljoin(url, link)
+
+            if not link or 'inspire.com' not in link:
+                continue
+
+            # Content fallback chain
+            content_elem = (post.select_one(INSPIRE_CONTENT) or
+                            next((d for d in post.select(INSPIRE_DIV) if len(d.text()) >= 50), None) or
+                            post.select_one(INSPIRE_MAIN))
+
+            text = content_elem.text()[:800] if content_elem else title[:800]
+
+            date_elem = post.select_one(INSPIRE_DATE) or post.select_one(INSPIRE_TIME)
+            post_date = (date_elem.attr('datetime') or date_elem.attr('title') or
+                         date_elem.text()[:20]) if date_elem else ""
+
+            discussions.append({
+                'id': stable_id('inspire', link),
+                'platform': 'Inspire.com',
+                'source': community.split('/')[-1].replace('-', ' ').title(),
+                'category': DEFAULT_CATEGORY,
+                'title': title,
+                'content': text,
+                'url': link,
+                'author': 'Community Member',
+                'created_utc': post_date,
+                'fetched_date': datetime.now().isoformat()
+            })
+
+        except Exception:
+            continue
+
+    return page_title, _categorized(discussions)
+
+
+# ========== RSS FEEDS ==========
+RSS_ENTRIES_PER_FEED = 15
+
+
+def parse_rss(content: bytes, url: str, context: Dict[str, Any]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """(feed title, entries) with just the fields the aggregator stores"""
+    feed = feedparser.parse(content)
+
+    entries = []
+    for entry in feed.entries[:RSS_ENTRIES_PER_FEED]:
+        if not entry.get('link') or not entry.get('title'):
+            continue
+        published = entry.get('published_parsed')
+        entries.append({
+            'title': entry.title,
+            'link': entry.link,
+            'summary': entry.get('summary', '')[:800],
+            'author': entry.get('author'),
+            'published': entry.get('published'),
+            'published_ts': calendar.timegm(published) if published else None,
+        })
+
+    return feed.feed.get('title'), entries
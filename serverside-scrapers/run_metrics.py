@@ -0,0 +1,216 @@
+"""
+Run metrics for the scraper pipelines
+
+One Metrics object per process collects, while a pipeline runs:
+
+    stages    wall time and call count per stage (fetch, parse, categorize,
+              score, render, write, ...)
+    sources   per platform or host: requests, errors, bytes, status codes,
+              time spent waiting on the rate limiter, parse time and a latency
+              histogram
+
+At the end the pipeline writes a JSON run report and, if asked, a Prometheus
+textfile for node_exporter's textfile collector. Stage times can overlap: pages
+are parsed in worker processes while the fetch stage is still running, so
+"parse" is the parsers' own time added up, not extra wall time.
+
+Everything is recorded through the module-level `metrics` instance, which is
+safe to use from the fetch threads.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+# Upper bounds of the request latency histogram, in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def timed(fn: Callable, *args) -> tuple:
+    """(seconds, fn(*args)); module-level so it can wrap calls sent to a process pool"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def _new_source() -> Dict[str, Any]:
+    return {
+        'requests': 0,
+        'errors': 0,
+        'bytes': 0,
+        'statuses': defaultdict(int),
+        'rate_limit_wait_seconds': 0.0,
+        'parse_seconds': 0.0,
+        'latency': {'count': 0, 'sum': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS) + 1)},
+    }
+
+
+class Metrics:
+    def __init__(self, pipeline: str = 'scraper'):
+        self._lock = threading.Lock()
+        self.reset(pipeline)
+
+    def reset(self, pipeline: str) -> None:
+        """Start a fresh run for `pipeline`"""
+        with self._lock:
+            self.pipeline = pipeline
+            self.started_at = datetime.now()
+            self._started = time.perf_counter()
+            self.stages: Dict[str, Dict[str, float]] = defaultdict(lambda: {'seconds': 0.0, 'calls': 0})
+            self.sources: Dict[str, Dict[str, Any]] = defaultdict(_new_source)
+            self.counts: Dict[str, float] = {}
+
+    # ========== RECORDING ==========
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, stage: str, seconds: float, calls: int = 1) -> None:
+        with self._lock:
+            self.stages[stage]['seconds'] += seconds
+            self.stages[stage]['calls'] += calls
+
+    def record_request(self, source: str, status: Optional[int], nbytes: int = 0,
+                       latency: float = 0.0, waited: float = 0.0) -> None:
+        """One HTTP request; status None means it raised"""
+        with self._lock:
+            entry = self.sources[source]
+            entry['requests'] += 1
+            entry['rate_limit_wait_seconds'] += waited
+            if status is None or status >= 400:
+                entry['errors'] += 1
+            entry['statuses'][str(status) if status is not None else 'error'] += 1
+            entry['bytes'] += nbytes
+
+            histogram = entry['latency']
+            histogram['count'] += 1
+            histogram['sum'] += latency
+            bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+            histogram['buckets'][bucket] += 1
+
+    def record_parse(self, source: str, seconds: float) -> None:
+        with self._lock:
+            self.sources[source]['parse_seconds'] += seconds
+        self.add_time('parse', seconds)
+
+    def set_count(self, name: str, value: float) -> None:
+        """Pipeline-level figure for the report, e.g. discussions stored"""
+        with self._lock:
+            self.counts[name] = value
+
+    # ========== OUTPUT ==========
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            sources = {}
+            for name, entry in sorted(self.sources.items()):
+                histogram = entry['latency']
+                cumulative, buckets = 0, {}
+                for bound, n in zip(LATENCY_BUCKETS + (float('inf'),), histogram['buckets']):
+                    cumulative += n
+                    buckets['+Inf' if bound == float('inf') else str(bound)] = cumulative
+                sources[name] = {
+                    **{k: v for k, v in entry.items() if k not in ('statuses', 'latency')},
+                    'statuses': dict(entry['statuses']),
+                    'latency_seconds': {
+                        'count': histogram['count'],
+                        'sum': round(histogram['sum'], 4),
+                        'mean': round(histogram['sum'] / histogram['count'], 4) if histogram['count'] else None,
+                        'buckets': buckets,
+                    },
+                }
+
+            return {
+                'pipeline': self.pipeline,
+                'started_at': self.started_at.isoformat(),
+                'finished_at': datetime.now().isoformat(),
+                'duration_seconds': round(time.perf_counter() - self._started, 4),
+                'stages': {name: {'seconds': round(s['seconds'], 4), 'calls': s['calls']}
+                           for name, s in self.stages.items()},
+                'sources': sources,
+                'counts': dict(self.counts),
+            }
+
+    def write_report(self, path) -> Dict[str, Any]:
+        report = self.report()
+        _write_atomic(path, json.dumps(report, indent=2, ensure_ascii=False))
+        return report
+
+    def write_prometheus(self, path, report: Optional[Dict[str, Any]] = None) -> None:
+        """Prometheus text exposition format, for node_exporter's textfile collector"""
+        report = report or self.report()
+        base = {'pipeline': report['pipeline']}
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels({**base, **labels})} {value}")
+
+        metric('scraper_run_duration_seconds', 'gauge', 'Wall time of the last run',
+               [({}, report['duration_seconds'])])
+        metric('scraper_last_run_timestamp_seconds', 'gauge', 'When the last run finished',
+               [({}, round(time.time(), 3))])
+        metric('scraper_stage_seconds', 'gauge', 'Time spent in each stage of the last run',
+               [({'stage': stage}, s['seconds']) for stage, s in report['stages'].items()])
+
+        sources = report['sources'].items()
+        metric('scraper_requests', 'gauge', 'Requests made in the last run by status',
+               [({'source': name, 'status': status}, n)
+                for name, s in sources for status, n in s['statuses'].items()])
+        metric('scraper_response_bytes', 'gauge', 'Response bytes received in the last run',
+               [({'source': name}, s['bytes']) for name, s in sources])
+        metric('scraper_rate_limit_wait_seconds', 'gauge', 'Time spent waiting on the rate limiter',
+               [({'source': name}, round(s['rate_limit_wait_seconds'], 4)) for name, s in sources])
+        metric('scraper_parse_seconds', 'gauge', 'Parser time in the last run',
+               [({'source': name}, round(s['parse_seconds'], 4)) for name, s in sources])
+
+        histogram = []
+        for name, s in sources:
+            latency = s['latency_seconds']
+            histogram += [({'source': name, 'le': le}, n) for le, n in latency['buckets'].items()]
+        lines.append("# HELP scraper_request_duration_seconds Request latency in the last run")
+        lines.append("# TYPE scraper_request_duration_seconds histogram")
+        for labels, value in histogram:
+            lines.append(f"scraper_request_duration_seconds_bucket{_labels({**base, **labels})} {value}")
+        for name, s in sources:
+            labels = _labels({**base, 'source': name})
+            lines.append(f"scraper_request_duration_seconds_sum{labels} {s['latency_seconds']['sum']}")
+            lines.append(f"scraper_request_duration_seconds_count{labels} {s['latency_seconds']['count']}")
+
+        metric('scraper_items', 'gauge', 'Pipeline-level counts from the last run',
+               [({'name': name}, value) for name, value in report['counts'].items()])
+
+        _write_atomic(path, '\n'.join(lines) + '\n')
+
+    def summary(self) -> str:
+        """One line per stage, slowest first"""
+        stages = sorted(self.report()['stages'].items(), key=lambda item: item[1]['seconds'], reverse=True)
+        return '\n'.join(f"   {name:<12} {s['seconds']:8.2f}s  ({s['calls']} calls)" for name, s in stages)
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    escaped = (f'{k}="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for k, v in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def _write_atomic(path, text: str) -> None:
+    # The textfile collector may read at any moment, so never expose a half-written file
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+
+
+metrics = Metrics()
@@ -0,0 +1,79 @@
+"""
+Build-time search index for the dashboard's client-side filter
+
+Instead of the browser reading innerText from every card on each keystroke,
+the dashboard ships a small inverted index as a JSON data island:
+
+    tokens     sorted list of every token in the cards
+    postings   for each token, the ids of the cards containing it, delta-encoded
+    platforms  platform -> bitset of card ids (base64, bit i = card i)
+    conditions category -> bitset of card ids
+
+Card ids are positions in the "All Discussions" grid. The filter script
+intersects bitsets and never touches the DOM except to show or hide cards.
+A query term matches every token it is a prefix of, which a binary search over
+the sorted token list finds without a scan.
+"""
+
+import base64
+import json
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List
+
+# Letters and digits, any script; the script side uses /[\p{L}\p{N}]+/gu
+TOKEN_RE = re.compile(r'[^\W_]+')
+MIN_TOKEN_LENGTH = 2
+
+# Fields that the old innerText search could see
+SEARCH_FIELDS = ('title', 'content', 'source', 'platform', 'category')
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) >= MIN_TOKEN_LENGTH]
+
+
+def encode_bitset(ids: Iterable[int], size: int) -> str:
+    bits = bytearray((size + 7) // 8)
+    for i in ids:
+        bits[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(bits)).decode('ascii')
+
+
+def delta_encode(ids: List[int]) -> List[int]:
+    prev = 0
+    deltas = []
+    for i in ids:
+        deltas.append(i - prev)
+        prev = i
+    return deltas
+
+
+def build_search_index(discussions: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Index cards in the order they are rendered (card id = position)"""
+    postings = defaultdict(list)
+    platforms = defaultdict(list)
+    conditions = defaultdict(list)
+
+    size = 0
+    for card_id, disc in enumerate(discussions):
+        size = card_id + 1
+        text = ' '.join(str(disc.get(field) or '') for field in SEARCH_FIELDS)
+        for token in set(tokenize(text)):
+            postings[token].append(card_id)
+        platforms[disc.get('platform', '')].append(card_id)
+        conditions[disc.get('category', '')].append(card_id)
+
+    tokens = sorted(postings)
+    return {
+        'size': size,
+        'tokens': tokens,
+        'postings': [delta_encode(postings[token]) for token in tokens],
+        'platforms': {name: encode_bitset(ids, size) for name, ids in platforms.items()},
+        'conditions': {name: encode_bitset(ids, size) for name, ids in conditions.items()},
+    }
+
+
+def to_data_island(index: Dict[str, Any]) -> str:
+    """JSON that is safe to inline in a <script type="application/json"> element"""
+    return json.dumps(index, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
@@ -0,0 +1,227 @@
+"""
+SQLite-backed discussion repository
+
+An optional, queryable home for the aggregator's discussions. Each discussion
+is stored as its full JSON plus indexed columns for the fields we filter and
+rank on. "Top N by engagement in category X on platform Y" is then an index
+range scan instead of loading and sorting the whole corpus in Python.
+
+Scores carry a recency bonus that steps down when a discussion turns 7 and 30
+days old. Rows keep their base score and creation time, so refresh_scores()
+only has to update, in SQL, the rows that crossed one of those ages since the
+last refresh; the stored engagement_score then stays indexable.
+
+Uses only the standard library sqlite3 module.
+"""
+
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from engagement_scoring import DAY_SECONDS, EPOCH, RECENCY_TIERS, base_score, created_epoch
+
+DB_PATH = Path("complete_health_data.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS discussions (
+    id               TEXT PRIMARY KEY,
+    platform         TEXT NOT NULL,
+    category         TEXT NOT NULL,
+    source           TEXT,
+    engagement_score INTEGER NOT NULL DEFAULT 0,
+    base_score       REAL NOT NULL DEFAULT 0,
+    created_epoch    REAL,
+    fetched_date     TEXT,
+    data             TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_discussions_engagement
+    ON discussions (engagement_score DESC);
+CREATE INDEX IF NOT EXISTS idx_discussions_category_engagement
+    ON discussions (category, engagement_score DESC);
+CREATE INDEX IF NOT EXISTS idx_discussions_platform_engagement
+    ON discussions (platform, engagement_score DESC);
+CREATE INDEX IF NOT EXISTS idx_discussions_platform_category_engagement
+    ON discussions (platform, category, engagement_score DESC);
+CREATE INDEX IF NOT EXISTS idx_discussions_fetched
+    ON discussions (fetched_date DESC);
+CREATE INDEX IF NOT EXISTS idx_discussions_created
+    ON discussions (created_epoch DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+UPSERT = """
+INSERT INTO discussions (id, platform, category, source, engagement_score, base_score, created_epoch,
+                         fetched_date, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    platform = excluded.platform,
+    category = excluded.category,
+    source = excluded.source,
+    engagement_score = excluded.engagement_score,
+    base_score = excluded.base_score,
+    created_epoch = excluded.created_epoch,
+    fetched_date = excluded.fetched_date,
+    data = excluded.data
+"""
+
+# Columns callers may filter or group on
+FILTER_COLUMNS = ('platform', 'category', 'source')
+
+# engagement_scoring.engagement_score() in SQL, for rows as of :now (epoch seconds)
+MULTIPLIER_SQL = ('CASE WHEN created_epoch IS NULL THEN 1 '
+                  + ' '.join(f'WHEN created_epoch > :now - {days * DAY_SECONDS} THEN {multiplier}'
+                             for days, multiplier in RECENCY_TIERS)
+                  + ' ELSE 1 END')
+SCORE_SQL = f'CAST(base_score * ({MULTIPLIER_SQL}) AS INTEGER)'
+
+
+class DiscussionRepository:
+    def __init__(self, path=DB_PATH):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._add_base_scores()
+
+    def _add_base_scores(self) -> None:
+        """Databases from before base_score: add and fill the column"""
+        columns = {name for _, name, *_ in self.conn.execute('PRAGMA table_info(discussions)')}
+        if 'base_score' in columns:
+            return
+        rows = [(base_score(json.loads(data)), disc_id)
+                for disc_id, data in self.conn.execute('SELECT id, data FROM discussions')]
+        with self.conn:
+            self.conn.execute('ALTER TABLE discussions ADD COLUMN base_score REAL NOT NULL DEFAULT 0')
+            self.conn.executemany('UPDATE discussions SET base_score = ? WHERE id = ?', rows)
+            self.conn.execute("DELETE FROM meta WHERE key = 'scored_at'")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ========== WRITING ==========
+    @staticmethod
+    def _row(disc: Dict[str, Any]):
+        return (
+            disc['id'],
+            disc.get('platform', ''),
+            disc.get('category', ''),
+            disc.get('source'),
+            int(disc.get('engagement_score') or 0),
+            base_score(disc),
+            created_epoch(disc),
+            disc.get('fetched_date'),
+            json.dumps(disc, ensure_ascii=False),
+        )
+
+    def upsert_many(self, discussions: Iterable[Dict[str, Any]]) -> int:
+        """Insert or update a batch of discussions in a single transaction"""
+        rows = [self._row(disc) for disc in discussions]
+        with self.conn:
+            self.conn.executemany(UPSERT, rows)
+        return len(rows)
+
+    def delete_many(self, ids: Iterable[str]) -> None:
+        with self.conn:
+            self.conn.executemany('DELETE FROM discussions WHERE id = ?', [(i,) for i in ids])
+
+    def refresh_scores(self, now: Optional[datetime] = None) -> int:
+        """
+        Bring every row's engagement_score up to `now`. Only rows that crossed a
+        recency tier since the last refresh change, so only those are updated
+        (all of them the first time). Returns how many rows were updated.
+        """
+        now_epoch = ((now or datetime.now()) - EPOCH).total_seconds()
+        scored_at = self.conn.execute("SELECT value FROM meta WHERE key = 'scored_at'").fetchone()
+
+        if scored_at is None:
+            where = ''
+        else:
+            # A row crossed a tier if its creation time lies between the tier's
+            # cutoff at the last refresh and its cutoff now
+            where = ' WHERE ' + ' OR '.join(
+                f'(created_epoch > :since - {days * DAY_SECONDS} AND created_epoch <= :now - {days * DAY_SECONDS})'
+                for days, _ in RECENCY_TIERS)
+
+        sql = (f"UPDATE discussions SET engagement_score = {SCORE_SQL}, "
+               f"data = json_set(data, '$.engagement_score', {SCORE_SQL}){where}")
+        with self.conn:
+            updated = self.conn.execute(sql, {'now': now_epoch,
+                                              'since': float(scored_at[0]) if scored_at else now_epoch}).rowcount
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('scored_at', ?)", (str(now_epoch),))
+        return updated
+
+    # ========== QUERIES ==========
+    @staticmethod
+    def _where(filters: Dict[str, Optional[str]]):
+        clauses, params = [], []
+        for column, value in filters.items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"Can't filter on {column!r}")
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def _discussions(self, sql: str, params) -> List[Dict[str, Any]]:
+        return [json.loads(data) for (data,) in self.conn.execute(sql, params)]
+
+    def top(self, n: int, category: Optional[str] = None, platform: Optional[str] = None,
+            offset: int = 0) -> List[Dict[str, Any]]:
+        """Highest engagement first, optionally within a category and/or platform"""
+        where, params = self._where({'category': category, 'platform': platform})
+        sql = f"SELECT data FROM discussions{where} ORDER BY engagement_score DESC LIMIT ? OFFSET ?"
+        return self._discussions(sql, params + [n, offset])
+
+    def recent(self, n: int, category: Optional[str] = None,
+               platform: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recently fetched first"""
+        where, params = self._where({'category': category, 'platform': platform})
+        sql = f"SELECT data FROM discussions{where} ORDER BY fetched_date DESC LIMIT ?"
+        return self._discussions(sql, params + [n])
+
+    def counts_by(self, column: str) -> Dict[str, int]:
+        """{value: number of discussions} for platform, category or source"""
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Can't group on {column!r}")
+        sql = f"SELECT {column}, COUNT(*) FROM discussions GROUP BY {column}"
+        return dict(self.conn.execute(sql).fetchall())
+
+    def count(self, min_engagement: Optional[int] = None) -> int:
+        if min_engagement is None:
+            return self.conn.execute('SELECT COUNT(*) FROM discussions').fetchone()[0]
+        return self.conn.execute('SELECT COUNT(*) FROM discussions WHERE engagement_score > ?',
+                                 (min_engagement,)).fetchone()[0]
+
+    def iter_all(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Every discussion, highest engagement first, fetched in batches"""
+        cursor = self.conn.execute('SELECT data FROM discussions ORDER BY engagement_score DESC')
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for (data,) in rows:
+                yield json.loads(data)
+
+    # ========== EXPORT ==========
+    def export_json(self, path, category: Optional[str] = None, platform: Optional[str] = None,
+                    limit: Optional[int] = None) -> int:
+        """Write a complete_health_data.json-style file, optionally filtered and truncated"""
+        if category is None and platform is None and limit is None:
+            discussions = list(self.iter_all())
+        else:
+            discussions = self.top(limit if limit is not None else -1, category=category, platform=platform)
+
+        data = {
+            'last_updated': datetime.now().isoformat(),
+            'total': len(discussions),
+            'discussions': discussions,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return len(discussions)
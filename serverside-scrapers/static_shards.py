@@ -0,0 +1,114 @@
+"""
+Per-category sharded static output
+
+In sharded mode a page is written as a small index plus one HTML fragment per
+category in a folder next to it (womens_health_hub.html ->
+womens_health_hub/pcos.html, ...). Each category's container carries a
+data-shard attribute, and LAZY_SHARD_SCRIPT fetches the fragment the first
+time that container scrolls into view or a filter needs it. Opening the page
+then only transfers the stats and whatever is inlined up front.
+
+The virtual dashboard keeps its card data and search index in the same folder,
+as JSON chunks it fetches as they are needed (see dashboard_renderer.py).
+
+Browsers refuse fetch() on file:// pages, so serve the output folder over HTTP
+(python -m http.server) when using sharded or virtual mode.
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, TextIO
+
+
+def shard_slug(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'shard'
+
+
+class ShardWriter:
+    """Writes category fragments into a folder named after the index page"""
+
+    def __init__(self, index_path):
+        index_path = Path(index_path)
+        self.directory = index_path.with_suffix('')
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._slugs: Dict[str, str] = {}
+
+        # Fragments from a previous run may belong to categories that are gone
+        for pattern in ('*.html', '*.json'):
+            for stale in self.directory.glob(pattern):
+                stale.unlink()
+
+    def _slug(self, name: str) -> str:
+        if name not in self._slugs:
+            slug = base = shard_slug(name)
+            taken = set(self._slugs.values())
+            n = 2
+            while slug in taken:
+                slug = f"{base}-{n}"
+                n += 1
+            self._slugs[name] = slug
+        return self._slugs[name]
+
+    def url(self, name: str, suffix: str = '.html') -> str:
+        """Path of the fragment relative to the index page"""
+        return f"{self.directory.name}/{self._slug(name)}{suffix}"
+
+    def open(self, name: str, suffix: str = '.html') -> TextIO:
+        return open(self.directory / f"{self._slug(name)}{suffix}", 'w', encoding='utf-8')
+
+
+LAZY_SHARD_CSS = """
+        [data-shard] {
+            min-height: 200px;
+        }
+
+        .shard-error {
+            color: #999;
+            padding: 20px;
+        }
+"""
+
+LAZY_SHARD_SCRIPT = """
+        // Sharded output: fill [data-shard] elements from their fragment on demand
+        function loadShard(el) {
+            if (!el.dataset.shard) return Promise.resolve(el);
+            if (!el._loading) {
+                el._loading = fetch(el.dataset.shard)
+                    .then(response => {
+                        if (!response.ok) throw new Error('HTTP ' + response.status);
+                        return response.text();
+                    })
+                    .then(html => {
+                        el.innerHTML = html;
+                        delete el.dataset.shard;
+                        el.dispatchEvent(new CustomEvent('shardloaded', {bubbles: true}));
+                        return el;
+                    })
+                    .catch(err => {
+                        el._loading = null;
+                        el.innerHTML = '<p class="shard-error">Could not load this section (' + err.message +
+                            '). Serve this folder over HTTP, e.g. python -m http.server.</p>';
+                        return el;
+                    });
+            }
+            return el._loading;
+        }
+
+        function loadShards(elements) {
+            return Promise.all(Array.from(elements).map(loadShard));
+        }
+
+        // Fetch each shard once it comes near the viewport
+        const shardObserver = ('IntersectionObserver' in window) ? new IntersectionObserver(entries => {
+            entries.forEach(entry => {
+                if (entry.isIntersecting) {
+                    shardObserver.unobserve(entry.target);
+                    loadShard(entry.target);
+                }
+            });
+        }, {rootMargin: '400px'}) : null;
+
+        document.querySelectorAll('[data-shard]').forEach(el => {
+            if (shardObserver) shardObserver.observe(el); else loadShard(el);
+        });
+"""
@@ -0,0 +1,82 @@
+"""
+Tests for CircuitBreakers
+
+python -m pytest test_circuit_breaker.py
+"""
+
+import time
+import unittest
+from unittest import mock
+
+from circuit_breaker import BREAKER_THRESHOLD, CircuitBreakers
+from crawl_state import CrawlState
+
+
+def _breakers(**kwargs):
+    return CircuitBreakers(CrawlState('does-not-exist.json'), **kwargs)
+
+
+class MultiHostTest(unittest.TestCase):
+    def test_dead_feeds_do_not_trip_the_healthy_ones(self):
+        breakers = _breakers(per_host=['RSS Feed'])
+        with mock.patch('builtins.print'):
+            for host in ('dead1.example', 'dead2.example', 'dead3.example'):
+                breakers.failure('RSS Feed', f"https://{host}/rss", 'ConnectionError')
+            self.assertTrue(breakers.allow('RSS Feed', 'https://healthy.example/rss'))
+            self.assertNotIn('platform:RSS Feed', breakers.records)
+
+    def test_a_dead_host_is_skipped(self):
+        breakers = _breakers(per_host=['RSS Feed'])
+        with mock.patch('builtins.print'):
+            for _ in range(BREAKER_THRESHOLD):
+                breakers.failure('RSS Feed', 'https://dead.example/rss', 'HTTP 503')
+            self.assertFalse(breakers.allow('RSS Feed', 'https://dead.example/other.xml'))
+            self.assertTrue(breakers.allow('RSS Feed', 'https://healthy.example/rss'))
+
+    def test_single_host_platforms_keep_a_platform_breaker(self):
+        breakers = _breakers(per_host=['RSS Feed'])
+        with mock.patch('builtins.print'):
+            for _ in range(BREAKER_THRESHOLD):
+                breakers.failure('Reddit', 'https://www.reddit.com/r/PCOS/new.json', 'HTTP 429')
+        self.assertEqual(breakers.records['platform:Reddit']['state'], 'open')
+
+
+class HalfOpenTest(unittest.TestCase):
+    def _expired(self):
+        breakers = _breakers()
+        with mock.patch('builtins.print'):
+            for _ in range(BREAKER_THRESHOLD):
+                breakers.failure('Reddit', 'https://www.reddit.com/a', 'HTTP 503')
+        for record in breakers.records.values():
+            record['opened_at'] = time.time() - record['cooldown'] - 1
+        return breakers
+
+    def test_only_one_probe_is_let_through(self):
+        breakers = self._expired()
+        with mock.patch('builtins.print'):
+            self.assertTrue(breakers.allow('Reddit', 'https://www.reddit.com/a'))
+            self.assertFalse(breakers.allow('Reddit', 'https://www.reddit.com/b'))
+            self.assertFalse(breakers.allow('Reddit', 'https://www.reddit.com/c'))
+
+    def test_a_successful_probe_closes_the_breaker(self):
+        breakers = self._expired()
+        with mock.patch('builtins.print'):
+            breakers.allow('Reddit', 'https://www.reddit.com/a')
+            breakers.success('Reddit', 'https://www.reddit.com/a')
+            self.assertTrue(breakers.allow('Reddit', 'https://www.reddit.com/b'))
+        self.assertEqual(breakers.records['platform:Reddit']['state'], 'closed')
+
+    def test_a_failed_probe_reopens_for_longer(self):
+        breakers = self._expired()
+        cooldown = breakers.records['platform:Reddit']['cooldown']
+        with mock.patch('builtins.print'):
+            breakers.allow('Reddit', 'https://www.reddit.com/a')
+            breakers.failure('Reddit', 'https://www.reddit.com/a', 'HTTP 503')
+            self.assertFalse(breakers.allow('Reddit', 'https://www.reddit.com/b'))
+        record = breakers.records['platform:Reddit']
+        self.assertEqual(record['state'], 'open')
+        self.assertEqual(record['cooldown'], cooldown * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Tests for CommunityDirectory.fetch_reddit with the network mocked out
+
+python -m pytest test_communities_directory.py
+"""
+
+import json
+import unittest
+from unittest import mock
+
+import requests
+
+from communities_directory import CommunityDirectory
+
+
+def _response(url, payload, status=200):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(payload).encode('utf-8')
+    response.url = url
+    return response
+
+
+def _subreddit(name, subscribers):
+    return {'display_name': name, 'subscribers': subscribers, 'title': name,
+            'public_description': 'PCOS support', 'created_utc': 1400000000}
+
+
+class FetchRedditTest(unittest.TestCase):
+    def fake_get(self, url, params=None, **kwargs):
+        self.requested.append(url)
+        if url.endswith('/api/info.json'):
+            # The batch answer leaves out PrivateSub
+            return _response(url, {'data': {'children': [{'data': _subreddit('PCOS', 1000)}]}})
+        if url.endswith('/r/PrivateSub/about.json'):
+            return _response(url, {'data': _subreddit('PrivateSub', 50)})
+        return _response(url, {}, status=404)
+
+    def test_names_missing_from_the_batch_are_fetched_one_by_one(self):
+        self.requested = []
+        with mock.patch('builtins.print'):
+            directory = CommunityDirectory()
+        directory.config = {'reddit_subreddits_fetch': ['PCOS', 'PrivateSub']}
+
+        with mock.patch('http_client.get', side_effect=self.fake_get), mock.patch('builtins.print'):
+            added = directory.fetch_reddit()
+
+        self.assertEqual(added, 2)
+        self.assertIn('https://www.reddit.com/r/PrivateSub/about.json', self.requested)
+        members = {c['community_name']: c['number_members'] for c in directory.communities}
+        self.assertEqual(members, {'r/PCOS': 1000, 'r/PrivateSub': 50})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests for the shared condition classifier
+
+Checks that the compiled classifier labels texts exactly like the if/elif
+chain ComprehensiveHealthAggregator.categorize_content used to be, with the
+Aho-Corasick automaton and with the plain scan fallback.
+
+python -m pytest test_condition_classifier.py
+"""
+
+import json
+import os
+import unittest
+from unittest import mock
+
+import condition_classifier
+from condition_classifier import DEFAULT_CATEGORY, ConditionClassifier
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# The aggregator's chain before the shared table, row for row
+OLD_AGGREGATOR_CHAIN = [
+    ('PCOS', ['pcos', 'polycystic']),
+    ('Endometriosis', ['endometriosis', 'endo ']),
+    ('Uterine Fibroids', ['fibroid', 'leiomyoma']),
+    ('Breast Cancer', ['breast cancer']),
+    ('Cervical Cancer', ['cervical cancer', 'hpv vaccine']),
+    ('Ovarian Cancer', ['ovarian cancer']),
+    ('Menopause', ['menopause', 'perimenopause', 'hot flash']),
+    ('Yeast Infection', ['yeast infection', 'candida', 'thrush']),
+    ('UTI', ['uti', 'urinary tract', 'bladder infection']),
+    ('Ovarian Cysts', ['ovarian cyst']),
+    ('Pelvic Inflammatory Disease', ['pid', 'pelvic inflammatory']),
+    ('Infertility & Fertility', ['infertility', 'infertile', 'ttc', 'trying to conceive', 'ivf', 'fertility']),
+    ('PMS & PMDD', ['pms', 'pmdd', 'premenstrual']),
+    ('Gestational Diabetes', ['gestational diabetes']),
+    ('Postpartum Depression', ['postpartum depression', 'ppd', 'postnatal depression']),
+    ('Thyroid Disorders', ['thyroid', 'hypothyroid', 'hyperthyroid', 'hashimoto']),
+    ('Osteoporosis', ['osteoporosis', 'bone density']),
+    ('Preeclampsia', ['preeclampsia', 'pre-eclampsia']),
+    ('Vaginismus', ['vaginismus']),
+    ('Bacterial Vaginosis', ['bacterial vaginosis', 'bv ']),
+    ('Autoimmune Diseases', ['lupus', 'autoimmune', 'rheumatoid']),
+    ('Pregnancy', ['pregnancy', 'pregnant', 'expecting', 'prenatal']),
+    ('Mental Health', ['anxiety', 'depression', 'mental health', 'therapy']),
+    ('Fibromyalgia', ['fibromyalgia']),
+]
+
+
+def old_categorize(text):
+    text_lower = text.lower()
+    for category, words in OLD_AGGREGATOR_CHAIN:
+        if any(word in text_lower for word in words):
+            return category
+    # The directory's Chronic Pain row, the one addition of the shared table
+    if 'chronic pain' in text_lower:
+        return 'Chronic Pain'
+    return DEFAULT_CATEGORY
+
+
+def sample_texts():
+    texts = [
+        '', 'Nothing to see here', 'ENDOMETRIOSIS and PCOS',  # priority beats position
+        'depression after birth, postpartum depression', 'my endo is back', 'endo',
+        'Therapy for chronic pain', 'chronic pain only', 'Hot flashes at night',
+        'BV again', 'bv', 'Pre-eclampsia at 34 weeks', 'intuition', 'rapid test',
+    ]
+    with open(os.path.join(HERE, 'complete_health_data.json'), encoding='utf-8') as f:
+        for disc in json.load(f)['discussions']:
+            texts.append(f"{disc.get('title', '')} {disc.get('content', '')}")
+    return texts
+
+
+class ParityTest(unittest.TestCase):
+    def assertMatchesOldChain(self, classifier):
+        texts = sample_texts()
+        expected = [old_categorize(text) for text in texts]
+        self.assertEqual([classifier.classify(text) for text in texts], expected)
+        self.assertEqual(classifier.classify_many(texts), expected)
+
+    @unittest.skipIf(condition_classifier.ahocorasick is None, 'pyahocorasick not installed')
+    def test_automaton(self):
+        self.assertMatchesOldChain(ConditionClassifier())
+
+    def test_scan_fallback(self):
+        with mock.patch.object(condition_classifier, 'ahocorasick', None):
+            self.assertMatchesOldChain(ConditionClassifier())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Tests for canonical URLs and stable discussion ids
+
+python -m pytest test_discussion_ids.py
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+from discussion_ids import canonical_url, migrate_legacy_id, stable_id
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class CanonicalUrlTest(unittest.TestCase):
+    def test_trivially_different_links_compare_equal(self):
+        canonical = 'https://patient.info/forums/discuss/pcos-and-diet-123?page=2&sort=new'
+        for url in (
+            'https://patient.info/forums/discuss/pcos-and-diet-123?page=2&sort=new',
+            'http://www.Patient.INFO/forums/discuss/pcos-and-diet-123/?sort=new&page=2',
+            'https://patient.info:443/forums//discuss/pcos-and-diet-123?page=2&sort=new#replies',
+            'https://patient.info/forums/discuss/pcos-and-diet-123?utm_source=x&page=2&fbclid=abc&sort=new',
+            '  https://patient.info/forums/discuss/pcos%2Dand%2Ddiet%2D123?page=2&sort=new  ',
+        ):
+            self.assertEqual(canonical_url(url), canonical, url)
+
+    def test_meaningful_differences_are_kept(self):
+        self.assertNotEqual(canonical_url('https://example.org/a?id=1'), canonical_url('https://example.org/a?id=2'))
+        self.assertNotEqual(canonical_url('https://example.org/a'), canonical_url('https://example.org/b'))
+        self.assertEqual(canonical_url('https://example.org:8443/a'), 'https://example.org:8443/a')
+
+    def test_empty_and_bare_hosts(self):
+        self.assertEqual(canonical_url(''), '')
+        self.assertEqual(canonical_url(None), '')
+        self.assertEqual(canonical_url('https://example.org'), 'https://example.org/')
+
+
+class StableIdTest(unittest.TestCase):
+    def test_same_thread_same_id(self):
+        self.assertEqual(stable_id('rss', 'https://www.example.org/post/?utm_medium=rss'),
+                         stable_id('rss', 'https://example.org/post'))
+        self.assertRegex(stable_id('rss', 'https://example.org/post'), r'^rss_[0-9a-f]{16}$')
+
+    def test_ids_do_not_depend_on_the_process(self):
+        code = "from discussion_ids import stable_id; print(stable_id('inspire', 'https://www.inspire.com/groups/x/'))"
+        ids = {
+            subprocess.run([sys.executable, '-c', code], cwd=HERE, capture_output=True, text=True, check=True,
+                           env={**os.environ, 'PYTHONHASHSEED': seed}).stdout.strip()
+            for seed in ('1', '2')
+        }
+        self.assertEqual(ids, {stable_id('inspire', 'https://inspire.com/groups/x')})
+
+    def test_legacy_ids_are_rekeyed(self):
+        disc = {'id': 'patient_-4312098123', 'url': 'https://patient.info/forums/discuss/a-1'}
+        self.assertEqual(migrate_legacy_id(disc), stable_id('patient', 'https://patient.info/forums/discuss/a-1'))
+
+        toot = {'id': 'mastodon_1122334455', 'url': 'https://mastodon.social/@someone/1122334455'}
+        self.assertEqual(migrate_legacy_id(toot),
+                         stable_id('mastodon', 'https://mastodon.social/users/someone/statuses/1122334455'))
+
+        current = {'id': 'reddit_abc123', 'url': 'https://reddit.com/r/PCOS/abc123'}
+        self.assertEqual(migrate_legacy_id(current), 'reddit_abc123')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Tests for the adaptive per-host rate limiter
+
+The clock is mocked, so nothing here sleeps or touches the network.
+
+python -m pytest test_http_client.py
+"""
+
+import time
+import unittest
+from email.utils import formatdate
+from unittest import mock
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import http_client
+from http_client import BURST, MIN_RATE, RATE_INCREASE, HostLimiter, _seconds_until
+
+
+def _response(status, **headers):
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict({name.replace('_', '-'): value for name, value in headers.items()})
+    return response
+
+
+class HostLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        clock = mock.patch.object(http_client.time, 'monotonic', lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_burst_then_paced(self):
+        limiter = HostLimiter(rate=0.5, max_rate=2.0)
+        waits = [limiter.reserve() for _ in range(BURST + 2)]
+        self.assertEqual(waits, [0.0] * BURST + [2.0, 4.0])  # callers queue behind each other
+
+    def test_idle_hosts_refill_only_up_to_the_burst(self):
+        limiter = HostLimiter(rate=1.0, max_rate=2.0)
+        for _ in range(BURST):
+            limiter.reserve()
+        self.now += 3600
+        waits = [limiter.reserve() for _ in range(BURST + 1)]
+        self.assertEqual(waits, [0.0] * BURST + [1.0])
+
+    def test_throttling_blocks_the_host_and_halves_its_rate(self):
+        limiter = HostLimiter(rate=1.0, max_rate=2.0)
+        self.assertEqual(limiter.observe(_response(429, Retry_After='30')), 30)
+        self.assertEqual(limiter.rate, 0.5)
+        self.assertEqual(limiter.reserve(), 30)
+
+        # No Retry-After: back off for one request interval
+        self.assertEqual(limiter.observe(_response(503)), 2.0)
+        self.assertEqual(limiter.rate, 0.25)
+
+        for _ in range(10):
+            limiter.observe(_response(429, Retry_After='0'))
+        self.assertEqual(limiter.rate, MIN_RATE)
+
+    def test_rate_headers_spread_what_is_left(self):
+        limiter = HostLimiter(rate=1.0, max_rate=2.0)
+        limiter.observe(_response(200, X_Ratelimit_Remaining='30', X_Ratelimit_Reset='60'))
+        self.assertEqual(limiter.rate, 0.5)
+        limiter.observe(_response(200, X_Ratelimit_Remaining='600', X_Ratelimit_Reset='60'))
+        self.assertEqual(limiter.rate, 2.0)  # capped at the host's ceiling
+
+        limiter.observe(_response(200, X_Ratelimit_Remaining='0', X_Ratelimit_Reset='45'))
+        for _ in range(BURST):
+            self.assertEqual(limiter.reserve(), 45)
+
+    def test_plain_successes_raise_the_rate_up_to_the_ceiling(self):
+        limiter = HostLimiter(rate=0.5, max_rate=1.0)
+        limiter.observe(_response(200))
+        self.assertEqual(limiter.rate, 0.5 + RATE_INCREASE)
+        for _ in range(10):
+            limiter.observe(_response(200))
+        self.assertEqual(limiter.rate, 1.0)
+
+        limiter.observe(_response(404))
+        self.assertEqual(limiter.rate, 1.0)
+
+
+class SecondsUntilTest(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(_seconds_until('12'), 12)
+        self.assertIsNone(_seconds_until(''))
+        self.assertIsNone(_seconds_until('soon'))
+        self.assertAlmostEqual(_seconds_until(str(time.time() + 60)), 60, delta=2)
+        self.assertAlmostEqual(_seconds_until(formatdate(time.time() + 120, usegmt=True)), 120, delta=2)
+        self.assertEqual(_seconds_until('2001-01-01T00:00:00Z'), 0.0)  # past dates mean now
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for NdjsonStorage
+
+python -m pytest test_ndjson_storage.py
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from discussion_store import DiscussionStore
+from ndjson_storage import NdjsonStorage
+
+
+def _discussion(disc_id, title='title'):
+    return {'id': disc_id, 'platform': 'Reddit', 'title': title}
+
+
+class NdjsonStorageTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'data.ndjson')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def storage(self, **kwargs):
+        return NdjsonStorage(self.path, **kwargs)
+
+    def save(self, storage, store):
+        removed = store.pop_removed()
+        return storage.save(store.pop_dirty(), removed, store.pop_growth())
+
+    def test_later_lines_and_tombstones_win(self):
+        storage = self.storage()
+        store = DiscussionStore([_discussion('a'), _discussion('b'), _discussion('c')])
+        self.save(storage, store)
+
+        store = storage.load()
+        store.upsert(_discussion('a', 'edited'))
+        store.remove('b')
+        self.save(storage, store)
+
+        loaded = {disc['id']: disc['title'] for disc in self.storage().load()}
+        self.assertEqual(loaded, {'a': 'edited', 'c': 'title'})
+        self.assertEqual(self.storage().manifest['total'], 2)
+
+    def test_appending_never_reads_the_log(self):
+        storage = self.storage()
+        self.save(storage, DiscussionStore([_discussion('a'), _discussion('b')]))
+
+        store = storage.load()
+        store.upsert(_discussion('c'))
+        store.remove('a')
+        with mock.patch.object(NdjsonStorage, 'iter_records', side_effect=AssertionError('log read')):
+            self.assertEqual(self.save(storage, store), 2)
+        self.assertEqual((storage.manifest['total'], storage.manifest['records']), (2, 4))
+
+    def test_compaction_keeps_one_line_per_live_discussion(self):
+        storage = self.storage(compact_ratio=2.0, compact_min_records=6)
+        store = DiscussionStore([_discussion('a'), _discussion('b'), _discussion('c')])
+        self.save(storage, store)
+        for title in ('v2', 'v3'):
+            store.upsert(_discussion('a', title))
+            store.upsert(_discussion('b', title))
+        store.remove('c')
+        with mock.patch('builtins.print'):
+            self.save(storage, store)
+
+        with open(self.path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(storage.manifest['records'], 2)
+        self.assertEqual(storage.manifest['total'], 2)
+        self.assertEqual({disc['id']: disc['title'] for disc in storage.load()}, {'a': 'v3', 'b': 'v3'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Tests for the dashboard's build-time search index
+
+The index is queried here the way the dashboard script does it (prefix search
+over the sorted tokens, bitsets for the platform and condition filters) and
+checked against a plain scan of the cards.
+
+python -m pytest test_search_index.py
+"""
+
+import base64
+import bisect
+import json
+import unittest
+
+from search_index import SEARCH_FIELDS, build_search_index, to_data_island, tokenize
+
+CARDS = [
+    {'platform': 'Reddit', 'category': 'PCOS', 'source': 'r/PCOS',
+     'title': 'Metformin side effects?', 'content': 'Started metformin last week, feeling sick'},
+    {'platform': 'Mastodon', 'category': 'Menopause', 'source': 'mastodon.social',
+     'title': 'Hot flashes at night', 'content': 'Perimenopause and sleep: what helped you?'},
+    {'platform': 'RSS Feed', 'category': 'PCOS', 'source': 'Health Blog',
+     'title': 'New PCOS guidelines', 'content': None},
+    {'platform': 'Reddit', 'category': 'Thyroid Disorders', 'source': 'r/Hashimotos',
+     'title': 'Schilddrüse und Müdigkeit', 'content': 'TSH 4.5, fT4_low'},
+]
+
+
+def _ids(bitset, size):
+    bits = base64.b64decode(bitset)
+    return {i for i in range(size) if bits[i >> 3] >> (i & 7) & 1}
+
+
+def _search(index, term):
+    """Card ids with a token starting with `term`, as termBitset() in the dashboard finds them"""
+    found = set()
+    t = bisect.bisect_left(index['tokens'], term)
+    while t < len(index['tokens']) and index['tokens'][t].startswith(term):
+        card_id = 0
+        for delta in index['postings'][t]:
+            card_id += delta
+            found.add(card_id)
+        t += 1
+    return found
+
+
+def _scan(term):
+    return {
+        card_id for card_id, card in enumerate(CARDS)
+        if any(token.startswith(term) for token in tokenize(' '.join(str(card.get(f) or '') for f in SEARCH_FIELDS)))
+    }
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = build_search_index(CARDS)
+
+    def test_tokens(self):
+        self.assertEqual(tokenize('Schilddrüse, TSH 4.5 fT4_low a'), ['schilddrüse', 'tsh', 'ft4', 'low'])
+        self.assertEqual(self.index['tokens'], sorted(self.index['tokens']))
+
+    def test_prefix_search_matches_a_scan(self):
+        self.assertEqual(_search(self.index, 'metf'), {0})
+        self.assertEqual(_search(self.index, 'pcos'), {0, 2})
+        self.assertEqual(_search(self.index, 'müd'), {3})
+        self.assertEqual(_search(self.index, 'zzz'), set())
+        for term in {token[:n] for token in self.index['tokens'] for n in (2, 3, len(token))}:
+            self.assertEqual(_search(self.index, term), _scan(term), term)
+
+    def test_filter_bitsets(self):
+        size = self.index['size']
+        self.assertEqual(size, len(CARDS))
+        self.assertEqual(_ids(self.index['platforms']['Reddit'], size), {0, 3})
+        self.assertEqual(_ids(self.index['conditions']['PCOS'], size), {0, 2})
+        self.assertEqual(_ids(self.index['conditions']['Menopause'], size), {1})
+
+    def test_empty(self):
+        index = build_search_index([])
+        self.assertEqual((index['size'], index['tokens'], index['platforms']), (0, [], {}))
+
+    def test_data_island_cannot_close_its_script(self):
+        index = build_search_index([{'title': 'x</script><script>alert(1)</script>', 'platform': 'Reddit'}])
+        island = to_data_island(index)
+        self.assertNotIn('</', island)
+        self.assertEqual(json.loads(island), index)
+
+
+if __name__ == '__main__':
+    unittest.main()
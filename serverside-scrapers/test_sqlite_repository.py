@@ -0,0 +1,68 @@
+"""
+Tests for DiscussionRepository score refreshes
+
+python -m pytest test_sqlite_repository.py
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from engagement_scoring import engagement_score
+from sqlite_repository import DiscussionRepository
+
+NOW = datetime(2025, 12, 22, 12, 0, 0)
+
+
+def _discussion(disc_id, days_old, comments=10):
+    disc = {'id': disc_id, 'platform': 'Reddit', 'category': 'PCOS', 'source': 'r/PCOS',
+            'title': disc_id, 'num_comments': comments, 'score': 3,
+            'created_utc': (NOW - timedelta(days=days_old)).isoformat(),
+            'fetched_date': NOW.isoformat()}
+    disc['engagement_score'] = engagement_score(disc, NOW)
+    return disc
+
+
+class RefreshScoresTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.repository = DiscussionRepository(os.path.join(self._tmp.name, 'test.db'))
+
+    def tearDown(self):
+        self.repository.close()
+        self._tmp.cleanup()
+
+    def scores(self):
+        return {disc['id']: disc['engagement_score'] for disc in self.repository.iter_all()}
+
+    def test_a_persisted_row_loses_its_recency_bonus_as_it_ages(self):
+        self.repository.upsert_many([_discussion('a', days_old=5)])
+        self.repository.refresh_scores(NOW)
+        self.assertEqual(self.scores(), {'a': 112})  # (3*2 + 10*5) * 2
+
+        later = NOW + timedelta(days=3)
+        self.repository.refresh_scores(later)
+        self.assertEqual(self.scores(), {'a': 84})  # * 1.5
+        top, = self.repository.top(1)
+        self.assertEqual(top['engagement_score'], 84)
+
+    def test_only_rows_that_crossed_a_tier_are_updated(self):
+        self.repository.upsert_many([_discussion('fresh', 1), _discussion('week', 6.5), _discussion('old', 90)])
+        self.assertEqual(self.repository.refresh_scores(NOW), 3)  # no earlier refresh: every row
+        self.assertEqual(self.repository.refresh_scores(NOW + timedelta(days=1)), 1)
+
+    def test_refreshed_scores_match_engagement_score(self):
+        discussions = [_discussion(f"d{age}", age, comments=age % 7 + 1) for age in range(0, 60, 3)]
+        self.repository.upsert_many(discussions)
+        self.repository.refresh_scores(NOW)
+
+        for days in (2, 9, 25, 40):
+            now = NOW + timedelta(days=days, hours=5)
+            self.repository.refresh_scores(now)
+            expected = {disc['id']: engagement_score(disc, now) for disc in discussions}
+            self.assertEqual(self.scores(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+"""
+Tests for ComprehensiveHealthAggregator with the network mocked out
+
+Each test runs in its own temporary directory, since the aggregator reads and
+writes its data and state files in the working directory.
+
+python -m pytest test_wmhealth_aggregator.py
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import requests
+
+import http_client
+import http_fixtures
+from sqlite_repository import DiscussionRepository
+from wmhealthAggregatorComp import ComprehensiveHealthAggregator
+
+FEED_URL = 'https://example.org/rss'
+
+
+class AggregatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        self._quiet = mock.patch('builtins.print')
+        self._quiet.start()
+
+    def tearDown(self):
+        self._quiet.stop()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def write(self, name, text):
+        with open(name, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+class RssValidatorTest(AggregatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write('rss_feeds.json', '{"feeds": [{"url": "%s", "category": "Menopause"}]}' % FEED_URL)
+
+    def _crawled_headers(self, incremental):
+        aggregator = ComprehensiveHealthAggregator(incremental=incremental)
+        aggregator.feeds.record(FEED_URL, 200, {'ETag': '"v1"', 'Last-Modified': 'Mon, 22 Dec 2025 15:24:00 GMT'})
+        job, = aggregator.rss_crawl().jobs
+        return job.headers
+
+    def test_full_runs_fetch_the_whole_feed(self):
+        headers = self._crawled_headers(incremental=False)
+        self.assertNotIn('If-None-Match', headers)
+        self.assertNotIn('If-Modified-Since', headers)
+
+    def test_incremental_runs_send_the_validators(self):
+        headers = self._crawled_headers(incremental=True)
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.assertEqual(headers['If-Modified-Since'], 'Mon, 22 Dec 2025 15:24:00 GMT')
+
+    def test_validators_are_kept_in_the_crawl_state_not_the_feed_list(self):
+        aggregator = ComprehensiveHealthAggregator()
+        response = requests.Response()
+        response.status_code = 304
+        aggregator._handle_rss(aggregator.rss_crawl().jobs[0], response, None)
+        aggregator.state.save()
+
+        with open('rss_feeds.json', encoding='utf-8') as f:
+            self.assertNotIn('last_status', f.read())
+        self.assertEqual(ComprehensiveHealthAggregator().state.section('feeds')[FEED_URL]['last_status'], 304)
+
+
+class CategorizeTest(AggregatorTestCase):
+    def test_batches_keep_the_feed_topic_when_nothing_matches(self):
+        aggregator = ComprehensiveHealthAggregator()
+        for disc_id, text in (('a', 'Sleep tips for night sweats'), ('b', 'New PCOS guidelines')):
+            aggregator._add_discussion({'id': disc_id, 'platform': 'RSS Feed', 'category': 'Menopause'}, text)
+        with mock.patch.object(aggregator.classifier, 'classify_many',
+                               wraps=aggregator.classifier.classify_many) as classify_many:
+            aggregator.categorize_pending()
+            aggregator.categorize_pending()  # nothing left
+        self.assertEqual(classify_many.call_count, 1)
+        self.assertEqual([d['category'] for d in aggregator.discussions], ['Menopause', 'PCOS'])
+
+
+class DatabaseScoresTest(AggregatorTestCase):
+    def _discussion(self, disc_id, days_old, **extra):
+        created = (datetime.now() - timedelta(days=days_old)).isoformat()
+        return {'id': disc_id, 'platform': 'Reddit', 'source': 'r/PCOS', 'category': 'PCOS',
+                'title': disc_id, 'content': '', 'url': f"https://reddit.com/{disc_id}",
+                'num_comments': 10, 'created_utc': created, 'fetched_date': created, **extra}
+
+    def test_rows_from_earlier_runs_are_ranked_on_fresh_scores(self):
+        repository = DiscussionRepository('complete_health_data.db')
+        repository.upsert_many([self._discussion('old', days_old=40, engagement_score=999)])
+        repository.close()
+
+        aggregator = ComprehensiveHealthAggregator(db_path='complete_health_data.db')
+        aggregator._add_discussion(self._discussion('new', days_old=1))
+        aggregator.rank_discussions()
+        aggregator.save_data()
+        aggregator.generate_dashboard(open_browser=False)
+
+        ranked = [(d['id'], d['engagement_score']) for d in aggregator.repository.top(2)]
+        self.assertEqual(ranked, [('new', 100), ('old', 50)])
+
+    def test_only_changed_discussions_are_written(self):
+        aggregator = ComprehensiveHealthAggregator(db_path='complete_health_data.db')
+        aggregator._add_discussion(self._discussion('a', days_old=1))
+        aggregator.rank_discussions()
+        with mock.patch.object(aggregator.repository, 'upsert_many', wraps=aggregator.repository.upsert_many) as upsert:
+            aggregator.save_data()
+            aggregator.rank_discussions()
+            aggregator.save_data()
+        self.assertEqual([len(call.args[0]) for call in upsert.call_args_list], [1, 0])
+
+
+class ReplayIsolationTest(AggregatorTestCase):
+    LIVE_FILES = ('complete_health_data.json', 'crawl_state.json', 'rss_feeds.json')
+
+    def setUp(self):
+        super().setUp()
+        self.write('complete_health_data.json', '{"discussions": []}')
+        self.write('rss_feeds.json', '{"feeds": [{"url": "%s"}]}' % FEED_URL)
+        # Every live breaker open
+        breaker = {'state': 'open', 'consecutive_failures': 3, 'successes': 0, 'failures': 3,
+                   'opened_at': time.time(), 'cooldown': 3600, 'last_error': 'HTTP 503'}
+        self.write('crawl_state.json', json.dumps({'breakers': {'host:example.org': breaker}}))
+        self.live = {name: open(name, 'rb').read() for name in self.LIVE_FILES}
+
+        http_client.use_fixtures(http_fixtures.FixtureStore('replay', 'fixtures', latency=0))
+        self.addCleanup(http_client.use_fixtures, None)
+
+    def _replay(self):
+        aggregator = ComprehensiveHealthAggregator(db_path='complete_health_data.db')
+        aggregator.fetch_all_platforms(concurrent=True)  # no fixtures: every request fails
+        aggregator._add_discussion({
+            'id': 'rss_1', 'platform': 'RSS Feed', 'source': 'Example', 'category': 'Menopause',
+            'title': 'Hot flashes', 'content': 'What helped you?', 'url': 'https://example.org/1',
+            'published_at': datetime.now().isoformat(), 'fetched_date': datetime.now().isoformat(),
+        })
+        aggregator.rank_discussions()
+        aggregator.save_data()
+        aggregator.generate_dashboard(open_browser=False)
+        return aggregator
+
+    def test_replays_ignore_live_breakers(self):
+        aggregator = ComprehensiveHealthAggregator()
+        self.assertTrue(aggregator.breakers.allow('RSS Feed', FEED_URL))
+
+    def test_replays_leave_live_files_alone(self):
+        self._replay()
+        self._replay()  # and don't remember the first replay's failures either
+
+        for name in self.LIVE_FILES:
+            self.assertEqual(open(name, 'rb').read(), self.live[name], name)
+        for name in ('complete_health_data.db', 'womens_health_hub.html'):
+            self.assertFalse(os.path.exists(name), name)
+        output = os.listdir(os.path.join('fixtures', 'replay_output'))
+        self.assertIn('complete_health_data.json', output)
+        self.assertIn('complete_health_data.db', output)
+        self.assertIn('womens_health_hub.html', output)
+
+
+class RedditWatermarkTest(AggregatorTestCase):
+    def _post(self, n, created, **extra):
+        return {'data': {'id': f"p{n}", 'name': f"t3_p{n}", 'title': f"post {n}", 'selftext': '',
+                         'permalink': f"/r/PCOS/{n}", 'author': 'someone', 'score': 1, 'num_comments': 0,
+                         'created_utc': created, 'subreddit': 'PCOS', **extra}}
+
+    def _crawl(self, watermark_post):
+        aggregator = ComprehensiveHealthAggregator(incremental=True)
+        listings = [job.context['listing'] for job in aggregator.reddit_crawl().jobs]
+        for listing in listings:
+            aggregator.state.set_watermark('reddit', listing, {'fullname': 't3_mark', 'created_utc': 1500})
+
+        requested = []
+
+        def get(url, source=None, params=None, **kwargs):
+            requested.append((url.rsplit('/', 1)[-1], dict(params or {})))
+            if 'id' in (params or {}):
+                children = [watermark_post] if watermark_post else []
+            elif 'before' in (params or {}):
+                children = []  # Reddit returns nothing before a post it no longer lists
+            else:
+                children = [self._post(3, 3000), self._post(2, 2000), self._post(1, 1000)]
+            response = requests.Response()
+            response.status_code = 200
+            response._content = json.dumps({'data': {'children': children, 'after': None}}).encode()
+            return response
+
+        with mock.patch.object(http_client, 'get', get):
+            aggregator.fetch_reddit()
+        return aggregator, listings, requested
+
+    def test_quiet_listings_cost_no_full_page(self):
+        aggregator, listings, requested = self._crawl(self._post('mark', 1500))
+        full_pages = [params for name, params in requested if name == 'new.json' and 'before' not in params]
+        self.assertEqual(full_pages, [])
+        self.assertEqual(len(requested), 2 * len(listings))
+        self.assertEqual(len(aggregator.discussions), 0)
+
+    def test_deleted_watermark_does_not_stall_the_listing(self):
+        deleted = self._post('mark', 1500, author='[deleted]', removed_by_category='deleted')
+        for watermark_post in (None, deleted):
+            aggregator, listings, _ = self._crawl(watermark_post)
+            self.assertEqual(sorted(d['id'] for d in aggregator.discussions), ['reddit_p2', 'reddit_p3'])
+            for listing in listings:
+                self.assertEqual(aggregator.state.watermark('reddit', listing)['fullname'], 't3_p3')
+
+
+class DuplicateMemoryTest(AggregatorTestCase):
+    STORY = ("After two years of pain my gynecologist finally confirmed stage three "
+             "endometriosis during laparoscopy and I wanted to share what helped me")
+
+    def _copy(self, disc_id, source, score):
+        created = datetime.now().isoformat()
+        return {'id': disc_id, 'platform': 'Reddit', 'source': source, 'category': 'Endometriosis',
+                'title': 'Finally diagnosed', 'content': self.STORY, 'url': f"https://reddit.com/{disc_id}",
+                'num_comments': score, 'created_utc': created, 'fetched_date': created}
+
+    def _run(self, *copies):
+        aggregator = ComprehensiveHealthAggregator(incremental=True)
+        added = [aggregator._add_discussion(disc) for disc in copies]
+        aggregator.rank_discussions()
+        aggregator.collapse_near_duplicates()
+        aggregator.save_data()
+        return aggregator, added
+
+    def _links(self, aggregator):
+        return {disc['id']: sorted(link['id'] for link in disc.get('duplicates', [])) for disc in aggregator.discussions}
+
+    def test_folded_copies_stay_folded(self):
+        aggregator, _ = self._run(self._copy('kept', 'r/Endo', 30), self._copy('copy', 'r/endometriosis', 10))
+        self.assertEqual(self._links(aggregator), {'kept': ['copy']})
+
+        # The next run fetches both again, plus a third copy from somewhere new
+        aggregator, added = self._run(self._copy('kept', 'r/Endo', 31), self._copy('copy', 'r/endometriosis', 12),
+                                      self._copy('third', 'r/WomensHealth', 5))
+        self.assertEqual(added, [False, False, True])
+        self.assertEqual(self._links(aggregator), {'kept': ['copy', 'third']})
+        self.assertEqual(aggregator.discussions.get('kept')['num_comments'], 31)
+
+
+if __name__ == '__main__':
+    unittest.main()
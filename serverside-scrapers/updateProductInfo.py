@@ -1,11 +1,14 @@
 import json
-import time
-import random
+import os
 from pathlib import Path
-from typing import Dict, Any, List, Callable
+from urllib.parse import urlsplit
+from concurrent.futures import Executor, Future
+from typing import Dict, Any, List, Callable, Tuple
 
-import requests
-from bs4 import BeautifulSoup
+import http_client
+from crawl_engine import parse_pool
+from html_parsing import Node, Selector, parse_html
+from run_metrics import metrics, timed
 
 INPUT_FILE = Path("womenhealthproducts.json")
 OUTPUT_FILE = Path("womenhealthproducts_updated.json")
@@ -16,8 +19,9 @@ HEADERS = {
         "Chrome/122.0 Safari/537.36"
     )
 }
-REQUEST_TIMEOUT = 10
-SLEEP_BETWEEN_CALLS = (1, 3)  # seconds, min/max
+REQUEST_TIMEOUT = 10  # pacing per site is up to http_client's rate limiter
+RUN_REPORT = Path("products_run_report.json")
+PROMETHEUS_TEXTFILE = os.environ.get("PROMETHEUS_TEXTFILE")  # optional node_exporter textfile
 
 
 # --- SCRAPER HELPERS ---------------------------------------------------------
@@ -31,24 +35,35 @@ def fetch_page_via_scraper(url: str) -> str | None:
         "url": url,
         "country": "in",
     }
-    r = requests.get(SCRAPER_ENDPOINT, params=params, timeout=20)
+    r = http_client.get(SCRAPER_ENDPOINT, params=params, timeout=20)
     if r.status_code == 200:
         return r.text
     print("Scraper error:", r.status_code, r.text[:200])
     return None
 
-def fetch_page(url: str) -> BeautifulSoup | None:
-    """Fetch a page and return BeautifulSoup object, or None on failure."""
+AMAZON_PRICE = Selector("span.a-price-whole")
+AMAZON_RATING = Selector("span.a-icon-alt")
+SPAN = Selector("span")
+
+
+def fetch_raw(url: str) -> bytes | None:
+    """Fetch a page and return its raw body, or None on failure."""
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+        resp = http_client.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
         resp.raise_for_status()
-        return BeautifulSoup(resp.text, "html.parser")
+        return resp.content
     except Exception as e:
         print(f"[WARN] Failed to fetch {url}: {e}")
         return None
 
 
-def parse_amazon(soup: BeautifulSoup) -> Dict[str, Any]:
+def fetch_page(url: str) -> Node | None:
+    """Fetch a page and return its parsed document (see html_parsing), or None on failure."""
+    content = fetch_raw(url)
+    return parse_html(content) if content is not None else None
+
+
+def parse_amazon(soup: Node) -> Dict[str, Any]:
     """
     Extract a rough price range, rating and delivery from an Amazon search page.
     This is intentionally fragile and may need adjustment if Amazon layout changes.
@@ -61,14 +76,14 @@ def parse_amazon(soup: BeautifulSoup) -> Dict[str, Any]:
     delivery = None
 
     # price
-    for span in soup.select("span.a-price-whole"):
-        txt = span.get_text(strip=True).replace(",", "")
+    for span in soup.select(AMAZON_PRICE):
+        txt = span.text().replace(",", "")
         if txt.isdigit():
             prices.append(int(txt))
 
     # rating
-    for span in soup.select("span.a-icon-alt"):
-        txt = span.get_text(strip=True)
+    for span in soup.select(AMAZON_RATING):
+        txt = span.text()
         # e.g. "4.3 out of 5 stars"
         if "out of 5" in txt:
             try:
@@ -77,9 +92,9 @@ def parse_amazon(soup: BeautifulSoup) -> Dict[str, Any]:
                 continue
 
     # delivery text (very heuristic)
-    delivery_span = soup.find("span", string=lambda x: x and "day" in x.lower())
+    delivery_span = next((span for span in soup.select(SPAN) if "day" in span.text().lower()), None)
     if delivery_span:
-        delivery = delivery_span.get_text(strip=True)
+        delivery = delivery_span.text()
 
     data: Dict[str, Any] = {}
     if prices:
@@ -95,7 +110,7 @@ def parse_amazon(soup: BeautifulSoup) -> Dict[str, Any]:
     return data
 
 
-def parse_generic_search(soup: BeautifulSoup) -> Dict[str, Any]:
+def parse_generic_search(soup: Node) -> Dict[str, Any]:
     """
     Fallback parser for sites where exact scraping strategy is not defined.
     Uses a simple heuristic similar to Amazon but more generic.
@@ -107,7 +122,7 @@ def parse_generic_search(soup: BeautifulSoup) -> Dict[str, Any]:
     ratings = []
 
     # find any "₹xxx" patterns
-    for el in soup.find_all(string=True):
+    for el in soup.strings():
         text = el.strip()
         if "₹" in text:
             # crude extraction of numbers after ₹
@@ -125,7 +140,7 @@ def parse_generic_search(soup: BeautifulSoup) -> Dict[str, Any]:
                 continue
 
     # find ratings like "4.3/5" or "4.3 out of 5"
-    for el in soup.find_all(string=True):
+    for el in soup.strings():
         t = el.strip()
         if "/5" in t:
             try:
@@ -152,28 +167,50 @@ def parse_generic_search(soup: BeautifulSoup) -> Dict[str, Any]:
 
 
 # Map of domain -> parser
-DOMAIN_PARSERS: Dict[str, Callable[[BeautifulSoup], Dict[str, Any]]] = {
+DOMAIN_PARSERS: Dict[str, Callable[[Node], Dict[str, Any]]] = {
     "amazon.in": parse_amazon,
     # For now, other domains use the generic parser; you can create
     # site-specific ones (flipkart, 1mg, pharmeasy, nykaa, etc.)
 }
 
 
-def choose_parser(url: str) -> Callable[[BeautifulSoup], Dict[str, Any]]:
+def choose_parser(url: str) -> Callable[[Node], Dict[str, Any]]:
     for domain, parser in DOMAIN_PARSERS.items():
         if domain in url:
             return parser
     return parse_generic_search
 
 
+def parse_site_page(url: str, content: bytes | None) -> Dict[str, Any]:
+    """
+    Parse a fetched page with the parser for its domain. Module-level and
+    side-effect free so it can run in a worker process.
+    """
+    soup = parse_html(content) if content is not None else None
+    return choose_parser(url)(soup)
+
+
 # --- MAIN REFRESH LOGIC ------------------------------------------------------
 
-def refresh_sites_for_product(product: Dict[str, Any]) -> None:
+def apply_site_update(site: Dict[str, Any], parsed: Dict[str, Any]) -> None:
+    # overwrite dynamic fields if parser returned values
+    for key in ("priceRange", "rating", "inStock", "delivery"):
+        if key in parsed:
+            site[key] = parsed[key]
+
+
+def refresh_sites_for_product(product: Dict[str, Any],
+                              pool: Executor | None = None) -> List[Tuple[Dict[str, Any], Future]]:
     """
     Given a product dict (with a 'sites' list), update each site entry in-place
     using live data from the corresponding 'link' URL.
     All existing keys are preserved; only dynamic fields are overwritten if found.
+
+    With a pool, pages are parsed there while we fetch the next one; the
+    (site, future) pairs are returned for the caller to apply. Each future
+    resolves to (parse seconds, parsed fields).
     """
+    pending: List[Tuple[Dict[str, Any], Future]] = []
     sites: List[Dict[str, Any]] = product.get("sites", [])
     for site in sites:
         url = site.get("link")
@@ -181,37 +218,57 @@ def refresh_sites_for_product(product: Dict[str, Any]) -> None:
             continue
 
         print(f"[INFO] Updating {product.get('name')} | {site.get('name')} -> {url}")
-        soup = fetch_page(url)
-        parser = choose_parser(url)
-        parsed = parser(soup)
+        content = fetch_raw(url)
+        if pool is not None:
+            pending.append((site, pool.submit(timed, parse_site_page, url, content)))
+        else:
+            seconds, parsed = timed(parse_site_page, url, content)
+            metrics.record_parse(urlsplit(url).hostname or '', seconds)
+            apply_site_update(site, parsed)
 
-        # overwrite dynamic fields if parser returned values
-        for key in ("priceRange", "rating", "inStock", "delivery"):
-            if key in parsed:
-                site[key] = parsed[key]
-
-        # polite delay to avoid hammering sites
-        time.sleep(random.uniform(*SLEEP_BETWEEN_CALLS))
+    return pending
 
 
 def main():
+    metrics.reset("products")
+
     # 1. Load original JSON exactly as is
     with INPUT_FILE.open("r", encoding="utf-8") as f:
         data = json.load(f)
 
     # 2. Iterate over products and refresh per-site info
+    #    Parsing runs in worker processes so it never delays the next fetch.
     products: List[Dict[str, Any]] = data.get("products", [])
-    for product in products:
-        refresh_sites_for_product(product)
+    pending: List[Tuple[Dict[str, Any], Future]] = []
+    with parse_pool() as pool:
+        with metrics.stage("fetch"):
+            for product in products:
+                pending.extend(refresh_sites_for_product(product, pool))
+
+        for site, future in pending:
+            try:
+                seconds, parsed = future.result()
+            except Exception as e:
+                print(f"[WARN] Failed to parse {site.get('link')}: {e}")
+                continue
+            metrics.record_parse(urlsplit(site["link"]).hostname or '', seconds)
+            apply_site_update(site, parsed)
 
     # 3. Write back JSON with same structure (categories + products)
     #    json.dump preserves keys per object as they exist in memory.
     #    Since we never change key names or nesting, structure remains 100%.
-    with OUTPUT_FILE.open("w", encoding="utf-8") as f:
+    with metrics.stage("write"), OUTPUT_FILE.open("w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
     print(f"[DONE] Updated data written to {OUTPUT_FILE}")
 
+    # 4. Request counts, latencies and stage timings for this run
+    metrics.set_count("sites", len(pending))
+    report = metrics.write_report(RUN_REPORT)
+    if PROMETHEUS_TEXTFILE:
+        metrics.write_prometheus(PROMETHEUS_TEXTFILE, report)
+    print(f"[DONE] Run report written to {RUN_REPORT}")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,15 +3,35 @@ Comprehensive Women's Health Discussion Aggregator
 Pulls from: Reddit, Mastodon, RSS, HealthUnlocked, Patient.info, Inspire.com, Stack Exchange
 
 ONE-SHOT EXECUTION: Run once, get complete dashboard ranked by engagement
+Pass --concurrent to fetch every platform at the same time, and --incremental to
+merge only what is new since the last run into complete_health_data.json.
+Pass --storage ndjson to append changes to complete_health_data.ndjson instead
+of rewriting the whole JSON file, and --db to also keep an indexed SQLite copy
+that the dashboard queries for its rankings.
+Scraped HTML pages are parsed in a process pool (page_parsers.py) while the
+fetchers keep downloading. Cross-posted copies of one story are collapsed into
+their highest-engagement version (near_duplicates.py).
+Set STACKEXCHANGE_KEY to a registered Stack Apps key for the larger daily quota.
+Every run writes per-source request counts, bytes and latencies plus per-stage
+timings to aggregator_run_report.json; pass --prometheus PATH to also write
+them as a Prometheus textfile.
+HTTP_FIXTURES=record saves every response under http_fixtures/, and
+HTTP_FIXTURES=replay runs the whole pipeline from them offline (http_fixtures.py),
+starting from the crawl state saved with them. A replay writes its data,
+dashboard and reports to http_fixtures/replay_output/ and never touches the
+live files.
 
 INSTALLATION:
 pip install requests beautifulsoup4 feedparser lxml
+pip install pyahocorasick   # optional, faster categorization
+pip install selectolax      # optional, faster HTML parsing (or: pip install cssselect)
+pip install numpy           # optional, vectorized engagement scoring
 """
 
+import argparse
 import json
-import requests
-from bs4 import BeautifulSoup
-import feedparser
+import os
+from pathlib import Path
 from datetime import datetime, timedelta
 import time
 import webbrowser
@@ -19,11 +39,132 @@ from collections import defaultdict
 import re
 from urllib.parse import quote, urljoin
 
+from crawl_engine import FetchJob, PlatformCrawl, parse_pool, run_concurrent, run_sequential
+from condition_classifier import DEFAULT_CATEGORY, get_classifier
+from circuit_breaker import CircuitBreakers
+from crawl_state import STATE_PATH, CrawlState
+from dashboard_renderer import render_dashboard
+from feed_registry import FeedRegistry
+import http_client
+from page_parsers import parse_healthunlocked, parse_inspire, parse_patient_info, parse_rss
+from run_metrics import metrics
+from static_shards import ShardWriter
+from discussion_ids import stable_id
+from discussion_store import DiscussionStore
+from engagement_scoring import engagement_score, rescore
+import near_duplicates
+from ndjson_storage import NDJSON_PATH, NdjsonStorage
+from sqlite_repository import DiscussionRepository
+
+# Max in-flight requests per platform when fetching concurrently
+PLATFORM_CONCURRENCY = {
+    'Reddit': 4,
+    'Mastodon': 3,  # per instance, instances run side by side
+    'HealthUnlocked': 2,
+    'Patient.info': 4,
+    'Inspire.com': 2,
+    'Stack Exchange': 1,  # `backoff` is per API method, so never overlap requests
+    'RSS Feed': 16,  # feeds mostly live on different hosts
+}
+
+# Platforms spread over independent hosts: one dead feed or instance says
+# nothing about the others, so these only get per-host circuit breakers
+PER_HOST_BREAKERS = ('Mastodon', 'RSS Feed')
+
+# Reddit is read through combined /r/A+B+C/new.json listings, REDDIT_BATCH_SIZE
+# subreddits per listing. Full runs page back with `after`, incremental runs page
+# forward from the watermark with `before`; either way at most `reddit_depth` pages
+# of REDDIT_LISTING_LIMIT posts per listing.
+REDDIT_LISTING_LIMIT = 100
+REDDIT_BATCH_SIZE = 10
+REDDIT_MAX_PAGES = 5
+# Looks up posts by fullname, e.g. whether a watermark post still exists
+REDDIT_INFO_URL = 'https://www.reddit.com/api/info.json'
+
+# Mastodon tag timelines return at most 40 toots per page; pages per (instance, tag)
+MASTODON_PAGE_LIMIT = 40
+MASTODON_MAX_PAGES = 3
+
+# Stack Exchange: one /questions listing per site, sorted by activity and
+# matched against our tags locally (the API's `tagged` is an AND, not an OR).
+# Full runs read the most recently active questions, incremental runs walk
+# forward from the last activity date seen with `min`.
+STACK_EXCHANGE_API = 'https://api.stackexchange.com/2.3'
+STACK_EXCHANGE_SITES = {'health': 'Health SE'}
+STACK_EXCHANGE_TAGS = {
+    'womens-health', 'pregnancy', 'gynecology', 'menopause',
+    'contraception', 'fertility', 'menstruation', 'pcos'
+}
+STACK_EXCHANGE_PAGE_SIZE = 100
+STACK_EXCHANGE_MAX_PAGES = 5
+STACK_EXCHANGE_MIN_QUOTA = 25  # stop paging once the daily quota gets this low
+# Only what _handle_stack_exchange reads (see /docs/filters)
+STACK_EXCHANGE_FIELDS = [
+    '.backoff', '.error_id', '.error_message', '.error_name', '.has_more',
+    '.items', '.quota_max', '.quota_remaining',
+    'question.answer_count', 'question.body', 'question.creation_date', 'question.last_activity_date',
+    'question.link', 'question.owner', 'question.question_id', 'question.score',
+    'question.tags', 'question.title', 'question.view_count', 'shallow_user.display_name',
+]
+
+# Dashboard card limits
+DASHBOARD_RECENT_CARDS = 200
+DASHBOARD_CARDS_PER_CATEGORY = 30
+
+# Per-run request and stage timings (see run_metrics.py)
+RUN_REPORT = 'aggregator_run_report.json'
+
+# Under the fixture directory: where a replay writes its data, dashboard and reports
+REPLAY_OUTPUT = 'replay_output'
+
 
 class ComprehensiveHealthAggregator:
-    def __init__(self):
-        self.discussions = []
-        self.filename = 'complete_health_data.json'
+    def __init__(self, incremental=False, storage='json', db_path=None, reddit_depth=REDDIT_MAX_PAGES):
+        self.discussions = DiscussionStore()
+        self.new_counts = defaultdict(int)  # new discussions per platform this run
+        self.seen_ids = set()  # ids fetched this run
+        self.classifier = get_classifier()
+        self.uncategorized = []  # (discussion, text) stored since the last categorize_pending()
+
+        # Replays start from the state recorded with the fixtures and never save
+        # it, so live breakers don't skip sources and the live watermarks,
+        # breakers and feed validators are left alone. Everything else they
+        # write goes under the fixtures too (see output_path()).
+        fixtures = http_client.fixtures
+        self.replaying = fixtures is not None and fixtures.mode == 'replay'
+        self.output_dir = fixtures.directory / REPLAY_OUTPUT if self.replaying else Path('.')
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.filename = self.output_path('complete_health_data.json')
+
+        # Incremental runs start from the previous store and per-source watermarks
+        self.incremental = incremental
+        if self.replaying:
+            self.state = CrawlState(fixtures.directory / STATE_PATH.name)
+        else:
+            self.state = CrawlState()
+        if fixtures is not None and fixtures.mode == 'record':
+            # The state this run's requests are made from, for replays to start from
+            fixtures.directory.mkdir(parents=True, exist_ok=True)
+            self.state.save(fixtures.directory / STATE_PATH.name)
+        self.feeds = FeedRegistry(self.state)  # RSS feeds; their ETag / Last-Modified live in the state
+        # Skip sources that keep failing
+        self.breakers = CircuitBreakers(self.state, per_host=PER_HOST_BREAKERS)
+        self.reddit_depth = max(reddit_depth, 1)  # listing pages per Reddit batch
+
+        # 'json' rewrites self.filename each run, 'ndjson' appends only what changed
+        self.storage = NdjsonStorage(self.output_path(NDJSON_PATH)) if storage == 'ndjson' else None
+        # Optional SQLite copy for ranked queries (dashboard, exports)
+        self.repository = DiscussionRepository(self.output_path(db_path)) if db_path else None
+
+        if incremental and self.storage is not None:
+            self.discussions = self.storage.load()
+            print(f"✅ Loaded {len(self.discussions)} discussions from {self.storage.path}")
+        elif incremental and os.path.exists(self.filename):
+            self.discussions = DiscussionStore.load_json(self.filename)
+            print(f"✅ Loaded {len(self.discussions)} discussions from {self.filename}")
+        # Copies already folded into another discussion, not to be stored again
+        self.duplicate_ids = near_duplicates.duplicate_ids(self.discussions)
+        self.signatures = near_duplicates.SignatureCache(self.output_path(near_duplicates.SIGNATURES_PATH))
 
         # Comprehensive women's health conditions
         self.health_conditions = [
@@ -53,165 +194,206 @@ class ComprehensiveHealthAggregator:
             'Fibromyalgia', 'Chronic Fatigue'
         ]
 
+    def output_path(self, path):
+        """Where to write `path`: as given, or under the fixtures when replaying"""
+        return str(self.output_dir / Path(path).name) if self.replaying else str(path)
+
     def calculate_engagement_score(self, disc):
         """Calculate engagement score for ranking"""
-        score = 0
-
-        # Base scores from different metrics
-        if 'score' in disc:
-            score += disc['score'] * 2
-        if 'num_comments' in disc:
-            score += disc['num_comments'] * 5
-        if 'replies_count' in disc:
-            score += disc['replies_count'] * 5
-        if 'views' in disc:
-            score += disc['views'] * 0.1
-        if 'likes' in disc:
-            score += disc['likes'] * 2
-
-        # Recency bonus
-        try:
-            date_str = disc.get('created_utc', disc.get('published_at', disc.get('fetched_date', '')))
-            if date_str:
-                post_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                days_old = (datetime.now() - post_date.replace(tzinfo=None)).days
-                if days_old < 7:
-                    score *= 2
-                elif days_old < 30:
-                    score *= 1.5
-        except:
-            pass
-
-        return int(score)
+        return engagement_score(disc)
+
+    def rank_discussions(self, now=None):
+        """Rescore every discussion against `now` in one pass and sort by engagement"""
+        with metrics.stage('score'):
+            rescore(self.discussions, now)
+            self.discussions.sort(key=lambda x: x.get('engagement_score', 0), reverse=True)
+
+    def collapse_near_duplicates(self):
+        """Keep one discussion per cross-posted story, linking the copies from it"""
+        with metrics.stage('near_duplicates'):
+            clusters, removed = near_duplicates.collapse(self.discussions, self.signatures, self.incremental)
+            self.duplicate_ids = near_duplicates.duplicate_ids(self.discussions)
+        if removed:
+            print(f"🧬 Collapsed {removed} near-duplicate copies into {clusters} discussions")
+        return removed
 
     def categorize_content(self, text):
         """Categorize based on comprehensive condition list"""
-        text_lower = text.lower()
-
-        # Priority matching (most specific first)
-        if any(word in text_lower for word in ['pcos', 'polycystic']):
-            return 'PCOS'
-        elif any(word in text_lower for word in ['endometriosis', 'endo ']):
-            return 'Endometriosis'
-        elif any(word in text_lower for word in ['fibroid', 'leiomyoma']):
-            return 'Uterine Fibroids'
-        elif any(word in text_lower for word in ['breast cancer']):
-            return 'Breast Cancer'
-        elif any(word in text_lower for word in ['cervical cancer', 'hpv vaccine']):
-            return 'Cervical Cancer'
-        elif any(word in text_lower for word in ['ovarian cancer']):
-            return 'Ovarian Cancer'
-        elif any(word in text_lower for word in ['menopause', 'perimenopause', 'hot flash']):
-            return 'Menopause'
-        elif any(word in text_lower for word in ['yeast infection', 'candida', 'thrush']):
-            return 'Yeast Infection'
-        elif any(word in text_lower for word in ['uti', 'urinary tract', 'bladder infection']):
-            return 'UTI'
-        elif any(word in text_lower for word in ['ovarian cyst']):
-            return 'Ovarian Cysts'
-        elif any(word in text_lower for word in ['pid', 'pelvic inflammatory']):
-            return 'Pelvic Inflammatory Disease'
-        elif any(word in text_lower for word in ['infertility', 'infertile', 'ttc', 'trying to conceive', 'ivf', 'fertility']):
-            return 'Infertility & Fertility'
-        elif any(word in text_lower for word in ['pms', 'pmdd', 'premenstrual']):
-            return 'PMS & PMDD'
-        elif any(word in text_lower for word in ['gestational diabetes']):
-            return 'Gestational Diabetes'
-        elif any(word in text_lower for word in ['postpartum depression', 'ppd', 'postnatal depression']):
-            return 'Postpartum Depression'
-        elif any(word in text_lower for word in ['thyroid', 'hypothyroid', 'hyperthyroid', 'hashimoto']):
-            return 'Thyroid Disorders'
-        elif any(word in text_lower for word in ['osteoporosis', 'bone density']):
-            return 'Osteoporosis'
-        elif any(word in text_lower for word in ['preeclampsia', 'pre-eclampsia']):
-            return 'Preeclampsia'
-        elif any(word in text_lower for word in ['vaginismus']):
-            return 'Vaginismus'
-        elif any(word in text_lower for word in ['bacterial vaginosis', 'bv ']):
-            return 'Bacterial Vaginosis'
-        elif any(word in text_lower for word in ['lupus', 'autoimmune', 'rheumatoid']):
-            return 'Autoimmune Diseases'
-        elif any(word in text_lower for word in ['pregnancy', 'pregnant', 'expecting', 'prenatal']):
-            return 'Pregnancy'
-        elif any(word in text_lower for word in ['anxiety', 'depression', 'mental health', 'therapy']):
-            return 'Mental Health'
-        elif any(word in text_lower for word in ['fibromyalgia']):
-            return 'Fibromyalgia'
-        else:
-            return 'General Women\'s Health'
+        return self.classifier.classify(text)
 
-    # ========== REDDIT ==========
-    def fetch_reddit(self):
-        """Fetch from Reddit"""
-        print("\n🔴 Fetching from Reddit...")
+    def categorize_pending(self):
+        """Categorize the discussions stored since the last call in one batch"""
+        pending, self.uncategorized = self.uncategorized, []
+        if not pending:
+            return
+        with metrics.stage('categorize'):
+            categories = self.classifier.classify_many(text for _, text in pending)
+        for (disc, _), category in zip(pending, categories):
+            # Keep the category the handler gave (e.g. an RSS feed's topic) when nothing matches
+            if category != DEFAULT_CATEGORY:
+                disc['category'] = category
+
+    def _add_discussion(self, discussion, text=None):
+        """
+        Store a discussion. Duplicates within a run and copies already folded
+        into another discussion are skipped; discussions carried over from a
+        previous run are refreshed in place, keeping their duplicate links.
+        If `text` is given, the discussion is categorized by it along with the
+        rest of its crawl (see categorize_pending()). Scores are filled in
+        later by rank_discussions(). Returns True only for discussions we have
+        never stored before.
+        """
+        if discussion['id'] in self.seen_ids or discussion['id'] in self.duplicate_ids:
+            return False
+        self.seen_ids.add(discussion['id'])
+        if text is not None:
+            self.uncategorized.append((discussion, text))
+
+        previous = self.discussions.get(discussion['id'])
+        if previous is not None and previous.get('duplicates'):
+            discussion['duplicates'] = previous['duplicates']
 
+        is_new = self.discussions.upsert(discussion)
+        if is_new:
+            self.new_counts[discussion['platform']] += 1
+        return is_new
+
+    # ========== REDDIT ==========
+    def reddit_crawl(self):
+        # Busy general subreddits come last so they share listings with each
+        # other instead of crowding the small condition-specific ones out of /new
         subreddits = [
             'PCOS', 'Endo', 'endometriosis', 'TryingForABaby', 'infertility',
-            'Menopause', 'pregnant', 'BabyBumps', 'PregnancyAfterLoss',
-            'breastcancer', 'cancer', 'ovariancancer',
+            'Menopause', 'PregnancyAfterLoss', 'breastcancer', 'ovariancancer',
             'thyroidhealth', 'Hypothyroidism', 'Hashimotos',
-            'ttcafterloss', 'IVF', 'stilltrying',
-            'WomensHealth', 'TwoXChromosomes', 'AskWomen',
-            'Fibromyalgia', 'ChronicPain',
+            'ttcafterloss', 'IVF', 'stilltrying', 'WomensHealth',
+            'Fibromyalgia', 'ChronicPain', 'PMDD', 'PMS',
+            'pregnant', 'BabyBumps', 'cancer', 'TwoXChromosomes', 'AskWomen',
             'Anxiety', 'depression', 'mentalhealth',
-            'PMDD', 'PMS',
         ]
 
         headers = {'User-Agent': 'ComprehensiveHealthAggregator/2.0'}
-        new_count = 0
-
-        for subreddit in subreddits:
-            try:
-                url = f"https://www.reddit.com/r/{subreddit}/hot.json?limit=50"
-                response = requests.get(url, headers=headers, timeout=10)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    posts = data['data']['children']
-
-                    for post in posts:
-                        p = post['data']
-                        disc_id = f"reddit_{p['id']}"
-
-                        if any(d['id'] == disc_id for d in self.discussions):
-                            continue
-
-                        full_text = f"{p['title']} {p.get('selftext', '')}"
-                        category = self.categorize_content(full_text)
-
-                        discussion = {
-                            'id': disc_id,
-                            'platform': 'Reddit',
-                            'source': f"r/{subreddit}",
-                            'category': category,
-                            'title': p['title'],
-                            'content': p.get('selftext', '')[:800],
-                            'url': f"https://reddit.com{p['permalink']}",
-                            'author': p['author'],
-                            'score': p['score'],
-                            'num_comments': p['num_comments'],
-                            'created_utc': datetime.fromtimestamp(p['created_utc']).isoformat(),
-                            'fetched_date': datetime.now().isoformat()
-                        }
-
-                        discussion['engagement_score'] = self.calculate_engagement_score(discussion)
-                        self.discussions.append(discussion)
-                        new_count += 1
-
-                    print(f"  ✓ r/{subreddit}: {len(posts)} posts")
-                    time.sleep(1.5)
-
-            except Exception as e:
-                print(f"  ✗ r/{subreddit}: {str(e)}")
-
-        print(f"✅ Reddit: {new_count} discussions")
-        return new_count
+        jobs = []
+
+        for start in range(0, len(subreddits), REDDIT_BATCH_SIZE):
+            listing = '+'.join(subreddits[start:start + REDDIT_BATCH_SIZE])
+            mark = self.state.watermark('reddit', listing) if self.incremental else None
+
+            if mark:
+                # Only posts newer than the last one we saw
+                cursor = {'before': mark['fullname']}
+            else:
+                cursor = {}
+
+            jobs.append(FetchJob(
+                label=f"r/{listing}",
+                url=f"https://www.reddit.com/r/{listing}/new.json",
+                params={'limit': REDDIT_LISTING_LIMIT, **cursor},
+                headers=headers,
+                context={'listing': listing, 'page': 1},
+            ))
+
+        return PlatformCrawl('Reddit', jobs, self._handle_reddit,
+                             concurrency=PLATFORM_CONCURRENCY['Reddit'])
+
+    def _handle_reddit(self, job, response):
+        if response.status_code != 200:
+            return
 
-    # ========== MASTODON ==========
-    def fetch_mastodon(self):
-        """Fetch from Mastodon"""
-        print("\n🐘 Fetching from Mastodon...")
+        listing = job.context['listing']
+        data = response.json()['data']
+        mark = self.state.watermark('reddit', listing) or {'fullname': None, 'created_utc': 0}
+        if job.context.get('check'):
+            return self._reddit_watermark_checked(job, data, mark)
+
+        posts = data['children']
+        since = job.context.get('since')
+        if since is not None:
+            posts = [post for post in posts if post['data']['created_utc'] > since]
+
+        page = job.context['page']
+        if not posts and page == 1 and 'before' in job.params:
+            # Usually just a quiet listing, but a deleted watermark post gives
+            # an empty `before` page too. Ask for that one post before paying
+            # for a full /new page.
+            return [FetchJob(
+                label=f"r/{listing} (watermark check)",
+                url=REDDIT_INFO_URL,
+                params={'id': mark['fullname']},
+                headers=job.headers,
+                context={'listing': listing, 'check': True, 'url': job.url},
+            )]
+
+        for post in posts:
+            p = post['data']
+            if p['created_utc'] > mark['created_utc']:
+                mark = {'fullname': p['name'], 'created_utc': p['created_utc']}
+            full_text = f"{p['title']} {p.get('selftext', '')}"
+
+            self._add_discussion({
+                'id': f"reddit_{p['id']}",
+                'platform': 'Reddit',
+                'source': f"r/{p.get('subreddit', listing)}",
+                'category': DEFAULT_CATEGORY,
+                'title': p['title'],
+                'content': p.get('selftext', '')[:800],
+                'url': f"https://reddit.com{p['permalink']}",
+                'author': p['author'],
+                'score': p['score'],
+                'num_comments': p['num_comments'],
+                'created_utc': datetime.fromtimestamp(p['created_utc']).isoformat(),
+                'fetched_date': datetime.now().isoformat()
+            }, full_text)
+
+        if mark['fullname']:
+            self.state.set_watermark('reddit', listing, mark)
+
+        print(f"  ✓ r/{listing} (page {page}): {len(posts)} posts")
+
+        # A full page means the listing goes on in the direction we are paging
+        # (after filtering by `since`, that the next page may still be newer)
+        if len(posts) < REDDIT_LISTING_LIMIT or page >= self.reddit_depth:
+            return
+
+        if 'before' in job.params:
+            cursor = {'before': posts[0]['data']['name']}
+        elif data.get('after'):
+            cursor = {'after': data['after']}
+        else:
+            return
+
+        return [FetchJob(
+            label=f"r/{listing} (page {page + 1})",
+            url=job.url,
+            params={'limit': REDDIT_LISTING_LIMIT, **cursor},
+            headers=job.headers,
+            context={'listing': listing, 'page': page + 1, 'since': since},
+        )]
+
+    def _reddit_watermark_checked(self, job, data, mark):
+        listing = job.context['listing']
+        found = [post['data'] for post in data['children']]
+        if found and not found[0].get('removed_by_category') and found[0].get('author') != '[deleted]':
+            return  # still listed, nothing new since
+
+        # Gone from /new, so `before` would stall the listing for good: read
+        # /new from the top and keep only what is newer than the watermark
+        return [FetchJob(
+            label=f"r/{listing} (since watermark)",
+            url=job.context['url'],
+            params={'limit': REDDIT_LISTING_LIMIT},
+            headers=job.headers,
+            context={'listing': listing, 'page': 1, 'since': mark['created_utc']},
+        )]
+
+    def fetch_reddit(self):
+        """Fetch from Reddit"""
+        print("\n🔴 Fetching from Reddit...")
+        return self._run_one(self.reddit_crawl())
 
+    # ========== MASTODON ==========
+    def mastodon_crawls(self):
+        """One crawl per instance, so instances are fetched side by side"""
         instances = ['mastodon.social', 'med-mastodon.com']
         hashtags = [
             'PCOS', 'Endometriosis', 'Menopause', 'BreastCancer',
@@ -219,59 +401,87 @@ class ComprehensiveHealthAggregator:
             'ChronicIllness', 'Fibromyalgia', 'Thyroid'
         ]
 
-        new_count = 0
-
+        crawls = []
         for instance in instances:
+            jobs = []
             for hashtag in hashtags:
-                try:
-                    url = f"https://{instance}/api/v1/timelines/tag/{hashtag}"
-                    response = requests.get(url, params={'limit': 20}, timeout=10)
-
-                    if response.status_code == 200:
-                        toots = response.json()
-
-                        for toot in toots:
-                            disc_id = f"mastodon_{toot['id']}"
-
-                            if any(d['id'] == disc_id for d in self.discussions):
-                                continue
-
-                            content = re.sub('<[^<]+?>', '', toot['content'])
-                            category = self.categorize_content(content)
-
-                            discussion = {
-                                'id': disc_id,
-                                'platform': 'Mastodon',
-                                'source': f"{instance}",
-                                'category': category,
-                                'title': content[:150] + '...' if len(content) > 150 else content,
-                                'content': content[:800],
-                                'url': toot['url'],
-                                'author': toot['account']['display_name'] or toot['account']['username'],
-                                'score': toot['favourites_count'] + toot['reblogs_count'],
-                                'num_comments': toot['replies_count'],
-                                'created_utc': toot['created_at'],
-                                'fetched_date': datetime.now().isoformat()
-                            }
-
-                            discussion['engagement_score'] = self.calculate_engagement_score(discussion)
-                            self.discussions.append(discussion)
-                            new_count += 1
-
-                        print(f"  ✓ {instance} #{hashtag}: {len(toots)} toots")
-                        time.sleep(1)
-
-                except Exception as e:
-                    print(f"  ✗ {instance} #{hashtag}: {str(e)}")
-
-        print(f"✅ Mastodon: {new_count} discussions")
-        return new_count
+                params = {'limit': MASTODON_PAGE_LIMIT}
+                since_id = self.state.watermark('mastodon', f"{instance}#{hashtag}") if self.incremental else None
+                if since_id:
+                    # min_id returns the toots right after the watermark, oldest
+                    # first, and the "prev" link walks forward from there without gaps
+                    params['min_id'] = since_id
+                    direction = 'prev'
+                else:
+                    # Newest first; the "next" link walks back with max_id
+                    direction = 'next'
+
+                jobs.append(FetchJob(
+                    label=f"{instance} #{hashtag}",
+                    url=f"https://{instance}/api/v1/timelines/tag/{hashtag}",
+                    params=params,
+                    context={'instance': instance, 'hashtag': hashtag, 'direction': direction, 'page': 1},
+                ))
+
+            crawls.append(PlatformCrawl('Mastodon', jobs, self._handle_mastodon,
+                                        concurrency=PLATFORM_CONCURRENCY['Mastodon']))
+        return crawls
+
+    def _handle_mastodon(self, job, response):
+        if response.status_code != 200:
+            return
 
-    # ========== HEALTHUNLOCKED ==========
-    def fetch_healthunlocked(self):
-        """Fetch from HealthUnlocked"""
-        print("\n💚 Fetching from HealthUnlocked...")
+        instance = job.context['instance']
+        mark_key = f"{instance}#{job.context['hashtag']}"
+        toots = response.json()
+
+        # Toot ids are snowflake-style integers, newest is the largest
+        if toots:
+            newest = max((toot['id'] for toot in toots), key=int)
+            since_id = self.state.watermark('mastodon', mark_key)
+            if not since_id or int(newest) > int(since_id):
+                self.state.set_watermark('mastodon', mark_key, newest)
+
+        for toot in toots:
+            content = re.sub('<[^<]+?>', '', toot['content'])
+
+            # A federated toot has a different local id on every instance but
+            # one canonical uri, so key on that
+            self._add_discussion({
+                'id': stable_id('mastodon', toot.get('uri') or toot['url']),
+                'platform': 'Mastodon',
+                'source': f"{instance}",
+                'category': DEFAULT_CATEGORY,
+                'title': content[:150] + '...' if len(content) > 150 else content,
+                'content': content[:800],
+                'url': toot['url'],
+                'author': toot['account']['display_name'] or toot['account']['username'],
+                'score': toot['favourites_count'] + toot['reblogs_count'],
+                'num_comments': toot['replies_count'],
+                'created_utc': toot['created_at'],
+                'fetched_date': datetime.now().isoformat()
+            }, content)
+
+        page = job.context['page']
+        print(f"  ✓ {job.label}" + (f" (page {page})" if page > 1 else "") + f": {len(toots)} toots")
+
+        # A full page means there is more in the direction we are walking
+        link = response.links.get(job.context['direction'])
+        if link and len(toots) >= MASTODON_PAGE_LIMIT and page < MASTODON_MAX_PAGES:
+            return [FetchJob(
+                label=job.label,
+                url=link['url'],  # carries limit and the min_id/max_id cursor
+                headers=job.headers,
+                context={**job.context, 'page': page + 1},
+            )]
+
+    def fetch_mastodon(self):
+        """Fetch from Mastodon"""
+        print("\n🐘 Fetching from Mastodon...")
+        return self._run_together(self.mastodon_crawls())
 
+    # ========== HEALTHUNLOCKED ==========
+    def healthunlocked_crawl(self):
         communities = [
             'pcosfriendly', 'endometriosis-uk', 'thyroiduk',
             'fibromyalgia-support', 'breast-cancer-care',
@@ -281,85 +491,37 @@ class ComprehensiveHealthAggregator:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        new_count = 0
-
-        for community in communities:
-            try:
-                url = f"https://healthunlocked.com/{community}"
-                response = requests.get(url, headers=headers, timeout=15)
-
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-
-                    # Find post elements (structure may vary)
-                    posts = soup.find_all('article', limit=20)
-
-                    for post in posts:
-                        try:
-                            title_elem = post.find(['h2', 'h3', 'a'])
-                            if not title_elem:
-                                continue
-
-                            title = title_elem.get_text(strip=True)
-                            link = title_elem.get('href', '')
-                            if link and not link.startswith('http'):
-                                link = urljoin(url, link)
-
-                            disc_id = f"healthunlocked_{hash(link)}"
-
-                            if any(d['id'] == disc_id for d in self.discussions):
-                                continue
-
-                            content_elem = post.find(['p', 'div'], class_=re.compile('content|text|body', re.I))
-                            content = content_elem.get_text(strip=True)[:800] if content_elem else ""
-
-                            category = self.categorize_content(f"{title} {content}")
-
-                            # Extract engagement metrics
-                            likes = replies = 0
-                            stats = post.find_all(text=re.compile(r'\d+'))
-                            if stats:
-                                try:
-                                    likes = int(re.search(r'\d+', str(stats[0])).group())
-                                    if len(stats) > 1:
-                                        replies = int(re.search(r'\d+', str(stats[1])).group())
-                                except:
-                                    pass
-
-                            discussion = {
-                                'id': disc_id,
-                                'platform': 'HealthUnlocked',
-                                'source': community,
-                                'category': category,
-                                'title': title,
-                                'content': content,
-                                'url': link or url,
-                                'author': 'Community Member',
-                                'likes': likes,
-                                'num_comments': replies,
-                                'fetched_date': datetime.now().isoformat()
-                            }
-
-                            discussion['engagement_score'] = self.calculate_engagement_score(discussion)
-                            self.discussions.append(discussion)
-                            new_count += 1
-
-                        except Exception as e:
-                            continue
-
-                    print(f"  ✓ {community}: {len(posts)} posts")
-                    time.sleep(2)
-
-            except Exception as e:
-                print(f"  ✗ {community}: {str(e)}")
-
-        print(f"✅ HealthUnlocked: {new_count} discussions")
-        return new_count
+        jobs = [
+            FetchJob(
+                label=community,
+                url=f"https://healthunlocked.com/{community}",
+                headers=headers,
+                timeout=15,
+                context={'community': community},
+            )
+            for community in communities
+        ]
 
-    def fetch_patient_info(self):
-        """Fetch from Patient.info community"""
-        print("\n🏥 Fetching from Patient.info...")
+        return PlatformCrawl('HealthUnlocked', jobs, self._handle_healthunlocked,
+                             concurrency=PLATFORM_CONCURRENCY['HealthUnlocked'],
+                             parse=parse_healthunlocked)
+
+    def _handle_healthunlocked(self, job, response, parsed):
+        if response.status_code != 200:
+            return
+
+        for disc in parsed:
+            self._add_discussion(disc)
+
+        print(f"  ✓ {job.context['community']}: {len(parsed)} posts")
+
+    def fetch_healthunlocked(self, pool=None):
+        """Fetch from HealthUnlocked"""
+        print("\n💚 Fetching from HealthUnlocked...")
+        return self._run_one(self.healthunlocked_crawl(), pool)
 
+    # ========== PATIENT.INFO ==========
+    def patient_info_crawl(self):
         forums = [
             "tag/womens%20health",  # Women's health category
             "tag/polycystic%20ovary%20syndrome",  # PCOS tag
@@ -386,89 +548,40 @@ class ComprehensiveHealthAggregator:
         }
 
         base_url = "https://community.patient.info/"
-        new_count = 0
+        jobs = [
+            FetchJob(
+                label=forum,
+                url=urljoin(base_url, forum),
+                headers=headers,
+                timeout=15,
+                context={'forum': forum, 'base_url': base_url},
+            )
+            for forum in forums
+        ]
 
-        for forum in forums:
-            try:
-                url = urljoin(base_url, forum)
-                resp = requests.get(url, headers=headers, timeout=15)
+        return PlatformCrawl('Patient.info', jobs, self._handle_patient_info,
+                             concurrency=PLATFORM_CONCURRENCY['Patient.info'],
+                             parse=parse_patient_info)
 
-                if resp.status_code != 200:
-                    print(f"  ✗ {forum}: HTTP {resp.status_code}")
-                    continue
+    def _handle_patient_info(self, job, resp, parsed):
+        forum = job.context['forum']
 
-                soup = BeautifulSoup(resp.text, "html.parser")
-
-                # Discourse topic list rows
-                rows = soup.find_all("tr", class_=re.compile("topic-list-item", re.I))[:15]
-
-                for row in rows:
-                    try:
-                        title_link = row.find("a", class_=re.compile("title", re.I))
-                        if not title_link:
-                            continue
-
-                        title = title_link.get_text(strip=True)
-                        link = title_link.get("href", "")
-                        if link and not link.startswith("http"):
-                            link = urljoin(base_url, link)
-
-                        disc_id = f"patient_{hash(link)}"
-                        if any(d["id"] == disc_id for d in self.discussions):
-                            continue
-
-                        # Small excerpt if available
-                        excerpt = row.find("span", class_=re.compile("excerpt", re.I))
-                        content = excerpt.get_text(strip=True)[:800] if excerpt else ""
-
-                        category = self.categorize_content(f"{title} {content}")
-
-                        # Replies / posts
-                        replies = 0
-                        replies_td = row.find("td", class_=re.compile("posts|replies", re.I))
-                        if replies_td:
-                            m = re.search(r"\d+", replies_td.get_text())
-                            if m:
-                                replies = int(m.group())
-
-                        # Add these 2 lines right after the replies extraction (around line 45, after num_comments)
-                        date_td = row.find_all("td")[-1]  # Last cell contains Activity date [web:1]
-                        post_date = date_td.get_text(strip=True) if len(row.find_all("td")) > 3 and date_td else ""
-
-                        discussion = {
-                            "id": disc_id,
-                            "platform": "Patient.info",
-                            "source": forum.replace("-", " ").replace("tag/", "").title(),
-                            "category": category,
-                            "title": title,
-                            "content": content,
-                            "url": link or url,
-                            "author": "Forum Member",
-                            "num_comments": replies,
-                            "created_utc" : post_date,
-                            "fetched_date": datetime.now().isoformat(),
-                        }
-
-                        discussion["engagement_score"] = self.calculate_engagement_score(discussion)
-                        self.discussions.append(discussion)
-                        new_count += 1
-
-                    except Exception:
-                        continue
-
-                print(f"  ✓ {forum}: discussions found")
-                time.sleep(2)
-
-            except Exception as e:
-                print(f"  ✗ {forum}: {e}")
-
-        print(f"✅ Patient.info: {new_count} discussions")
-        return new_count
+        if resp.status_code != 200:
+            print(f"  ✗ {forum}: HTTP {resp.status_code}")
+            return
 
-    # ========== INSPIRE.COM ==========
-    def fetch_inspire(self):
-        print("\n💙 Fetching from Inspire.com...")
+        for disc in parsed:
+            self._add_discussion(disc)
+
+        print(f"  ✓ {forum}: discussions found")
+
+    def fetch_patient_info(self, pool=None):
+        """Fetch from Patient.info community"""
+        print("\n🏥 Fetching from Patient.info...")
+        return self._run_one(self.patient_info_crawl(), pool)
 
+    # ========== INSPIRE.COM ==========
+    def inspire_crawl(self):
         # Correct community URLs (Inspire uses /groups/ not direct slugs)
         communities = [
             'groups/breast-cancer',
@@ -481,9 +594,6 @@ class ComprehensiveHealthAggregator:
             'groups/autoimmune-disease',
             'groups/nccc-cervical-cancer',
             'groups/mypcosteam',
-            'groups/breast-cancer',
-            'groups/ovarian-cancer',
-            'groups/endometriosis',
             'groups/diabetes'
         ]
 
@@ -495,236 +605,284 @@ class ComprehensiveHealthAggregator:
             'Connection': 'keep-alive',
         }
 
-        new_count = 0
+        # Use correct Inspire base URL pattern
+        jobs = [
+            FetchJob(
+                label=community,
+                url=f"https://www.inspire.com/{community}",
+                headers=headers,
+                timeout=15,
+                context={'community': community},
+            )
+            for community in communities
+        ]
 
-        for community in communities:
-            try:
-                # Use correct Inspire base URL pattern
-                url = f"https://www.inspire.com/{community}"
-                print(f"  Fetching: {url}")
-                response = requests.get(url, headers=headers, timeout=15)
+        # Inspire's pacing lives in http_client.HOST_RATES
+        return PlatformCrawl('Inspire.com', jobs, self._handle_inspire,
+                             concurrency=PLATFORM_CONCURRENCY['Inspire.com'],
+                             parse=parse_inspire)
 
-                print(f"  Status: {response.status_code}")
+    def _handle_inspire(self, job, response, parsed):
+        community = job.context['community']
 
-                if response.status_code != 200:
-                    print(f"  ✗ {community}: HTTP {response.status_code}")
-                    continue
+        print(f"  Status: {response.status_code} ({job.url})")
 
-                soup = BeautifulSoup(response.content, 'html.parser')
-
-                # Debug: Print page title to verify we're on right page
-                title = soup.find('title')
-                print(f"  Page title: {title.get_text(strip=True) if title else 'No title'}")
-
-                # Broader selectors for Inspire's current JS-heavy structure
-                posts = soup.find_all(['div', 'article', 'section'],
-                                      class_=re.compile(r'(post|discussion|topic|story|update|activity|card)', re.I),
-                                      limit=20)
-
-                # Also try common Inspire patterns
-                if not posts:
-                    posts = soup.find_all('div', attrs={'data-testid': re.compile('post|discussion', re.I)})
-                    posts += soup.select('[role="article"], [role="listitem"]')
-                    posts += soup.find_all(class_=re.compile(r'stream|feed|discussion-list'))
-
-                found_posts = 0
-                for post in posts[:15]:  # Limit processing
-                    try:
-                        # Multiple title strategies
-                        title_elem = (post.find(['h1', 'h2', 'h3', 'h4']) or
-                                      post.find('a', string=re.compile(r'.{10,}')) or  # Long link text
-                                      post.find(class_=re.compile(r'title|headline|name')))
-
-                        if not title_elem or len(title_elem.get_text(strip=True)) < 10:
-                            continue
-
-                        title = title_elem.get_text(strip=True)[:200]
-
-                        # Get link - multiple fallback strategies
-                        link_elem = (title_elem.find_parent('a') if title_elem.name != 'a' else title_elem)
-                        if not link_elem or link_elem.name != 'a':
-                            link_elem = post.find('a', href=True)
-
-                        link = link_elem.get('href', '') if link_elem else ''
-                        if link and not link.startswith('http'):
-                            link = urljoin(url, link)
-
-                        if not link or 'inspire.com' not in link:
-                            continue
-
-                        disc_id = f"inspire_{hash(link)}"
-
-                        # Content fallback chain
-                        content_elem = (post.find(['p', 'div', 'span'],
-                                                  class_=re.compile(r'content|body|text|excerpt|description', re.I)) or
-                                        post.find('div', string=re.compile(r'.{50,}')) or
-                                        post.select_one('[data-role="main"], .post-body'))
-
-                        content = content_elem.get_text(strip=True)[:800] if content_elem else title[:800]
-                        category = self.categorize_content(f"{title} {content}")
-
-                        date_elem = post.find(['time', 'span'],
-                                              class_=re.compile(r'(date|time|posted|activity)', re.I)) or post.find(
-                            'time')
-                        post_date = date_elem.get('datetime') or date_elem.get('title') or date_elem.get_text(
-                            strip=True)[:20] if date_elem else ""
-
-                        discussion = {
-                            'id': disc_id,
-                            'platform': 'Inspire.com',
-                            'source': community.split('/')[-1].replace('-', ' ').title(),
-                            "category": category,
-                            'title': title,
-                            'content': content,
-                            'url': link,
-                            'author': 'Community Member',
-                            'created_utc' : post_date,
-                            'fetched_date': datetime.now().isoformat()
-                        }
-
-                        discussion['engagement_score'] = self.calculate_engagement_score(discussion)
-                        self.discussions.append(discussion)
-                        new_count += 1
-                        found_posts += 1
-
-                    except Exception as e:
-                        continue
-
-                if found_posts > 0:
-                    print(f"  ✓ {community}: {found_posts} discussions found")
-                else:
-                    print(f"  ⚠ {community}: page loaded but no posts matched")
+        if response.status_code != 200:
+            print(f"  ✗ {community}: HTTP {response.status_code}")
+            return
 
-                time.sleep(3)  # Increased delay for JS-heavy site
+        # Debug: Print page title to verify we're on right page
+        page_title, discussions = parsed
+        print(f"  Page title: {page_title or 'No title'}")
 
-            except requests.RequestException as e:
-                print(f"  ✗ {community}: Network error - {str(e)}")
-            except Exception as e:
-                print(f"  ✗ {community}: {str(e)}")
+        found_posts = sum(1 for disc in discussions if self._add_discussion(disc))
 
-        print(f"✅ Inspire.com: {new_count} discussions")
-        return new_count
+        if found_posts > 0:
+            print(f"  ✓ {community}: {found_posts} discussions found")
+        else:
+            print(f"  ⚠ {community}: page loaded but no posts matched")
+
+    def fetch_inspire(self, pool=None):
+        print("\n💙 Fetching from Inspire.com...")
+        return self._run_one(self.inspire_crawl(), pool)
 
     # ========== STACK EXCHANGE ==========
+    def _stack_exchange_filter(self):
+        """Id of a filter returning only STACK_EXCHANGE_FIELDS, created once and kept in the crawl state"""
+        include = ';'.join(STACK_EXCHANGE_FIELDS)
+        cached = self.state.value('api_filters', 'stackexchange', include)
+        if cached:
+            return cached
+
+        try:
+            response = http_client.get(f"{STACK_EXCHANGE_API}/filters/create", source='Stack Exchange',
+                                       params={'include': include, 'base': 'none', 'unsafe': 'false'},
+                                       timeout=10)
+            response.raise_for_status()
+            filter_id = response.json()['items'][0]['filter']
+        except Exception as e:
+            print(f"  ⚠ Could not create a Stack Exchange filter ({str(e)}), using 'withbody'")
+            return 'withbody'
+
+        self.state.set_value('api_filters', 'stackexchange', include, filter_id)
+        return filter_id
+
+    def _stack_exchange_quota_ok(self):
+        remaining = self.state.quota_remaining('stackexchange')
+        return remaining is None or remaining > STACK_EXCHANGE_MIN_QUOTA
+
+    def _stack_exchange_job(self, sites, base_params, not_before=0.0):
+        """First page of sites[0]'s listing; the rest of `sites` follow it in turn"""
+        site, label = sites[0]
+        params = {**base_params, 'site': site, 'order': 'desc', 'page': 1}
+        since = self.state.watermark('stackexchange', site) if self.incremental else None
+        if since:
+            # Oldest activity first from the watermark, so stopping early leaves no gap
+            params.update(order='asc', min=since)
+
+        return FetchJob(label=label, url=f"{STACK_EXCHANGE_API}/questions", params=params,
+                        context={'site': site, 'sites': sites[1:], 'base_params': base_params},
+                        not_before=not_before)
+
+    def stack_exchange_crawl(self):
+        # Sites are chained one after another so a `backoff` also delays the next site
+        crawl = PlatformCrawl('Stack Exchange', [], self._handle_stack_exchange,
+                              concurrency=PLATFORM_CONCURRENCY['Stack Exchange'])
+
+        if not self._stack_exchange_quota_ok():
+            print(f"  ⚠ Stack Exchange: only {self.state.quota_remaining('stackexchange')} "
+                  f"requests left today, skipping")
+            return crawl
+
+        base_params = {
+            'sort': 'activity',
+            'pagesize': STACK_EXCHANGE_PAGE_SIZE,
+            'filter': self._stack_exchange_filter(),
+        }
+        # A registered app key raises the daily quota from 300 to 10,000
+        if os.environ.get('STACKEXCHANGE_KEY'):
+            base_params['key'] = os.environ['STACKEXCHANGE_KEY']
+
+        if STACK_EXCHANGE_SITES:
+            crawl.jobs.append(self._stack_exchange_job(list(STACK_EXCHANGE_SITES.items()), base_params))
+        return crawl
+
+    def _handle_stack_exchange(self, job, response):
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+
+        if 'quota_remaining' in payload:
+            self.state.set_quota('stackexchange', payload['quota_remaining'], payload.get('quota_max'))
+
+        # `backoff` asks us to leave this method alone for that many seconds
+        not_before = time.monotonic() + payload.get('backoff', 0)
+
+        if response.status_code != 200:
+            print(f"  ✗ {job.label}: {payload.get('error_name', 'HTTP')} {payload.get('error_message', response.status_code)}")
+            return self._next_stack_exchange_site(job, not_before)
+
+        site = job.context['site']
+        questions = payload.get('items', [])
+
+        if questions:
+            newest = max(q['last_activity_date'] for q in questions)
+            if newest > (self.state.watermark('stackexchange', site) or 0):
+                self.state.set_watermark('stackexchange', site, newest)
+
+        relevant = [q for q in questions if STACK_EXCHANGE_TAGS.intersection(q.get('tags', []))]
+        for q in relevant:
+            # Clean HTML from body
+            body = re.sub('<[^<]+?>', '', q.get('body', ''))[:800]
+
+            self._add_discussion({
+                'id': f"stackexchange_{q['question_id']}",
+                'platform': 'Stack Exchange',
+                'source': job.label,
+                'category': DEFAULT_CATEGORY,
+                'title': q['title'],
+                'content': body,
+                'url': q['link'],
+                'author': q.get('owner', {}).get('display_name', 'User'),
+                'score': q['score'],
+                'num_comments': q['answer_count'],
+                'views': q['view_count'],
+                'created_utc': datetime.fromtimestamp(q['creation_date']).isoformat(),
+                'fetched_date': datetime.now().isoformat()
+            }, f"{q['title']} {body}")
+
+        page = job.params['page']
+        print(f"  ✓ {job.label} (page {page}): {len(relevant)} of {len(questions)} active questions")
+
+        if not payload.get('has_more') or page >= STACK_EXCHANGE_MAX_PAGES:
+            return self._next_stack_exchange_site(job, not_before)
+        if not self._stack_exchange_quota_ok():
+            print(f"  ⚠ {job.label}: daily quota almost used up, stopping")
+            return
+
+        return [FetchJob(
+            label=job.label,
+            url=job.url,
+            params={**job.params, 'page': page + 1},
+            context=job.context,
+            not_before=not_before,
+        )]
+
+    def _next_stack_exchange_site(self, job, not_before):
+        if job.context['sites'] and self._stack_exchange_quota_ok():
+            return [self._stack_exchange_job(job.context['sites'], job.context['base_params'], not_before)]
+
     def fetch_stack_exchange(self):
         """Fetch from Health Stack Exchange"""
         print("\n📚 Fetching from Stack Exchange...")
+        return self._run_one(self.stack_exchange_crawl())
 
-        tags = [
-            'womens-health', 'pregnancy', 'gynecology', 'menopause',
-            'contraception', 'fertility', 'menstruation', 'pcos'
+    # ========== RSS FEEDS ==========
+    def rss_crawl(self):
+        headers = {'User-Agent': 'ComprehensiveHealthAggregator/2.0'}
+        jobs = [
+            FetchJob(
+                label=feed['url'],
+                url=feed['url'],
+                # A 304 only helps when last run's entries are still in the store
+                headers={**headers, **(self.feeds.conditional_headers(feed['url']) if self.incremental else {})},
+                context={'default_category': feed.get('category') or DEFAULT_CATEGORY},
+            )
+            for feed in self.feeds.enabled()
         ]
 
-        new_count = 0
-        base_url = 'https://api.stackexchange.com/2.3/questions'
-
-        for tag in tags:
-            try:
-                params = {
-                    'order': 'desc',
-                    'sort': 'activity',
-                    'tagged': tag,
-                    'site': 'health',
-                    'pagesize': 20,
-                    'filter': 'withbody'
-                }
-
-                response = requests.get(base_url, params=params, timeout=10)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    questions = data.get('items', [])
-
-                    for q in questions:
-                        disc_id = f"stackexchange_{q['question_id']}"
-
-                        if any(d['id'] == disc_id for d in self.discussions):
-                            continue
-
-                        # Clean HTML from body
-                        body = re.sub('<[^<]+?>', '', q.get('body', ''))[:800]
-                        category = self.categorize_content(f"{q['title']} {body}")
-
-                        discussion = {
-                            'id': disc_id,
-                            'platform': 'Stack Exchange',
-                            'source': 'Health SE',
-                            'category': category,
-                            'title': q['title'],
-                            'content': body,
-                            'url': q['link'],
-                            'author': q['owner'].get('display_name', 'User'),
-                            'score': q['score'],
-                            'num_comments': q['answer_count'],
-                            'views': q['view_count'],
-                            'created_utc': datetime.fromtimestamp(q['creation_date']).isoformat(),
-                            'fetched_date': datetime.now().isoformat()
-                        }
-
-                        discussion['engagement_score'] = self.calculate_engagement_score(discussion)
-                        self.discussions.append(discussion)
-                        new_count += 1
-
-                    print(f"  ✓ Tag '{tag}': {len(questions)} questions")
-                    time.sleep(0.5)
-
-            except Exception as e:
-                print(f"  ✗ Tag '{tag}': {str(e)}")
-
-        print(f"✅ Stack Exchange: {new_count} discussions")
-        return new_count
+        return PlatformCrawl('RSS Feed', jobs, self._handle_rss,
+                             concurrency=PLATFORM_CONCURRENCY['RSS Feed'], parse=parse_rss)
 
-    # ========== RSS FEEDS ==========
-    def fetch_rss(self):
-        """Fetch from health RSS feeds"""
-        print("\n📰 Fetching from RSS Feeds...")
+    def _handle_rss(self, job, response, parsed):
+        self.feeds.record(job.url, response.status_code, response.headers)
 
-        feeds = [
-            ('https://www.womenshealthmag.com/rss/all.xml/', 'General Women\'s Health'),
-            ('https://www.verywellhealth.com/rss', 'General Women\'s Health'),
-        ]
-
-        new_count = 0
+        if response.status_code == 304:
+            print(f"  ✓ {job.label}: not modified")
+            return
+        if response.status_code != 200:
+            print(f"  ✗ {job.label}: HTTP {response.status_code}")
+            return
 
-        for feed_url, default_category in feeds:
-            try:
-                feed = feedparser.parse(feed_url)
+        feed_title, entries = parsed
+        since = self.state.watermark('rss', job.url) if self.incremental else None
+        newest = self.state.watermark('rss', job.url) or 0
 
-                for entry in feed.entries[:15]:
-                    disc_id = f"rss_{hash(entry.link)}"
+        for entry in entries:
+            published_ts = entry['published_ts']
+            if published_ts:
+                if since and published_ts <= since:
+                    continue
+                newest = max(newest, published_ts)
 
-                    if any(d['id'] == disc_id for d in self.discussions):
-                        continue
+            content = entry['summary']
 
-                    content = entry.get('summary', '')[:800]
-                    category = self.categorize_content(f"{entry.title} {content}")
+            self._add_discussion({
+                'id': stable_id('rss', entry['link']),
+                'platform': 'RSS Feed',
+                'source': feed_title or 'Health Blog',
+                'category': job.context['default_category'],  # the feed's own topic, unless the text says more
+                'title': entry['title'],
+                'content': content,
+                'url': entry['link'],
+                'author': entry['author'] or 'Staff Writer',
+                'published_at': entry['published'] or datetime.now().isoformat(),
+                'fetched_date': datetime.now().isoformat()
+            }, f"{entry['title']} {content}")
 
-                    discussion = {
-                        'id': disc_id,
-                        'platform': 'RSS Feed',
-                        'source': feed.feed.get('title', 'Health Blog'),
-                        'category': category,
-                        'title': entry.title,
-                        'content': content,
-                        'url': entry.link,
-                        'author': entry.get('author', 'Staff Writer'),
-                        'published_at': entry.get('published', datetime.now().isoformat()),
-                        'fetched_date': datetime.now().isoformat()
-                    }
+        if newest:
+            self.state.set_watermark('rss', job.url, newest)
 
-                    discussion['engagement_score'] = self.calculate_engagement_score(discussion)
-                    self.discussions.append(discussion)
-                    new_count += 1
+        print(f"  ✓ {feed_title or 'Feed'}: {len(entries)} articles")
 
-                print(f"  ✓ {feed.feed.get('title', 'Feed')}: {len(feed.entries[:15])} articles")
+    def fetch_rss(self, pool=None):
+        """Fetch from health RSS feeds"""
+        print("\n📰 Fetching from RSS Feeds...")
+        return self._run_together([self.rss_crawl()], pool)
 
-            except Exception as e:
-                print(f"  ✗ Feed error: {str(e)}")
+    # ========== RUNNING ==========
+    def _run_one(self, crawl, pool=None):
+        """Run a single platform sequentially and report how many were new"""
+        before = self.new_counts[crawl.name]
+        run_sequential(crawl, pool, breakers=self.breakers)
+        self.categorize_pending()
+        new_count = self.new_counts[crawl.name] - before
 
-        print(f"✅ RSS Feeds: {new_count} articles")
+        print(f"✅ {crawl.name}: {new_count} discussions")
         return new_count
 
-    def fetch_all_platforms(self):
+    def _run_together(self, crawls, pool=None):
+        """Run crawls concurrently and report how many were new per platform"""
+        names = list(dict.fromkeys(crawl.name for crawl in crawls))  # a platform may have several crawls
+        before = {name: self.new_counts[name] for name in names}
+        run_concurrent(crawls, breakers=self.breakers, pool=pool)
+        self.categorize_pending()
+
+        total = 0
+        for name in names:
+            new_count = self.new_counts[name] - before[name]
+            print(f"✅ {name}: {new_count} discussions")
+            total += new_count
+
+        return total
+
+    def fetch_all_concurrently(self):
+        """Fetch every platform at once, each with its own concurrency limit"""
+        crawls = [
+            self.reddit_crawl(),
+            *self.mastodon_crawls(),
+            self.healthunlocked_crawl(),
+            self.patient_info_crawl(),
+            self.inspire_crawl(),
+            self.stack_exchange_crawl(),
+            self.rss_crawl(),
+        ]
+
+        print(f"\n⚡ Fetching {len(crawls)} crawls concurrently...")
+        return self._run_together(crawls)
+
+    def fetch_all_platforms(self, concurrent=False):
         """ONE-SHOT: Fetch from ALL platforms"""
         print("\n" + "="*70)
         print("🚀 COMPREHENSIVE WOMEN'S HEALTH DATA COLLECTION")
@@ -736,21 +894,38 @@ class ComprehensiveHealthAggregator:
         start_time = time.time()
 
         total = 0
-        total += self.fetch_reddit()
-        total += self.fetch_mastodon()
-        total += self.fetch_patient_info()
-        total += self.fetch_inspire()
-        total += self.fetch_stack_exchange()
-        total += self.fetch_rss()
-
-        #total += self.fetch_healthunlocked()  Wont work
-
-
-        # Sort by engagement
-        self.discussions.sort(key=lambda x: x.get('engagement_score', 0), reverse=True)
-
-        # Save data
-        self.save_data()
+        with metrics.stage('fetch'):
+            if concurrent:
+                total += self.fetch_all_concurrently()
+            else:
+                # One parse pool for every platform, not a fresh one per fetch
+                with parse_pool() as pool:
+                    total += self.fetch_reddit()
+                    total += self.fetch_mastodon()
+                    total += self.fetch_healthunlocked(pool)  # often blocks us; its breaker keeps that cheap
+                    total += self.fetch_patient_info(pool)
+                    total += self.fetch_inspire(pool)
+                    total += self.fetch_stack_exchange()
+                    total += self.fetch_rss(pool)
+
+        # Sources that are down or blocking us
+        self.breakers.report()
+
+        # Score everything against now and sort by engagement
+        self.rank_discussions()
+
+        # Cross-posts and syndicated copies: keep the most engaged one of each story
+        self.collapse_near_duplicates()
+
+        # Save data, then the watermarks that describe it
+        with metrics.stage('write'):
+            self.save_data()
+            if not self.replaying:
+                self.state.save()
+
+        for platform, count in self.new_counts.items():
+            metrics.set_count(f"new_discussions:{platform}", count)
+        metrics.set_count('discussions', len(self.discussions))
 
         elapsed = time.time() - start_time
 
@@ -766,10 +941,25 @@ class ComprehensiveHealthAggregator:
 
     def save_data(self):
         """Save all data"""
+        removed = self.discussions.pop_removed()
+        changed = self.discussions.pop_dirty()
+        self.signatures.save()
+
+        if self.repository is not None:
+            # Only what changed; recency is brought up to date by refresh_scores()
+            written = self.repository.upsert_many(changed)
+            self.repository.delete_many(removed)
+            print(f"💾 Upserted {written} discussions into {self.repository.path}")
+
+        if self.storage is not None:
+            written = self.storage.save(changed, removed, self.discussions.pop_growth())
+            print(f"💾 Appended {written} records to {self.storage.path}")
+            return
+
         data = {
             'last_updated': datetime.now().isoformat(),
             'total': len(self.discussions),
-            'discussions': self.discussions
+            'discussions': self.discussions.to_list()
         }
 
         #print("Data is:", data)
@@ -777,15 +967,31 @@ class ComprehensiveHealthAggregator:
         with open(self.filename, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
 
-    def generate_dashboard(self):
-        """Generate comprehensive HTML dashboard ranked by engagement"""
+    def recent_discussions(self, n=None):
+        """Most recently fetched discussions (all of them when n is None)"""
+        if self.repository is not None:
+            return self.repository.recent(n if n is not None else -1)
+        return sorted(self.discussions, key=lambda x: x.get("fetched_date", ""), reverse=True)[:n]
+
+    def generate_dashboard(self, virtual=False, sharded=False, open_browser=True):
+        """Generate comprehensive HTML dashboard ranked by engagement
+
+        virtual=True lists every discussion in the All Discussions tab as JSON
+        chunks in womens_health_hub/, fetched as they scroll into view, and
+        renders only the cards in view, instead of the newest 200 as HTML.
+        sharded=True writes each condition after the first to womens_health_hub/
+        and loads it on demand (serve the folder over HTTP to view it).
+        open_browser=False only writes the file (benchmarks, scheduled runs).
+        """
         print("\n📊 Generating dashboard...")
 
         if not self.discussions:
             print("❌ No data to display")
             return
 
+        # Scores carry a recency bonus, so compute them as of render time
         now = datetime.now()
+        self.rank_discussions(now)
         recent_24h = now - timedelta(days=1)
         recent_7d = now - timedelta(days=7)
 
@@ -799,1164 +1005,85 @@ class ComprehensiveHealthAggregator:
             'recent_7d': 0
         }
 
-        for disc in self.discussions:
-            stats['by_platform'][disc['platform']] += 1
-            stats['by_category'][disc['category']] += 1
-            if disc.get('engagement_score', 0) > 50:
-                stats['high_engagement'] += 1
-
-        # Group by category
-        by_category = defaultdict(list)
-        for disc in self.discussions:
-            by_category[disc['category']].append(disc)
+        if self.repository is not None:
+            # Rows from earlier runs are not in memory, so bring their recency
+            # bonus up to `now` before SQLite ranks them against this run's
+            with metrics.stage('score'):
+                self.repository.refresh_scores(now)
+
+            # Let SQLite count and rank off its indexes instead of sorting in Python
+            stats['total'] = self.repository.count()
+            stats['by_platform'].update(self.repository.counts_by('platform'))
+            stats['by_category'].update(self.repository.counts_by('category'))
+            stats['high_engagement'] = self.repository.count(min_engagement=50)
+
+            by_category = {
+                cat: self.repository.top(DASHBOARD_CARDS_PER_CATEGORY, category=cat)
+                for cat in stats['by_category']
+            }
+        else:
+            for disc in self.discussions:
+                stats['by_platform'][disc['platform']] += 1
+                stats['by_category'][disc['category']] += 1
+                if disc.get('engagement_score', 0) > 50:
+                    stats['high_engagement'] += 1
 
-        # Sort each category by engagement
-        for cat in by_category:
-            by_category[cat].sort(key=lambda x: x.get('engagement_score', 0), reverse=True)
+            # Group by category (the store is already sorted by engagement)
+            by_category = defaultdict(list)
+            for disc in self.discussions:
+                by_category[disc['category']].append(disc)
 
         # 2) DEFINE last_updated here
         last_updated = datetime.now().strftime("%B %d, %Y at %I:%M %p")
 
-        # 3) Generate HTML
-        html = f"""<!DOCTYPE html>
-
-        <html lang="en"> <head> <meta charset="UTF-8"> <meta name="viewport" content="width=device-width, initial-scale=1.0"> <title>Women's Health Discussion Hub</title> <style> * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                padding: 20px;
-                min-height: 100vh;
-            }}
-
-            .container {{
-                max-width: 1600px;
-                margin: 0 auto;
-                background: white;
-                border-radius: 20px;
-                overflow: hidden;
-                box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-            }}
-
-            .header {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 50px 40px;
-                text-align: center;
-            }}
-
-            .header h1 {{
-                font-size: 42px;
-                margin-bottom: 15px;
-                font-weight: 700;
-            }}
-
-            .header p {{
-                font-size: 18px;
-                opacity: 0.95;
-            }}
-
-            .header .sub {{
-                font-size: 14px;
-                opacity: 0.8;
-                margin-top: 8px;
-            }}
-
-            .stats-bar {{
-                background: #f8f9fa;
-                padding: 30px 40px;
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                gap: 20px;
-                border-bottom: 2px solid #e0e0e0;
-            }}
-
-            .stat-item {{
-                text-align: center;
-            }}
-
-            .stat-number {{
-                font-size: 36px;
-                font-weight: bold;
-                color: #667eea;
-                margin-bottom: 5px;
-            }}
-
-            .stat-label {{
-                font-size: 14px;
-                color: #666;
-                text-transform: uppercase;
-                letter-spacing: 1px;
-            }}
-
-            .tabs {{
-                display: flex;
-                background: #f8f9fa;
-                border-bottom: 2px solid #e0e0e0;
-                overflow-x: auto;
-            }}
-
-            .tab {{
-                flex: 1;
-                padding: 20px;
-                text-align: center;
-                cursor: pointer;
-                border: none;
-                background: transparent;
-                font-size: 16px;
-                font-weight: 600;
-                color: #666;
-                transition: all 0.3s;
-                border-bottom: 3px solid transparent;
-                min-width: 150px;
-            }}
-
-            .tab:hover {{
-                background: white;
-                color: #667eea;
-            }}
-
-            .tab.active {{
-                background: white;
-                color: #667eea;
-                border-bottom-color: #667eea;
-            }}
-
-            .content {{
-                padding: 40px;
-            }}
-
-            .tab-pane {{
-                display: none;
-            }}
-
-            .tab-pane.active {{
-                display: block;
-            }}
-
-            .category-section {{
-                margin-bottom: 50px;
-            }}
-
-            .category-header {{
-                display: flex;
-                align-items: center;
-                justify-content: space-between;
-                margin-bottom: 25px;
-                padding-bottom: 15px;
-                border-bottom: 3px solid #667eea;
-            }}
-
-            .category-title {{
-                font-size: 28px;
-                font-weight: bold;
-                color: #667eea;
-                display: flex;
-                align-items: center;
-                gap: 10px;
-            }}
-
-            .category-count {{
-                font-size: 18px;
-                color: #999;
-                background: #f0f0f0;
-                padding: 5px 15px;
-                border-radius: 20px;
-            }}
-
-            .discussions-grid {{
-                display: grid;
-                grid-template-columns: repeat(auto-fill, minmax(400px, 1fr));
-                gap: 20px;
-            }}
-
-            .discussion-card {{
-                background: #f8f9fa;
-                border-radius: 12px;
-                padding: 25px;
-                border-left: 5px solid #667eea;
-                transition: all 0.3s;
-                cursor: pointer;
-                position: relative;
-            }}
-
-            .discussion-card:hover {{
-                transform: translateY(-5px);
-                box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-            }}
-
-            .discussion-header {{
-                margin-bottom: 15px;
-            }}
-
-            .discussion-title {{
-                font-size: 18px;
-                font-weight: 600;
-                color: #333;
-                margin-bottom: 10px;
-                line-height: 1.4;
-                padding-right: 90px;
-            }}
-
-            .discussion-meta {{
-                display: flex;
-                gap: 10px;
-                flex-wrap: wrap;
-                margin-bottom: 15px;
-            }}
-
-            .badge {{
-                padding: 5px 12px;
-                border-radius: 15px;
-                font-size: 12px;
-                font-weight: 600;
-            }}
-
-            .badge-reddit {{ background: #ff4500; color: white; }}
-            .badge-mastodon {{ background: #6364ff; color: white; }}
-            .badge-patient {{ background: #0066cc; color: white; }}
-            .badge-inspire {{ background: #00aaff; color: white; }}
-            .badge-stack-exchange {{ background: #f48024; color: white; }}
-            .badge-rss {{ background: #ff6600; color: white; }}
-
-            .badge-source {{
-                background: #e0e0e0;
-                color: #666;
-            }}
-
-            .engagement-badge {{
-                position: absolute;
-                top: 15px;
-                right: 15px;
-                background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-                color: white;
-                padding: 5px 12px;
-                border-radius: 20px;
-                font-size: 12px;
-                font-weight: 700;
-            }}
-
-            .engagement-medium {{
-                background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-            }}
-
-            .engagement-low {{
-                background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%);
-            }}
-
-            .discussion-content {{
-                color: #666;
-                line-height: 1.6;
-                margin-bottom: 15px;
-                display: -webkit-box;
-                -webkit-line-clamp: 4;
-                -webkit-box-orient: vertical;
-                overflow: hidden;
-            }}
-
-            .discussion-stats {{
-                display: flex;
-                gap: 15px;
-                color: #999;
-                font-size: 13px;
-            }}
-
-            .discussion-link {{
-                display: inline-block;
-                margin-top: 10px;
-                color: #667eea;
-                text-decoration: none;
-                font-weight: 600;
-                transition: color 0.3s;
-            }}
-
-            .discussion-link:hover {{
-                color: #764ba2;
-            }}
-
-            .filter-bar {{
-                background: #f8f9fa;
-                padding: 20px;
-                border-radius: 10px;
-                margin-bottom: 30px;
-                display: flex;
-                gap: 10px;
-                flex-wrap: wrap;
-                align-items: center;
-            }}
-
-            .filter-label {{
-                font-weight: 600;
-                color: #666;
-            }}
-
-            .filter-btn {{
-                padding: 8px 16px;
-                border: 2px solid #667eea;
-                background: white;
-                color: #667eea;
-                border-radius: 20px;
-                cursor: pointer;
-                font-size: 14px;
-                transition: all 0.3s;
-            }}
-
-            .filter-btn:hover, .filter-btn.active {{
-                background: #667eea;
-                color: white;
-            }}
-
-            .platform-grid {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-                gap: 20px;
-            }}
-
-            .platform-card {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 30px;
-                border-radius: 12px;
-                text-align: center;
-            }}
-
-            .platform-name {{
-                font-size: 24px;
-                font-weight: bold;
-                margin-bottom: 10px;
-            }}
-
-            .platform-count {{
-                font-size: 42px;
-                font-weight: bold;
-                margin-bottom: 10px;
-            }}
-
-            .platform-label {{
-                font-size: 14px;
-                opacity: 0.9;
-            }}
-
-            @media (max-width: 768px) {{
-                .discussions-grid {{
-                    grid-template-columns: 1fr;
-                }}
-
-                .stats-bar {{
-                    grid-template-columns: 1fr 1fr;
-                }}
-            }}
-        </style>
-        </head> <body> <div class="container"> <div class="header"> <h1>💬 Women's Health Discussion Hub</h1> <p>Aggregated from Reddit, Mastodon, Patient.info, Inspire, Stack Exchange & RSS</p> <p class="sub">Last Updated {last_updated}</p> </div>
-
-            <div class="stats-bar">
-                <div class="stat-item">
-                    <div class="stat-number">{stats['total']}</div>
-                    <div class="stat-label">Total Discussions</div>
-                </div>
-                <div class="stat-item">
-                    <div class="stat-number">{len(stats['by_platform'])}</div>
-                    <div class="stat-label">Platforms</div>
-                </div>
-                <div class="stat-item">
-                    <div class="stat-number">{len(stats['by_category'])}</div>
-                    <div class="stat-label">Categories</div>
-                </div>
-                <div class="stat-item">
-                    <div class="stat-number">{stats['recent_24h']}</div>
-                    <div class="stat-label">Last 24 Hours</div>
-                </div>
-                <div class="stat-item">
-                    <div class="stat-number">{stats['recent_7d']}</div>
-                    <div class="stat-label">Last 7 Days</div>
-                </div>
-            </div>
-
-            <div class="tabs">
-                <button class="tab active" onclick="showTab(0)">📋 All Discussions</button>
-                <button class="tab" onclick="showTab(1)">🏥 By Condition</button>
-                <button class="tab" onclick="showTab(2)">📱 By Platform</button>
-                <button class="tab" onclick="showTab(3)">📊 Analytics</button>
-            </div>
-
-            <div class="content">
-                <!-- Tab 0: All Discussions -->
-                <div class="tab-pane active" id="tab-0">
-                    <div class="filter-bar">
-                        <span class="filter-label">Filter by platform:</span>
-                        <button class="filter-btn active" onclick="filterPlatform('all')">All</button>
-                        <button class="filter-btn" onclick="filterPlatform('Reddit')">Reddit</button>
-                        <button class="filter-btn" onclick="filterPlatform('Mastodon')">Mastodon</button>
-                        <button class="filter-btn" onclick="filterPlatform('Patient.info')">Patient.info</button>
-                        <button class="filter-btn" onclick="filterPlatform('Inspire.com')">Inspire</button>
-                        <button class="filter-btn" onclick="filterPlatform('Stack Exchange')">Stack Exchange</button>
-                        <button class="filter-btn" onclick="filterPlatform('RSS')">RSS</button>
-
-                        <span class="filter-label" style="margin-left:20px;">By condition:</span>
-                        <select id="condition-filter">
-                            <option value="all">All</option>"""
-        for cond in sorted(stats["by_category"].keys()):
-            html += f"""
-        <option value="{cond}">{cond}</option>"""
-
-        html += """
-        </select>
-
-                        <input id="search-input" type="text"
-                               placeholder="Search groups (2–3 keywords)..."
-                               style="flex:1; min-width:220px; padding:8px 12px; border-radius:20px; border:1px solid #ccc;">
-                    </div>
-
-                    <div class="discussions-grid" id="all-discussions">
-        """
-
-        recent = sorted(self.discussions, key=lambda x: x.get("fetched_date", ""), reverse=True)[:200]
-
-        for disc in recent:
-            platform = disc["platform"]
-        platform_key = platform.lower().replace(" ", "-").replace(".com", "")
-        if platform_key == "stackexchange":
-            platform_key = "stack-exchange"
-        condition = disc.get("condition", "General")
-        engagement_score = disc.get("engagement_score", 0)
-        band = disc.get("engagement_band", "low")
-
-        html += f"""
-                        <div class="discussion-card"
-                             data-platform="{platform}"
-                             data-condition="{condition}">
-                            <span class="engagement-badge engagement-{band}">{engagement_score}</span>
-                            <div class="discussion-header">
-                                <div class="discussion-title">{disc['title']}</div>
-                                <div class="discussion-meta">
-                                    <span class="badge badge-{platform_key}">{platform}</span>
-                                    <span class="badge badge-source">{disc.get('source', '')}</span>
-                                </div>
-                            </div>
-                            <div class="discussion-content">{disc.get('content', 'No content available')}</div>
-                            <div class="discussion-stats">"""
-
-        if "score" in disc:
-            html += f"<span>⬆️ {disc['score']}</span>"
-        if "num_comments" in disc:
-            html += f"<span>💬 {disc['num_comments']}</span>"
-        if "replies" in disc:
-            html += f"<span>💬 {disc['replies']}</span>"
-
-        html += f"""
-                            </div>
-                            <a href="{disc['url']}" target="_blank" class="discussion-link">Read More →</a>
-                        </div>
-        """
-
-        html += """
-        </div>
-        </div>
-
-
-                <!-- Tab 1: By Condition -->
-                <div class="tab-pane" id="tab-1">
-        """
-
-        for category, discs in sorted(by_category.items(), key=lambda x: len(x), reverse=True):
-
-            html += f"""
-        <div class="category-section">
-        <div class="category-header">
-        <div class="category-title">
-        <span>🏥</span>
-        <span>{category}</span>
-        </div>
-        <div class="category-count">{len(discs)} discussions</div>
-        </div>
-        <div class="discussions-grid">
-        """
-
-            for disc in discs[:30]:
-                platform = disc["platform"]
-                platform_key = platform.lower().replace(" ", "-").replace(".com", "")
-                if platform_key == "stackexchange":
-                    platform_key = "stack-exchange"
-                engagement_score = disc.get("engagement_score", 0)
-                band = disc.get("engagement_band", "low")
-
-                html += f"""
-                            <div class="discussion-card"
-                                 data-platform="{platform}"
-                                 data-condition="{category}">
-                                <span class="engagement-badge engagement-{band}">{engagement_score}</span>
-                                <div class="discussion-header">
-                                    <div class="discussion-title">{disc['title']}</div>
-                                    <div class="discussion-meta">
-                                        <span class="badge badge-{platform_key}">{platform}</span>
-                                        <span class="badge badge-source">{disc.get('source', '')}</span>
-                                    </div>
-                                </div>
-                                <div class="discussion-content">{disc.get('content', 'No content available')}</div>
-                                <a href="{disc['url']}" target="_blank" class="discussion-link">Read More →</a>
-                            </div>
-        """
-
-            html += """
-                        </div>
-                    </div>
-        """
-
-            html += """
-        </div>
-
-
-                <!-- Tab 2: By Platform -->
-                <div class="tab-pane" id="tab-2">
-                    <div class="platform-grid">
-        """
-
-            for platform, count in sorted(stats["by_platform"].items(), key=lambda x: x, reverse=True):
-
-                html += f"""
-        <div class="platform-card">
-        <div class="platform-name">{platform}</div>
-        <div class="platform-count">{count}</div>
-        <div class="platform-label">Discussions</div>
-        </div>
-        """
-
-                html += """
-        </div>
-        </div>
+        # 3) Stream the HTML straight to disk
+        recent = self.recent_discussions(None if virtual else DASHBOARD_RECENT_CARDS)
 
-
-                <!-- Tab 3: Analytics -->
-                <div class="tab-pane" id="tab-3">
-                    <div class="category-section">
-                        <h2 class="category-title">📊 Condition Distribution</h2>
-                        <div style="margin-top: 20px;">
-        """
-
-                max_count = max(stats["by_category"].values()) if stats["by_category"] else 1
-
-                for category, count in sorted(stats["by_category"].items(), key=lambda x: x, reverse=True):
-
-                    percentage = (count / stats["total"] * 100) if stats["total"] > 0 else 0
-                    bar_width = (count / max_count * 100) if max_count > 0 else 0
-
-                    # 3) Generate HTML
-                    html = f"""<!DOCTYPE html>
-                      <html lang="en">
-                      <head>
-                          <meta charset="UTF-8">
-                          <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                          <title>Women's Health Discussion Hub</title>
-                          <style>
-                              * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-
-                              body {{
-                                  font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                                  background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                                  padding: 20px;
-                                  min-height: 100vh;
-                              }}
-
-                              .container {{
-                                  max-width: 1600px;
-                                  margin: 0 auto;
-                                  background: white;
-                                  border-radius: 20px;
-                                  overflow: hidden;
-                                  box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-                              }}
-
-                              .header {{
-                                  background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                                  color: white;
-                                  padding: 50px 40px;
-                                  text-align: center;
-                              }}
-
-                              .header h1 {{
-                                  font-size: 42px;
-                                  margin-bottom: 15px;
-                                  font-weight: 700;
-                              }}
-
-                              .header p {{
-                                  font-size: 18px;
-                                  opacity: 0.95;
-                              }}
-
-                              .header .sub {{
-                                  font-size: 14px;
-                                  opacity: 0.8;
-                                  margin-top: 8px;
-                              }}
-
-                              .stats-bar {{
-                                  background: #f8f9fa;
-                                  padding: 30px 40px;
-                                  display: grid;
-                                  grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                                  gap: 20px;
-                                  border-bottom: 2px solid #e0e0e0;
-                              }}
-
-                              .stat-item {{
-                                  text-align: center;
-                              }}
-
-                              .stat-number {{
-                                  font-size: 36px;
-                                  font-weight: bold;
-                                  color: #667eea;
-                                  margin-bottom: 5px;
-                              }}
-
-                              .stat-label {{
-                                  font-size: 14px;
-                                  color: #666;
-                                  text-transform: uppercase;
-                                  letter-spacing: 1px;
-                              }}
-
-                              .tabs {{
-                                  display: flex;
-                                  background: #f8f9fa;
-                                  border-bottom: 2px solid #e0e0e0;
-                                  overflow-x: auto;
-                              }}
-
-                              .tab {{
-                                  flex: 1;
-                                  padding: 20px;
-                                  text-align: center;
-                                  cursor: pointer;
-                                  border: none;
-                                  background: transparent;
-                                  font-size: 16px;
-                                  font-weight: 600;
-                                  color: #666;
-                                  transition: all 0.3s;
-                                  border-bottom: 3px solid transparent;
-                                  min-width: 150px;
-                              }}
-
-                              .tab:hover {{
-                                  background: white;
-                                  color: #667eea;
-                              }}
-
-                              .tab.active {{
-                                  background: white;
-                                  color: #667eea;
-                                  border-bottom-color: #667eea;
-                              }}
-
-                              .content {{
-                                  padding: 40px;
-                              }}
-
-                              .tab-pane {{
-                                  display: none;
-                              }}
-
-                              .tab-pane.active {{
-                                  display: block;
-                              }}
-
-                              .category-section {{
-                                  margin-bottom: 50px;
-                              }}
-
-                              .category-header {{
-                                  display: flex;
-                                  align-items: center;
-                                  justify-content: space-between;
-                                  margin-bottom: 25px;
-                                  padding-bottom: 15px;
-                                  border-bottom: 3px solid #667eea;
-                              }}
-
-                              .category-title {{
-                                  font-size: 28px;
-                                  font-weight: bold;
-                                  color: #667eea;
-                                  display: flex;
-                                  align-items: center;
-                                  gap: 10px;
-                              }}
-
-                              .category-count {{
-                                  font-size: 18px;
-                                  color: #999;
-                                  background: #f0f0f0;
-                                  padding: 5px 15px;
-                                  border-radius: 20px;
-                              }}
-
-                              .discussions-grid {{
-                                  display: grid;
-                                  grid-template-columns: repeat(auto-fill, minmax(400px, 1fr));
-                                  gap: 20px;
-                              }}
-
-                              .discussion-card {{
-                                  background: #f8f9fa;
-                                  border-radius: 12px;
-                                  padding: 25px;
-                                  border-left: 5px solid #667eea;
-                                  transition: all 0.3s;
-                                  cursor: pointer;
-                                  position: relative;
-                              }}
-
-                              .discussion-card:hover {{
-                                  transform: translateY(-5px);
-                                  box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-                              }}
-
-                              .discussion-header {{
-                                  margin-bottom: 15px;
-                              }}
-
-                              .discussion-title {{
-                                  font-size: 18px;
-                                  font-weight: 600;
-                                  color: #333;
-                                  margin-bottom: 10px;
-                                  line-height: 1.4;
-                                  padding-right: 90px;
-                              }}
-
-                              .discussion-meta {{
-                                  display: flex;
-                                  gap: 10px;
-                                  flex-wrap: wrap;
-                                  margin-bottom: 15px;
-                              }}
-
-                              .badge {{
-                                  padding: 5px 12px;
-                                  border-radius: 15px;
-                                  font-size: 12px;
-                                  font-weight: 600;
-                              }}
-
-                              .badge-reddit {{ background: #ff4500; color: white; }}
-                              .badge-mastodon {{ background: #6364ff; color: white; }}
-                              .badge-patient {{ background: #0066cc; color: white; }}
-                              .badge-inspire {{ background: #00aaff; color: white; }}
-                              .badge-stack {{ background: #f48024; color: white; }}
-                              .badge-rss {{ background: #ff6600; color: white; }}
-
-                              .badge-source {{
-                                  background: #e0e0e0;
-                                  color: #666;
-                              }}
-
-                              .engagement-badge {{
-                                  position: absolute;
-                                  top: 15px;
-                                  right: 15px;
-                                  background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-                                  color: white;
-                                  padding: 5px 12px;
-                                  border-radius: 20px;
-                                  font-size: 12px;
-                                  font-weight: 700;
-                              }}
-
-                              .engagement-medium {{
-                                  background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-                              }}
-
-                              .engagement-low {{
-                                  background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%);
-                              }}
-
-                              .discussion-content {{
-                                  color: #666;
-                                  line-height: 1.6;
-                                  margin-bottom: 15px;
-                                  display: -webkit-box;
-                                  -webkit-line-clamp: 4;
-                                  -webkit-box-orient: vertical;
-                                  overflow: hidden;
-                              }}
-
-                              .discussion-stats {{
-                                  display: flex;
-                                  gap: 15px;
-                                  color: #999;
-                                  font-size: 13px;
-                              }}
-
-                              .discussion-link {{
-                                  display: inline-block;
-                                  margin-top: 10px;
-                                  color: #667eea;
-                                  text-decoration: none;
-                                  font-weight: 600;
-                                  transition: color 0.3s;
-                              }}
-
-                              .discussion-link:hover {{
-                                  color: #764ba2;
-                              }}
-
-                              .filter-bar {{
-                                  background: #f8f9fa;
-                                  padding: 20px;
-                                  border-radius: 10px;
-                                  margin-bottom: 30px;
-                                  display: flex;
-                                  gap: 10px;
-                                  flex-wrap: wrap;
-                                  align-items: center;
-                              }}
-
-                              .filter-label {{
-                                  font-weight: 600;
-                                  color: #666;
-                              }}
-
-                              .filter-btn {{
-                                  padding: 8px 16px;
-                                  border: 2px solid #667eea;
-                                  background: white;
-                                  color: #667eea;
-                                  border-radius: 20px;
-                                  cursor: pointer;
-                                  font-size: 14px;
-                                  transition: all 0.3s;
-                              }}
-
-                              .filter-btn:hover, .filter-btn.active {{
-                                  background: #667eea;
-                                  color: white;
-                              }}
-
-                              .platform-grid {{
-                                  display: grid;
-                                  grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-                                  gap: 20px;
-                              }}
-
-                              .platform-card {{
-                                  background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                                  color: white;
-                                  padding: 30px;
-                                  border-radius: 12px;
-                                  text-align: center;
-                              }}
-
-                              .platform-name {{
-                                  font-size: 24px;
-                                  font-weight: bold;
-                                  margin-bottom: 10px;
-                              }}
-
-                              .platform-count {{
-                                  font-size: 42px;
-                                  font-weight: bold;
-                                  margin-bottom: 10px;
-                              }}
-
-                              .platform-label {{
-                                  font-size: 14px;
-                                  opacity: 0.9;
-                              }}
-
-                              @media (max-width: 768px) {{
-                                  .discussions-grid {{
-                                      grid-template-columns: 1fr;
-                                  }}
-
-                                  .stats-bar {{
-                                      grid-template-columns: 1fr 1fr;
-                                  }}
-                              }}
-                          </style>
-                      </head>
-                      <body>
-                          <div class="container">
-                              <div class="header">
-                                  <h1>💬 Women's Health Discussion Hub</h1>
-                                  <p>Aggregated from Reddit, Mastodon, Patient.info, Inspire, Stack Exchange & RSS</p>
-                                  <p class="sub">Last Updated {last_updated}</p>
-                              </div>
-
-                              <div class="stats-bar">
-                                  <div class="stat-item">
-                                      <div class="stat-number">{stats['total']}</div>
-                                      <div class="stat-label">Total Discussions</div>
-                                  </div>
-                                  <div class="stat-item">
-                                      <div class="stat-number">{len(stats['by_platform'])}</div>
-                                      <div class="stat-label">Platforms</div>
-                                  </div>
-                                  <div class="stat-item">
-                                      <div class="stat-number">{len(stats['by_category'])}</div>
-                                      <div class="stat-label">Categories</div>
-                                  </div>
-                                  <div class="stat-item">
-                                      <div class="stat-number">{stats['recent_24h']}</div>
-                                      <div class="stat-label">Last 24 Hours</div>
-                                  </div>
-                                  <div class="stat-item">
-                                      <div class="stat-number">{stats['recent_7d']}</div>
-                                      <div class="stat-label">Last 7 Days</div>
-                                  </div>
-                              </div>
-
-                              <div class="tabs">
-                                  <button class="tab active" onclick="showTab(0)">📋 All Discussions</button>
-                                  <button class="tab" onclick="showTab(1)">🏥 By Condition</button>
-                                  <button class="tab" onclick="showTab(2)">📱 By Platform</button>
-                                  <button class="tab" onclick="showTab(3)">📊 Analytics</button>
-                              </div>
-
-                              <div class="content">
-                                  <!-- Tab 0: All Discussions -->
-                                  <div class="tab-pane active" id="tab-0">
-                                      <div class="filter-bar">
-                                          <span class="filter-label">Filter by platform:</span>
-                                          <button class="filter-btn active" onclick="filterPlatform('all')">All</button>
-                                          <button class="filter-btn" onclick="filterPlatform('Reddit')">Reddit</button>
-                                          <button class="filter-btn" onclick="filterPlatform('Mastodon')">Mastodon</button>
-                                          <button class="filter-btn" onclick="filterPlatform('Patient.info')">Patient.info</button>
-                                          <button class="filter-btn" onclick="filterPlatform('Inspire.com')">Inspire</button>
-                                          <button class="filter-btn" onclick="filterPlatform('StackExchange')">Stack Exchange</button>
-                                          <button class="filter-btn" onclick="filterPlatform('RSS')">RSS</button>
-
-                                          <span class="filter-label" style="margin-left:20px;">By condition:</span>
-                                          <select id="condition-filter">
-                                              <option value="all">All</option>"""
-
-                    # condition options
-                    for cond in sorted(stats["by_category"].keys()):
-                        html += f"""
-                                              <option value="{cond}">{cond}</option>"""
-
-                    html += """
-                                          </select>
-
-                                          <input id="search-input" type="text"
-                                                 placeholder="Search groups (2–3 keywords)..."
-                                                 style="flex:1; min-width:220px; padding:8px 12px; border-radius:20px; border:1px solid #ccc;">
-                                      </div>
-
-                                      <div class="discussions-grid" id="all-discussions">
-                      """
-
-                    # recent discussions from all platforms
-                    recent = sorted(self.discussions, key=lambda x: x.get("fetched_date", ""), reverse=True)[:200]
-
-                    for disc in recent:
-                        platform_class = disc["platform"].lower().replace(" ", "-")
-                        condition = disc.get("condition", "General")
-                        engagement_score = disc.get("engagement_score", 0)
-                        band = disc.get("engagement_band", "low")  # "high" / "medium" / "low"
-
-                        html += f"""
-                                          <div class="discussion-card"
-                                               data-platform="{disc['platform']}"
-                                               data-condition="{condition}">
-                                              <span class="engagement-badge engagement-{band}">{engagement_score}</span>
-                                              <div class="discussion-header">
-                                                  <div class="discussion-title">{disc['title']}</div>
-                                                  <div class="discussion-meta">
-                                                      <span class="badge badge-{platform_class}">{disc['platform']}</span>
-                                                      <span class="badge badge-source">{disc.get('source', '')}</span>
-                                                  </div>
-                                              </div>
-                                              <div class="discussion-content">{disc.get('content', 'No content available')}</div>
-                                              <div class="discussion-stats">"""
-
-                        if "score" in disc:
-                            html += f"<span>⬆️ {disc['score']}</span>"
-                        if "num_comments" in disc:
-                            html += f"<span>💬 {disc['num_comments']}</span>"
-                        if "replies" in disc:
-                            html += f"<span>💬 {disc['replies']}</span>"
-
-                        html += f"""
-                                              </div>
-                                              <a href="{disc['url']}" target="_blank" class="discussion-link">Read More →</a>
-                                          </div>
-                      """
-
-                    html += """
-                                      </div>
-                                  </div>
-
-                                  <!-- Tab 1: By Condition -->
-                                  <div class="tab-pane" id="tab-1">
-                      """
-
-                    # group by condition (you can precompute by_category from all fetch_* outputs)
-                    for category, discs in sorted(by_category.items(), key=lambda x: len(x[1]), reverse=True):
-                        html += f"""
-                                      <div class="category-section">
-                                          <div class="category-header">
-                                              <div class="category-title">
-                                                  <span>🏥</span>
-                                                  <span>{category}</span>
-                                              </div>
-                                              <div class="category-count">{len(discs)} discussions</div>
-                                          </div>
-                                          <div class="discussions-grid">
-                      """
-
-                        for disc in discs[:30]:
-                            platform_class = disc["platform"].lower().replace(" ", "-")
-                            engagement_score = disc.get("engagement_score", 0)
-                            band = disc.get("engagement_band", "low")
-
-                            html += f"""
-                                              <div class="discussion-card"
-                                                   data-platform="{disc['platform']}"
-                                                   data-condition="{category}">
-                                                  <span class="engagement-badge engagement-{band}">{engagement_score}</span>
-                                                  <div class="discussion-header">
-                                                      <div class="discussion-title">{disc['title']}</div>
-                                                      <div class="discussion-meta">
-                                                          <span class="badge badge-{platform_class}">{disc['platform']}</span>
-                                                          <span class="badge badge-source">{disc.get('source', '')}</span>
-                                                      </div>
-                                                  </div>
-                                                  <div class="discussion-content">{disc.get('content', 'No content available')}</div>
-                                                  <a href="{disc['url']}" target="_blank" class="discussion-link">Read More →</a>
-                                              </div>
-                      """
-
-                        html += """
-                                          </div>
-                                      </div>
-                      """
-
-                    html += """
-                                  </div>
-
-                                  <!-- Tab 2: By Platform -->
-                                  <div class="tab-pane" id="tab-2">
-                                      <div class="platform-grid">
-                      """
-
-                    for platform, count in sorted(stats["by_platform"].items(), key=lambda x: x[1], reverse=True):
-                        html += f"""
-                                          <div class="platform-card">
-                                              <div class="platform-name">{platform}</div>
-                                              <div class="platform-count">{count}</div>
-                                              <div class="platform-label">Discussions</div>
-                                          </div>
-                      """
-
-                    html += """
-                                      </div>
-                                  </div>
-
-                                  <!-- Tab 3: Analytics -->
-                                  <div class="tab-pane" id="tab-3">
-                                      <div class="category-section">
-                                          <h2 class="category-title">📊 Condition Distribution</h2>
-                                          <div style="margin-top: 20px;">
-                      """
-
-                    max_count = max(stats["by_category"].values()) if stats["by_category"] else 1
-
-                    for category, count in sorted(stats["by_category"].items(), key=lambda x: x[1], reverse=True):
-                        percentage = (count / stats["total"] * 100) if stats["total"] > 0 else 0
-                        bar_width = (count / max_count * 100) if max_count > 0 else 0
-
-                        html += f"""
-                                              <div style="margin-bottom: 25px;">
-                                                  <div style="display: flex; justify-content: space-between; margin-bottom: 8px;">
-                                                      <span style="font-weight: 600; color: #333;">{category}</span>
-                                                      <span style="color: #666;">{count} discussions ({percentage:.1f}%)</span>
-                                                  </div>
-                                                  <div style="background: #e0e0e0; height: 35px; border-radius: 20px; overflow: hidden;">
-                                                      <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                                                                  width: {bar_width}%; height: 100%; transition: width 0.5s;
-                                                                  display: flex; align-items: center; padding-left: 15px;
-                                                                  color: white; font-weight: 600;"></div>
-                                                  </div>
-                                              </div>
-                      """
-
-                    html += """
-                                          </div>
-                                      </div>
-                                  </div>
-                              </div>
-                          </div>
-
-                          <script>
-                              function showTab(index) {
-                                  document.querySelectorAll('.tab-pane').forEach(pane => {
-                                      pane.classList.remove('active');
-                                  });
-                                  document.querySelectorAll('.tab').forEach(tab => {
-                                      tab.classList.remove('active');
-                                  });
-
-                                  document.getElementById('tab-' + index).classList.add('active');
-                                  document.querySelectorAll('.tab')[index].classList.add('active');
-                              }
-
-                              function applyFilters() {
-                                  const activeBtn = document.querySelector('.filter-btn.active');
-                                  const platform = activeBtn ? activeBtn.textContent.trim().replace(' RSS', 'RSS') : 'all';
-                                  const condition = document.getElementById('condition-filter').value || 'all';
-                                  const q = (document.getElementById('search-input').value || '').toLowerCase().trim();
-
-                                  const cards = document.querySelectorAll('#all-discussions .discussion-card');
-                                  cards.forEach(card => {
-                                      const cardPlatform = card.dataset.platform || '';
-                                      const cardCondition = (card.dataset.condition || '').toLowerCase();
-                                      const text = (card.innerText || '').toLowerCase();
-
-                                      const platformOk = (platform === 'all') || (cardPlatform === platform);
-                                      const conditionOk = (condition === 'all') || (cardCondition === condition.toLowerCase());
-
-                                      let searchOk = true;
-                                      if (q.length >= 2) {
-                                          const parts = q.split(/\\s+/).filter(x => x.length > 1);
-                                          searchOk = parts.every(p => text.includes(p));
-                                      }
-
-                                      card.style.display = (platformOk && conditionOk && searchOk) ? 'block' : 'none';
-                                  });
-                              }
-
-                              function filterPlatform(platform) {
-                                  const buttons = document.querySelectorAll('.filter-btn');
-                                  buttons.forEach(btn => btn.classList.remove('active'));
-                                  event.target.classList.add('active');
-                                  applyFilters();
-                              }
-
-                              document.getElementById('condition-filter').addEventListener('change', applyFilters);
-                              document.getElementById('search-input').addEventListener('input', function () {
-                                  const v = this.value;
-                                  if (v.length >= 2 || v.length === 0) {
-                                      applyFilters();
-                                  }
-                              });
-                          </script>
-                      </body>
-                      </html>"""
-
-        filename = 'womens_health_hub.html'
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(html)
+        filename = self.output_path('womens_health_hub.html')
+        # Condition fragments and the virtual grid's data share one folder next to the page
+        sidecars = ShardWriter(filename) if sharded or virtual else None
+        shards = sidecars if sharded else None
+        with metrics.stage('render'), open(filename, 'w', encoding='utf-8') as f:
+            render_dashboard(f, stats, recent, by_category, last_updated,
+                             cards_per_category=DASHBOARD_CARDS_PER_CATEGORY, virtual=virtual, shards=shards,
+                             sidecars=sidecars if virtual else None)
 
         print(f"✅ Dashboard generated: {filename}")
         print(f"📊 {stats['total']} discussions across {len(stats['by_category'])} categories")
         print(f"📱 Data from {len(stats['by_platform'])} platforms")
+        if sidecars is not None:
+            print(f"🗂️ {'Condition shards' if sharded else 'Card data'} in {sidecars.directory}/ "
+                  f"(view with: python -m http.server)")
 
-        webbrowser.open(filename)
+        if open_browser:
+            webbrowser.open(filename)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Comprehensive Women's Health Discussion Aggregator")
+    parser.add_argument('--concurrent', action='store_true',
+                        help='fetch all platforms at the same time instead of one after another')
+    parser.add_argument('--storage', choices=['json', 'ndjson'], default='json',
+                        help='rewrite complete_health_data.json (default) or append to an NDJSON log')
+    parser.add_argument('--db', metavar='PATH',
+                        help='also keep discussions in an indexed SQLite database, e.g. complete_health_data.db')
+    parser.add_argument('--incremental', action='store_true',
+                        help='load the previous data and only fetch items newer than each source\'s watermark')
+    parser.add_argument('--virtual-dashboard', action='store_true',
+                        help='list every discussion from JSON chunks next to the dashboard, '
+                             'rendering only the visible cards (serve the folder over HTTP)')
+    parser.add_argument('--sharded', action='store_true',
+                        help='write one lazily loaded fragment per condition next to the dashboard')
+    parser.add_argument('--reddit-depth', type=int, default=REDDIT_MAX_PAGES, metavar='PAGES',
+                        help=f'pages of {REDDIT_LISTING_LIMIT} posts to read per combined subreddit listing '
+                             f'(default {REDDIT_MAX_PAGES})')
+    parser.add_argument('--metrics-report', default=RUN_REPORT, metavar='PATH',
+                        help=f'where to write the JSON run report (default {RUN_REPORT})')
+    parser.add_argument('--prometheus', metavar='PATH',
+                        help='also write run metrics as a Prometheus textfile, e.g. '
+                             '/var/lib/node_exporter/textfile_collector/health_aggregator.prom')
+    args = parser.parse_args()
+
     print("""
 ╔══════════════════════════════════════════════════════════════╗
 ║                                                              ║
@@ -2008,18 +1135,27 @@ def main():
    4. Generate HTML dashboard
    5. Open in your browser
 
-   Estimated time: 3-5 minutes
+   Estimated time: 3-5 minutes (under a minute with --concurrent)
     """)
 
     input("\nPress Enter to start collection...")
 
     try:
-        aggregator = ComprehensiveHealthAggregator()
-        aggregator.fetch_all_platforms()
-        aggregator.generate_dashboard()
+        metrics.reset('aggregator')
+        aggregator = ComprehensiveHealthAggregator(incremental=args.incremental, storage=args.storage,
+                                                   db_path=args.db, reddit_depth=args.reddit_depth)
+        aggregator.fetch_all_platforms(concurrent=args.concurrent)
+        aggregator.generate_dashboard(virtual=args.virtual_dashboard, sharded=args.sharded)
+
+        report_path = aggregator.output_path(args.metrics_report)
+        report = metrics.write_report(report_path)
+        if args.prometheus:
+            metrics.write_prometheus(aggregator.output_path(args.prometheus), report)
+        print(f"\n⏱️  Stage timings (details in {report_path}):")
+        print(metrics.summary())
 
         print("\n✅ COMPLETE! Dashboard opened in your browser.")
-        print("💾 Data saved to: complete_health_data.json")
+        print(f"💾 Data saved to: {aggregator.filename}")
         print("\n🔄 Run again anytime to fetch fresh discussions!")
 
     except KeyboardInterrupt: